@@ -0,0 +1,275 @@
+"""Score archives of labelled recordings offline, in parallel.
+
+Every WAV file is streamed through the same detector and classifier as
+`main.py --input-file`, without pressing any keys, and each stomp is
+labelled with the move parsed from `NAME_move.wav` file names (as written by
+`record.py`). Files are spread over a process pool. Each file is processed
+independently with a fresh detector, and results are collected in file
+order, so the output does not depend on the number of workers. One event is
+written per detected stomp, and aggregate accuracy and throughput are
+printed:
+
+    python batch.py ./sessions --output events.jsonl
+    python batch.py "./sessions/**/alice_*.wav" --model all_moves --output events.parquet
+"""
+
+from __future__ import annotations
+
+import argparse
+import glob
+import json
+import sys
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from pathlib import Path
+
+from dataset_builder import MOVES, move_from_filename
+from file_stream import FileStream
+from stomp_detector import StompDetector
+
+# Model name -> classifier class in `classifier`
+CLASSIFIERS = {
+    "left_right": "LeftRightClassifier",
+    "five_directions": "FiveDirectionClassifier",
+    "all_moves": "ElevenDirectionClassifier",
+    # Energy ratio, then five_directions
+    "cascade": "CascadeClassifier",
+}
+
+
+def find_files(source) -> list[Path]:
+    """WAV files under a directory (recursively), or matching a glob."""
+    source = str(source)
+    if Path(source).is_dir():
+        files = Path(source).rglob("*.wav")
+    else:
+        files = (Path(p) for p in glob.glob(source, recursive=True))
+    return sorted(files)
+
+
+@lru_cache(maxsize=None)
+def _classifier(model: str):
+    # One instance per worker process, loaded on its first file
+    import classifier
+
+    return getattr(classifier, CLASSIFIERS[model])()
+
+
+def process_file(
+    path,
+    model: str = "five_directions",
+    hop_ms: float = 100,
+    threshold: float = 7.0,
+    low_latency: bool = False,
+) -> tuple[list[dict], float]:
+    """Detect and classify every stomp in one recording.
+
+    Returns:
+        The file's events and its duration in seconds.
+    """
+    path = Path(path)
+    classifier = _classifier(model)
+    label: str | None = move_from_filename(path)
+    if label not in MOVES:
+        label = None
+
+    events: list[dict] = []
+    with FileStream(path) as stream:
+        sr = stream.sr
+        step_frames = int((hop_ms / 1000.0) * sr)
+        detector = StompDetector(
+            sr=sr, energy_threshold=threshold, incremental=True, low_latency=low_latency
+        )
+        while not stream.finished:
+            chunk, _overflow = stream.read(step_frames)
+            for stomp in detector.process(chunk):
+                onset_frame, detected_frame = detector.events[-1]
+                events.append(
+                    {
+                        "file": str(path),
+                        "stomp_idx": len(events),
+                        "onset_s": onset_frame / sr,
+                        "detected_s": detected_frame / sr,
+                        "predicted": classifier.classify(stomp),
+                        "label": label,
+                    }
+                )
+    return events, detector.frames_seen / sr
+
+
+def _process_file_safe(args):
+    try:
+        return process_file(*args)
+    except Exception as e:
+        return e
+
+
+def run_batch(
+    files,
+    model: str = "five_directions",
+    workers: int | None = None,
+    hop_ms: float = 100,
+    threshold: float = 7.0,
+    low_latency: bool = False,
+) -> tuple[list[dict], dict]:
+    """Process recordings across a pool of worker processes.
+
+    Args:
+        files: Recordings to process; events are returned in this order.
+        model: Classifier model, one of `CLASSIFIERS`.
+        workers: Number of worker processes (default: CPU count). With 1,
+            files are processed in this process.
+        hop_ms: Detection hop (ms).
+        threshold: Detector energy threshold (multiple of the noise floor).
+        low_latency: Use the detector's low-latency mode.
+
+    Returns:
+        All events, and a summary of accuracy and throughput.
+    """
+    if model not in CLASSIFIERS:
+        raise ValueError(
+            f"Unknown model {model!r}; expected one of {sorted(CLASSIFIERS)}"
+        )
+    jobs = [(path, model, hop_ms, threshold, low_latency) for path in files]
+
+    start = time.perf_counter()
+    if workers == 1:
+        results = list(map(_process_file_safe, jobs))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(_process_file_safe, jobs))
+    elapsed = time.perf_counter() - start
+
+    events, failed, audio_seconds = [], [], 0.0
+    for path, result in zip(files, results):
+        if isinstance(result, Exception):
+            print(f"Skipping {path} due to error: {result}", file=sys.stderr)
+            failed.append(str(path))
+            continue
+        file_events, duration = result
+        events.extend(file_events)
+        audio_seconds += duration
+
+    return events, summarize(events, len(files), failed, audio_seconds, elapsed)
+
+
+def summarize(events, n_files, failed, audio_seconds, elapsed) -> dict:
+    """Accuracy per label and overall (labelled stomps only), plus throughput."""
+    totals: Counter[str] = Counter()
+    correct: Counter[str] = Counter()
+    for event in events:
+        if event["label"] is None:
+            continue
+        totals[event["label"]] += 1
+        correct[event["label"]] += event["predicted"] == event["label"]
+
+    return {
+        "files": n_files,
+        "failed": failed,
+        "stomps": len(events),
+        "labelled": sum(totals.values()),
+        "accuracy": sum(correct.values()) / max(sum(totals.values()), 1),
+        "per_label": {
+            label: {"stomps": totals[label], "accuracy": correct[label] / totals[label]}
+            for label in sorted(totals)
+        },
+        "audio_seconds": audio_seconds,
+        "wall_seconds": elapsed,
+        "realtime_factor": audio_seconds / elapsed if elapsed > 0 else 0.0,
+    }
+
+
+def write_events(events: list[dict], path) -> None:
+    """Write events as JSON lines, or as Parquet for a `.parquet` path."""
+    path = Path(path)
+    if path.suffix == ".parquet":
+        import pandas as pd
+
+        # Needs pyarrow or fastparquet
+        pd.DataFrame(
+            events,
+            columns=[
+                "file",
+                "stomp_idx",
+                "onset_s",
+                "detected_s",
+                "predicted",
+                "label",
+            ],
+        ).to_parquet(path, index=False)
+    else:
+        with open(path, "w") as f:
+            for event in events:
+                f.write(json.dumps(event) + "\n")
+
+
+def print_summary(summary: dict) -> None:
+    print(
+        f"{summary['files']} files ({len(summary['failed'])} failed), "
+        f"{summary['stomps']} stomps ({summary['labelled']} labelled), "
+        f"accuracy {summary['accuracy']:.3f}"
+    )
+    for label, stats in summary["per_label"].items():
+        print(
+            f"{label:>12}: {stats['stomps']:>5} stomps, accuracy {stats['accuracy']:.3f}"
+        )
+    print(
+        f"{summary['audio_seconds']:.0f}s of audio in {summary['wall_seconds']:.1f}s "
+        f"({summary['realtime_factor']:.0f}x realtime)"
+    )
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Run the stomp detector and classifier over many recordings."
+    )
+    parser.add_argument(
+        "source", help="Directory searched recursively for WAV files, or a glob."
+    )
+    parser.add_argument(
+        "--output",
+        type=Path,
+        default=None,
+        help="Write per-stomp events here (.jsonl, or .parquet).",
+    )
+    parser.add_argument(
+        "--model",
+        choices=sorted(CLASSIFIERS),
+        default="five_directions",
+        help="Classifier model (default: five_directions).",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="Number of worker processes (default: CPU count).",
+    )
+    parser.add_argument("--hop-ms", type=float, default=100)
+    parser.add_argument("--threshold", type=float, default=7.0)
+    parser.add_argument("--low-latency", action="store_true")
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    files = find_files(args.source)
+    if not files:
+        raise SystemExit(f"No WAV files found for {args.source}")
+
+    events, summary = run_batch(
+        files,
+        model=args.model,
+        workers=args.workers,
+        hop_ms=args.hop_ms,
+        threshold=args.threshold,
+        low_latency=args.low_latency,
+    )
+    if args.output is not None:
+        write_events(events, args.output)
+    print_summary(summary)
+
+
+if __name__ == "__main__":
+    main()
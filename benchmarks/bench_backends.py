@@ -0,0 +1,95 @@
+"""onnxruntime vs. NumPy inference for the classifier models.
+
+For each model it reports the time from a fresh interpreter to the first
+prediction (imports, model load from a warm cache, one single-row run) and
+the per-call latency at several batch sizes. Both backends go through
+`model_registry`, so they get its tuned sessions and cached weights.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_backends
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+import model_registry
+from classifier import (
+    ElevenDirectionClassifier,
+    FiveDirectionClassifier,
+    LeftRightClassifier,
+)
+
+CLASSIFIERS = [LeftRightClassifier, FiveDirectionClassifier, ElevenDirectionClassifier]
+
+FIRST_PREDICTION = """
+import time
+start = time.perf_counter()
+import numpy as np
+from classifier import {cls}
+classifier = {cls}(backend="{backend}")
+classifier.predict(np.zeros((1, 48), np.float32))
+print((time.perf_counter() - start) * 1000)
+"""
+
+
+def first_prediction_ms(cls, backend, repeat):
+    times = []
+    for _ in range(repeat):
+        out = subprocess.run(
+            [sys.executable, "-c", FIRST_PREDICTION.format(cls=cls, backend=backend)],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout
+        times.append(float(out))
+    return min(times)
+
+
+def call_us(classifier, x, number):
+    classifier.predict(x)
+    start = time.perf_counter()
+    for _ in range(number):
+        classifier.predict(x)
+    return (time.perf_counter() - start) / number * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--batches", type=int, nargs="+", default=[1, 8, 64])
+    parser.add_argument("--number", type=int, default=2000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as cache:
+        os.environ["STOMP_MODEL_CACHE"] = cache
+        rng = np.random.default_rng(0)
+
+        print(
+            f"ms from a fresh interpreter to the first prediction (best of "
+            f"{args.repeat}), us per predict() call at batch size n"
+        )
+        header = f"{'model':>16} {'backend':>12} {'first':>8}"
+        header += "".join(f" {f'n={n}':>8}" for n in args.batches)
+        print(header)
+        for cls in CLASSIFIERS:
+            for backend in ("onnxruntime", "numpy"):
+                # Fills the cache, so subprocesses measure a warm start
+                classifier = cls(backend=backend)
+                first = first_prediction_ms(cls.__name__, backend, args.repeat)
+                row = f"{cls.MODEL:>16} {backend:>12} {first:>8.1f}"
+                for n in args.batches:
+                    x = rng.standard_normal((n, 48)).astype(np.float32)
+                    row += f" {call_us(classifier, x, args.number):>8.1f}"
+                print(row)
+            model_registry.clear()
+
+
+if __name__ == "__main__":
+    main()
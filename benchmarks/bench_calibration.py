@@ -0,0 +1,89 @@
+"""Restart-to-ready time with and without a cached calibration.
+
+Simulates an input device that delivers audio in real time, and times
+`main.load_or_calibrate` from the call until the detector has its noise
+level. The first launch on a device measures background noise for 3
+seconds. Later launches load the cached profile, with or without a learned
+noise spectrum.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_calibration
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from main import load_or_calibrate
+from noise_profile import NoiseProfile
+from stomp_detector import StompDetector
+
+
+class RealtimeStream:
+    """Blocking `read` that returns noise at the rate a sound card would."""
+
+    def __init__(self, sr):
+        self.sr = sr
+        self.rng = np.random.default_rng(0)
+        self.start = None
+        self.frames = 0
+
+    def read(self, frames):
+        if self.start is None:
+            self.start = time.perf_counter()
+        self.frames += frames
+        delay = self.start + self.frames / self.sr - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        chunk = self.rng.standard_normal((frames, 2)) * 0.003
+        return chunk.astype(np.float32), False
+
+
+def ready_ms(sr, step_frames, noise_gate, recalibrate=False):
+    detector = StompDetector(sr=sr, incremental=True)
+    noise_profile = NoiseProfile(sr=sr) if noise_gate else None
+    start = time.perf_counter()
+    load_or_calibrate(
+        RealtimeStream(sr),
+        step_frames,
+        sr,
+        "Benchmark Mic",
+        detector,
+        noise_profile,
+        recalibrate,
+    )
+    return (time.perf_counter() - start) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sr", type=int, default=48000)
+    parser.add_argument("--hop-ms", type=float, default=10)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+    step_frames = int(args.sr * args.hop_ms / 1000)
+
+    with tempfile.TemporaryDirectory() as cache:
+        os.environ["STOMP_MODEL_CACHE"] = cache
+        os.environ["STOMP_CALIBRATION_DIR"] = cache
+        results = []
+        for noise_gate in (False, True):
+            cold = ready_ms(args.sr, step_frames, noise_gate, recalibrate=True)
+            warm = min(
+                ready_ms(args.sr, step_frames, noise_gate) for _ in range(args.repeat)
+            )
+            results.append((noise_gate, cold, warm))
+
+    print()
+    print(f"ms from launch to a calibrated detector ({args.sr} Hz input)")
+    print(f"{'noise gate':>10} {'calibrate':>10} {'cached':>8}")
+    for noise_gate, cold, warm in results:
+        print(f"{'on' if noise_gate else 'off':>10} {cold:>10.0f} {warm:>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""Per-stomp cost and escalation rate of the classifier cascade.
+
+Cuts stomps out of a synthetic track with `StompDetector`. The track's
+stomps have random left/right balance. They are classified with the plain
+five-direction MLP and with `CascadeClassifier` at several thresholds. For
+each run it reports:
+
+- how often the cascade escalated past the energy-ratio stage;
+- the mean cost per stomp;
+- how often the cascade agrees with the plain model.
+
+Synthetic stomps have no real direction, so agreement stands in for
+accuracy. Check thresholds on labelled recordings with
+`batch.py --model cascade`.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_cascade
+"""
+
+import argparse
+import time
+
+from classifier import CascadeClassifier, FiveDirectionClassifier
+from replay import make_stomp_track
+from stomp_detector import StompDetector
+
+
+def cut_stomps(seconds, sr=16000):
+    audio, _onsets = make_stomp_track(sr=sr, duration=seconds, seed=3)
+    detector = StompDetector(sr=sr, energy_threshold=7.0, incremental=True)
+    step = sr // 10
+    return [
+        stomp
+        for i in range(0, len(audio), step)
+        for stomp in detector.process(audio[i : i + step])
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--seconds", type=float, default=120.0)
+    parser.add_argument(
+        "--thresholds", type=float, nargs="+", default=[0.95, 0.9, 0.8, 0.7, 0.5]
+    )
+    args = parser.parse_args()
+
+    stomps = cut_stomps(args.seconds)
+    plain = FiveDirectionClassifier()
+    plain.classify(stomps[0])
+
+    start = time.perf_counter()
+    reference = [plain.classify(stomp) for stomp in stomps]
+    plain_ms = (time.perf_counter() - start) / len(stomps) * 1000
+
+    print(f"{len(stomps)} stomps")
+    print(f"{'classifier':>16} {'escalated':>10} {'ms/stomp':>9} {'agreement':>10}")
+    print(f"{'five_directions':>16} {'100.0%':>10} {plain_ms:>9.3f} {'100.0%':>10}")
+    for threshold in args.thresholds:
+        cascade = CascadeClassifier(threshold=threshold)
+        directions = [cascade.classify(stomp) for stomp in stomps]
+        stats = cascade.stats()
+        agreement = sum(a == b for a, b in zip(directions, reference)) / len(stomps)
+        print(
+            f"{f'cascade@{threshold:g}':>16} {stats['escalation_rate']:>10.1%} "
+            f"{stats['mean_ms']:>9.3f} {agreement:>10.1%}"
+        )
+
+
+if __name__ == "__main__":
+    main()
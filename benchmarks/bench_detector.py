@@ -0,0 +1,66 @@
+"""Per-hop StompDetector cost: window re-analysis vs. incremental tracking.
+
+Feeds 100 ms hops of background noise (no detections, so no resampling) and
+reports the cost per hop of `detect` on a rolling window and of `process`
+with incremental energy tracking.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_detector
+"""
+
+import argparse
+import timeit
+
+import numpy as np
+
+from ring_buffer import RingBuffer
+from stomp_detector import StompDetector
+
+SAMPLE_RATES = [48000, 96000, 192000]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--step-ms", type=int, default=100)
+    parser.add_argument("--hops", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    print(f"step={args.step_ms}ms, us per hop (best of {args.repeat})")
+    print(f"{'sr':>7} {'detect':>10} {'incremental':>12} {'speedup':>8}")
+
+    for sr in SAMPLE_RATES:
+        step = int(args.step_ms / 1000.0 * sr)
+        chunks = [
+            (rng.standard_normal((step, 2)) * 1e-3).astype(np.float32)
+            for _ in range(args.hops)
+        ]
+
+        def run_detect(sr=sr, chunks=chunks):
+            detector = StompDetector(sr=sr, energy_threshold=1e9)
+            window = RingBuffer(detector.window_len, 2)
+            for chunk in chunks:
+                window.write(chunk)
+                detector.detect(window.latest(detector.window_len))
+
+        def run_incremental(sr=sr, chunks=chunks):
+            detector = StompDetector(sr=sr, energy_threshold=1e9, incremental=True)
+            for chunk in chunks:
+                detector.process(chunk)
+
+        results = {}
+        for name, fn in [("detect", run_detect), ("incremental", run_incremental)]:
+            fn()
+            best = min(timeit.repeat(fn, number=1, repeat=args.repeat))
+            results[name] = best / args.hops * 1e6
+
+        print(
+            f"{sr:>7} {results['detect']:>10.1f} {results['incremental']:>12.1f} "
+            f"{results['detect'] / results['incremental']:>7.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
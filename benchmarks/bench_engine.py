@@ -0,0 +1,111 @@
+"""CPU per player and stomp latency of the multi-input engine as N grows.
+
+Feeds N synthetic inputs in real time through `MultiInputEngine`, with
+every player stomping on the same beat (the worst case for a dance game).
+It is run twice for each N:
+
+- "separate": each pipeline calls the classifier itself, one feature
+  extraction and model run per stomp;
+- "batched": the pipelines share the engine's `MicroBatcher`.
+
+For each run it reports the process CPU time per player per second of
+audio, the capture-to-press latency percentiles, and the mean batch size.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_engine --seconds 10 --players 1 2 4 8
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from classifier import FiveDirectionClassifier
+from engine import MultiInputEngine
+from replay import make_stomp_track
+
+
+class LatencyRecorder:
+    def __init__(self):
+        self.latencies = []
+
+    def press(self, direction, captured_at=None):
+        self.latencies.append(time.perf_counter() - captured_at)
+
+
+def run(n_players, batched, audio, sr, args):
+    classifier = FiveDirectionClassifier()
+    engine = MultiInputEngine(
+        classifier,
+        max_wait_ms=args.max_wait_ms,
+        hop_ms=args.hop_ms,
+        low_latency=args.low_latency,
+    )
+    recorders = [LatencyRecorder() for _ in range(n_players)]
+    pipelines = [
+        engine.add_input(f"p{i}", recorder, sr) for i, recorder in enumerate(recorders)
+    ]
+    if not batched:
+        for pipeline in pipelines:
+            pipeline.classifier = classifier
+
+    step = pipelines[0].step_frames
+    engine.start()
+    cpu_start = time.process_time()
+    start = time.perf_counter()
+    for k, i in enumerate(range(0, len(audio) - step, step)):
+        # Deliver blocks at the rate a sound card would
+        delay = start + k * step / sr - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        for pipeline in pipelines:
+            pipeline.callback(audio[i : i + step], step, None, None)
+    time.sleep(0.2)
+    cpu = time.process_time() - cpu_start
+    engine.stop()
+
+    latencies = np.concatenate([r.latencies for r in recorders]) * 1000
+    return {
+        "cpu_ms_per_player_s": cpu / n_players / (len(audio) / sr) * 1000,
+        "p50": np.percentile(latencies, 50),
+        "p99": np.percentile(latencies, 99),
+        "max": latencies.max(),
+        "mean_batch": engine.batcher.metrics()["mean_batch"] if batched else 1.0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--seconds", type=float, default=10.0)
+    parser.add_argument("--players", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--sr", type=int, default=48000)
+    parser.add_argument("--hop-ms", type=float, default=10)
+    parser.add_argument("--max-wait-ms", type=float, default=2.0)
+    parser.add_argument(
+        "--low-latency", action=argparse.BooleanOptionalAction, default=True
+    )
+    args = parser.parse_args()
+
+    audio, _onsets = make_stomp_track(sr=args.sr, duration=args.seconds)
+
+    print(
+        f"{args.seconds:g}s per run, {args.hop_ms:g} ms hops, synchronized stomps; "
+        "latency is capture -> press (ms)"
+    )
+    print(
+        f"{'players':>7} {'mode':>9} {'CPU ms/player/s':>16} "
+        f"{'p50':>7} {'p99':>7} {'max':>7} {'batch':>6}"
+    )
+    for n in args.players:
+        for batched in (False, True):
+            r = run(n, batched, audio, args.sr, args)
+            print(
+                f"{n:>7} {'batched' if batched else 'separate':>9} "
+                f"{r['cpu_ms_per_player_s']:>16.1f} {r['p50']:>7.2f} "
+                f"{r['p99']:>7.2f} {r['max']:>7.2f} {r['mean_batch']:>6.2f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
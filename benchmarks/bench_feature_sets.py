@@ -0,0 +1,77 @@
+"""Extraction cost of reduced feature sets vs. the 48 default features.
+
+For each feature set, reports per-stomp latency (what a live classifier
+pays), where it goes (shared STFT and each feature group), and batch
+throughput with `extract_features_batch`. Accuracy depends on the
+recordings; `feature_search.py` reports it next to the same costs.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_feature_sets
+"""
+
+import argparse
+import timeit
+
+import numpy as np
+
+from feature_search import extraction_costs
+from features import DEFAULT_FEATURE_SET, FEATURE_GROUPS, extract_features_batch
+
+SETS = [
+    DEFAULT_FEATURE_SET,
+    "mfcc+spectral+rms_zcr+xcorr",
+    "mfcc+xcorr",
+    "spectral+rms_zcr+xcorr",
+    "rms_zcr+xcorr",
+    "xcorr",
+]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--stomps", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--batch", type=int, default=256)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    # 200 ms stereo stomps at 16 kHz, as returned by StompDetector
+    stomps = (rng.standard_normal((args.stomps, 3200, 2)) * 0.1).astype(np.float32)
+    batch = (rng.standard_normal((args.batch, 3200, 2)) * 0.1).astype(np.float32)
+
+    costs = extraction_costs(stomps, SETS, 16000, args.repeat)
+    names = ["stft"] + list(FEATURE_GROUPS)
+    print(
+        f"ms per stomp (best of {args.repeat}), and stomps/s in batches of {args.batch}"
+    )
+    print(
+        f"{'feature set':>28} {'n':>3} {'ms':>6} {'x':>5}  "
+        + " ".join(f"{name:>8}" for name in names)
+        + f" {'stomps/s':>9}"
+    )
+    baseline = costs[DEFAULT_FEATURE_SET][0]
+    for feature_set in SETS:
+        ms, timings = costs[feature_set]
+        n = extract_features_batch(stomps[:1], feature_set=feature_set).shape[1]
+        best = min(
+            timeit.repeat(
+                lambda feature_set=feature_set: extract_features_batch(
+                    batch, feature_set=feature_set
+                ),
+                number=1,
+                repeat=args.repeat,
+            )
+        )
+        print(
+            f"{feature_set:>28} {n:>3} {ms:>6.3f} {baseline / ms:>4.1f}x  "
+            + " ".join(
+                f"{timings[name]:>8.3f}" if name in timings else f"{'-':>8}"
+                for name in names
+            )
+            + f" {args.batch / best:>9.0f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
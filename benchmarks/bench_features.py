@@ -0,0 +1,72 @@
+"""Feature extraction benchmarks.
+
+Reports per-stomp latency of the original vs. fused extractor, and batch
+throughput (stomps/sec) of a per-stomp loop vs. `extract_features_batch`.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_features
+"""
+
+import argparse
+import timeit
+
+import numpy as np
+
+from features import (
+    extract_all_features_fused,
+    extract_all_features_with_xcorr,
+    extract_features_batch,
+)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--number", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--batch", type=int, default=256)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    # A 200 ms stereo stomp at 16 kHz, as returned by StompDetector
+    stomp = (rng.standard_normal((3200, 2)) * 0.1).astype(np.float32)
+
+    print(f"ms per stomp (best of {args.repeat})")
+    baseline = None
+    for name, fn in [
+        ("extract_all_features_with_xcorr", extract_all_features_with_xcorr),
+        ("extract_all_features_fused", extract_all_features_fused),
+    ]:
+        fn(stomp)  # warm up caches
+        best = min(
+            timeit.repeat(
+                lambda fn=fn: fn(stomp), number=args.number, repeat=args.repeat
+            )
+        )
+        ms = best / args.number * 1000
+        baseline = baseline or ms
+        print(f"{name:>32}: {ms:7.3f} ms ({baseline / ms:.1f}x)")
+
+    stomps = (rng.standard_normal((args.batch, 3200, 2)) * 0.1).astype(np.float32)
+
+    print(f"\nstomps/sec over a batch of {args.batch} (best of {args.repeat})")
+    baseline = None
+    for name, fn in [
+        (
+            "loop over extract_all_features_with_xcorr",
+            lambda: np.array([extract_all_features_with_xcorr(s) for s in stomps]),
+        ),
+        (
+            "loop over extract_all_features_fused",
+            lambda: np.array([extract_all_features_fused(s) for s in stomps]),
+        ),
+        ("extract_features_batch", lambda: extract_features_batch(stomps)),
+    ]:
+        best = min(timeit.repeat(fn, number=1, repeat=args.repeat))
+        rate = args.batch / best
+        baseline = baseline or rate
+        print(f"{name:>42}: {rate:9.1f} stomps/s ({rate / baseline:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""Cost of opening and replaying a long recording.
+
+Compares decoding the whole file with `librosa.load(sr=16000)` (what
+`FileStream` used to do) with streaming `FileStream` blocks, at the native
+rate and resampled to 16 kHz. Each case runs in a fresh interpreter and
+reports the time (after imports) to the first block, the time to read the
+whole file in 100 ms blocks, and, in a second run, the peak memory
+allocated (tracemalloc; pages of the memory-mapped file are not counted, as
+the OS can drop them at will).
+
+Run from the repository root:
+
+    python -m benchmarks.bench_file_stream --minutes 10
+"""
+
+import argparse
+import json
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+CASE = """
+import json, sys, time, tracemalloc
+import librosa
+from file_stream import FileStream
+path, case, measure_memory = sys.argv[1], sys.argv[2], sys.argv[3] == "1"
+if measure_memory:
+    tracemalloc.start()
+start = time.perf_counter()
+if case == "librosa.load":
+    data, sr = librosa.load(path, sr=16000, mono=False)
+    data = data.T
+    step = sr // 10
+    first = time.perf_counter() - start
+    for i in range(0, len(data), step):
+        chunk = data[i : i + step]
+else:
+    stream = FileStream(path, target_sr=16000 if case.endswith("16k") else None)
+    step = stream.sr // 10
+    stream.read(step)
+    first = time.perf_counter() - start
+    while not stream.finished:
+        stream.read(step)
+total = time.perf_counter() - start
+peak = tracemalloc.get_traced_memory()[1] / 2**20
+print(json.dumps({"first": first, "total": total, "peak": peak}))
+"""
+
+# Written in a child process too, so no case inherits the parent's memory
+WRITE = """
+import sys
+import numpy as np
+import scipy.io.wavfile as wavfile
+path, sr, frames = sys.argv[1], int(sys.argv[2]), int(sys.argv[3])
+audio = np.random.default_rng(0).standard_normal((frames, 2), np.float32) * 0.1
+wavfile.write(path, sr, audio)
+"""
+
+CASES = ["librosa.load", "FileStream native", "FileStream 16k"]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--minutes", type=float, default=10.0)
+    parser.add_argument("--sr", type=int, default=48000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "session.wav"
+        frames = int(args.minutes * 60 * args.sr)
+        subprocess.run(
+            [sys.executable, "-c", WRITE, str(path), str(args.sr), str(frames)],
+            check=True,
+        )
+        size_mb = path.stat().st_size / 2**20
+        print(
+            f"{args.minutes:g} min stereo float32 WAV at {args.sr} Hz "
+            f"({size_mb:.0f} MB), read in 100 ms blocks"
+        )
+        print(f"{'case':>18} {'first block':>12} {'whole file':>11} {'peak alloc':>11}")
+        for case in CASES:
+            timed, traced = (
+                json.loads(
+                    subprocess.run(
+                        [sys.executable, "-c", CASE, str(path), case, memory],
+                        capture_output=True,
+                        text=True,
+                        check=True,
+                    ).stdout.splitlines()[-1]
+                )
+                for memory in ("0", "1")
+            )
+            print(
+                f"{case:>18} {timed['first'] * 1000:>10.1f}ms "
+                f"{timed['total']:>10.2f}s {traced['peak']:>9.1f}MB"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""Time to first inference for the classifier models.
+
+Compares a default `InferenceSession` (what the classifiers used to build)
+with the model registry's tuned session, first with an empty optimized-model
+cache and then reloading from the cache. Each figure covers session creation
+plus the first single-row inference.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_models
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+import onnxruntime as ort
+
+import model_registry
+
+
+def first_inference_ms(make_session, x, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        sess = make_session()
+        sess.run(None, {"input": x})
+        times.append(time.perf_counter() - start)
+    return min(times) * 1000
+
+
+def single_row_us(sess, x, number=2000):
+    sess.run(None, {"input": x})
+    start = time.perf_counter()
+    for _ in range(number):
+        sess.run(["output_label"], {"input": x})
+    return (time.perf_counter() - start) / number * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+
+    x = np.random.default_rng(0).standard_normal((1, 48)).astype(np.float32)
+
+    print(f"ms to first inference (best of {args.repeat}), us per single-row run")
+    print(
+        f"{'model':>16} {'default':>9} {'cold':>9} {'cached':>9} "
+        f"{'default/run':>12} {'tuned/run':>10}"
+    )
+    for name in model_registry.MODELS:
+        path = model_registry.model_path(name)
+
+        def default(path=path):
+            with open(path, "rb") as f:
+                onx = f.read()
+            return ort.InferenceSession(onx, providers=["CPUExecutionProvider"])
+
+        with tempfile.TemporaryDirectory() as cache:
+            os.environ["STOMP_MODEL_CACHE"] = cache
+
+            def cold(path=path):
+                model_registry.optimized_path(path).unlink(missing_ok=True)
+                return model_registry.load_session(path)
+
+            default_ms = first_inference_ms(default, x, args.repeat)
+            cold_ms = first_inference_ms(cold, x, args.repeat)
+            cached_ms = first_inference_ms(
+                lambda path=path: model_registry.load_session(path), x, args.repeat
+            )
+            default_us = single_row_us(default(), x)
+            tuned_us = single_row_us(model_registry.load_session(path), x)
+
+        print(
+            f"{name:>16} {default_ms:>9.2f} {cold_ms:>9.2f} {cached_ms:>9.2f} "
+            f"{default_us:>12.1f} {tuned_us:>10.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
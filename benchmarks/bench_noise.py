@@ -0,0 +1,172 @@
+"""Per-clip `reduce_noise` vs. a streaming `NoiseProfile`.
+
+Stomps (decaying 150 Hz and 600 Hz tones) are mixed into pink-ish
+background noise at 16 kHz. For each stomp, the noise spectrum is
+estimated two ways:
+
+- per clip, from the quietest 10% of the clip's STFT frames, as
+  `reduce_noise` does;
+- by a `NoiseProfile` that `StompDetector` updates on the quiet hops
+  before the stomp.
+
+It reports each estimate's error against the noise spectrum measured over
+the whole noise track (median |dB| over bins), the error in the
+spectral-centroid feature against the clean stomp, and the cost per stomp
+of `reduce_noise` on both channels plus feature extraction vs. gated
+feature extraction. It also reports what the profile updates add to each
+detector hop.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_noise
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from features import (
+    HOP_LENGTH,
+    N_FFT,
+    _frames,
+    _hann_window,
+    estimate_noise_profile,
+    extract_all_features_fused,
+    reduce_noise,
+)
+from noise_profile import NoiseProfile
+from stomp_detector import StompDetector
+
+SR = 16000
+STOMP_LEN = 3200
+CENTROID_MEAN = 18
+
+
+def pink_noise(n, rng, level):
+    """(n, 2) noise with a 1/f power spectrum."""
+    spectrum = np.fft.rfft(rng.standard_normal((2, n)), axis=-1)
+    spectrum[:, 1:] /= np.sqrt(np.arange(1, spectrum.shape[-1]))
+    noise = np.fft.irfft(spectrum, n, axis=-1).T
+    return (noise / noise.std() * level).astype(np.float32)
+
+
+def clean_stomp(rng):
+    t = np.arange(STOMP_LEN) / SR
+    freq = rng.choice([150, 600])
+    tone = np.sin(2 * np.pi * freq * t) * np.exp(-t * 15) * 0.5
+    return (tone[:, None] * rng.uniform(0.3, 1.0, 2)).astype(np.float32)
+
+
+def clip_noise_estimate(stomp):
+    """`reduce_noise`'s noise estimate for each channel of one stomp."""
+    padded = np.pad(stomp.T, [(0, 0), (N_FFT // 2, N_FFT // 2)])
+    frames = _frames(padded, N_FFT, HOP_LENGTH)
+    magnitude = np.abs(np.fft.rfft(frames * _hann_window(N_FFT), axis=-1))
+    return np.stack([estimate_noise_profile(m.T)[:, 0] for m in magnitude])
+
+
+def with_reduce_noise(stomp):
+    """Features after `reduce_noise` (full strength) on each channel."""
+    reduced = np.stack(
+        [reduce_noise(stomp[:, c], SR, 1.0)[:STOMP_LEN] for c in range(2)], axis=1
+    )
+    return extract_all_features_fused(reduced)
+
+
+def db_error(estimate, truth):
+    band = slice(5, N_FFT // 2)
+    return np.median(np.abs(20 * np.log10(estimate[band] / truth[band])))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--stomps", type=int, default=50)
+    parser.add_argument("--noise", type=float, default=0.02)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    gap = SR  # one stomp per second
+    noise = pink_noise(gap * (args.stomps + 2), rng, args.noise)
+    truth = NoiseProfile(sr=SR, alpha=1.0)
+    truth.update(noise)
+    truth_spectrum = truth.spectrum
+
+    profile = NoiseProfile(sr=SR, strength=1.0)
+    detector = StompDetector(sr=SR, energy_threshold=5.0, noise_profile=profile)
+    detector.noise_level = args.noise
+
+    step = SR // 100
+    profile_errors, clip_errors = [], []
+    centroid = {"none": [], "reduce_noise": [], "profile": []}
+    stomps = []
+    for k in range(args.stomps):
+        start = gap * (k + 1)
+        # Hops leading up to the stomp; these update the profile
+        for i in range(start - gap + STOMP_LEN, start, step):
+            detector.process(noise[i : i + step])
+
+        clean = clean_stomp(rng)
+        stomp = clean + noise[start : start + STOMP_LEN]
+        stomps.append(stomp)
+
+        clip = clip_noise_estimate(stomp)
+        for channel in range(2):
+            clip_errors.append(db_error(clip[channel], truth_spectrum[channel]))
+            profile_errors.append(
+                db_error(profile.spectrum[channel], truth_spectrum[channel])
+            )
+
+        reference = extract_all_features_fused(clean)[CENTROID_MEAN]
+        for name, features in (
+            ("none", extract_all_features_fused(stomp)),
+            ("reduce_noise", with_reduce_noise(stomp)),
+            ("profile", extract_all_features_fused(stomp, noise_profile=profile)),
+        ):
+            centroid[name].append(abs(features[CENTROID_MEAN] - reference))
+
+    print(f"{args.stomps} stomps in 1/f noise (RMS {args.noise:g})")
+    print(f"{'noise estimate':>16} {'|dB| error':>11}")
+    print(f"{'per clip':>16} {np.median(clip_errors):>11.2f}")
+    print(f"{'streaming':>16} {np.median(profile_errors):>11.2f}")
+    print()
+
+    def per_stomp_ms(fn, repeat=3):
+        best = float("inf")
+        for _ in range(repeat):
+            start = time.perf_counter()
+            for stomp in stomps:
+                fn(stomp)
+            best = min(best, time.perf_counter() - start)
+        return best / len(stomps) * 1000
+
+    timings = {
+        "none": per_stomp_ms(extract_all_features_fused),
+        "reduce_noise": per_stomp_ms(with_reduce_noise),
+        "profile": per_stomp_ms(
+            lambda s: extract_all_features_fused(s, noise_profile=profile)
+        ),
+    }
+    print(f"{'gating':>16} {'centroid err Hz':>16} {'ms/stomp':>9}")
+    for name, errors in centroid.items():
+        print(f"{name:>16} {np.median(errors):>16.0f} {timings[name]:>9.3f}")
+    print()
+
+    # Profile upkeep in the detector: quiet 10 ms hops at 48 kHz
+    sr = 48000
+    hops = pink_noise(sr * 10, rng, args.noise)
+    step = sr // 100
+    for label, noise_profile in (("off", None), ("on", NoiseProfile(sr=sr))):
+        detector = StompDetector(
+            sr=sr, incremental=True, low_latency=True, noise_profile=noise_profile
+        )
+        detector.noise_level = args.noise
+        start = time.perf_counter()
+        for i in range(0, len(hops), step):
+            detector.process(hops[i : i + step])
+        us = (time.perf_counter() - start) / (len(hops) // step) * 1e6
+        print(f"detector hop, profile {label:>3}: {us:6.1f} us")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""Memory and callback cost of buffering a take vs. streaming it to disk.
+
+Feeds a long take of 44.1 kHz stereo callback blocks to
+
+- the previous recorder: append a copy of each block to a list, then
+  concatenate and write the WAV once the take ends;
+- `StreamingRecorder`: copy each block into its ring and let the writer
+  thread append to the file.
+
+Blocks are delivered as fast as possible, not in real time. Peak memory
+(tracemalloc, numpy arrays included) and per-block callback cost are
+measured in separate passes, since tracing slows down every allocation.
+A shorter take paced in real time reports the callback cost, writer lag
+and drops a live session would see.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_record
+"""
+
+import argparse
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+import numpy as np
+
+from record import StreamingRecorder, WavWriter
+
+SR = 44100
+BLOCK = 512
+
+
+def buffered_take(path, blocks, block):
+    recorded = []
+
+    def callback(indata, frames, time_info, status):
+        recorded.append(indata.copy())
+
+    start = time.perf_counter()
+    for _ in range(blocks):
+        callback(block, BLOCK, None, None)
+    callback_s = time.perf_counter() - start
+
+    writer = WavWriter(path, SR)
+    writer.write(np.concatenate(recorded, axis=0))
+    writer.close()
+    return callback_s
+
+
+def streamed_take(path, blocks, block, buffer_seconds):
+    recorder = StreamingRecorder(
+        path, SR, buffer_seconds=buffer_seconds, flush_seconds=0.05
+    )
+    recorder.start()
+    half = recorder.capture.capacity // 2
+    start = time.perf_counter()
+    for _ in range(blocks):
+        recorder.callback(block, BLOCK, None, None)
+        if recorder.capture.frames_written - recorder._pos > half:
+            # Let the writer keep up; only the callback time is counted
+            pause = time.perf_counter()
+            time.sleep(0.05)
+            start += time.perf_counter() - pause
+    callback_s = time.perf_counter() - start
+    recorder.stop()
+    return callback_s
+
+
+def measure(take, *args):
+    tracemalloc.start()
+    take(*args)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak / 2**20, take(*args)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--minutes", type=float, default=10)
+    parser.add_argument("--buffer-seconds", type=float, default=10)
+    parser.add_argument("--paced-seconds", type=float, default=5)
+    args = parser.parse_args()
+
+    blocks = int(args.minutes * 60 * SR / BLOCK)
+    block = np.random.default_rng(0).uniform(-1, 1, (BLOCK, 2)).astype(np.float32)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "take.wav"
+        results = {
+            "buffered": measure(buffered_take, path, blocks, block),
+            "streamed": measure(
+                streamed_take, path, blocks, block, args.buffer_seconds
+            ),
+        }
+        size = path.stat().st_size / 2**20
+
+        print(f"{args.minutes:g} min take, {SR} Hz stereo ({size:.0f} MiB on disk)")
+        print(f"{'recorder':>10} {'peak MiB':>9} {'us/block':>9}")
+        for name, (peak, callback_s) in results.items():
+            print(f"{name:>10} {peak:>9.1f} {callback_s / blocks * 1e6:>9.2f}")
+        print()
+
+        recorder = StreamingRecorder(path, SR, buffer_seconds=args.buffer_seconds)
+        recorder.start()
+        paced = int(args.paced_seconds * SR / BLOCK)
+        callback_s = 0.0
+        start = time.perf_counter()
+        for i in range(paced):
+            delay = start + (i + 1) * BLOCK / SR - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            called = time.perf_counter()
+            recorder.callback(block, BLOCK, None, None)
+            callback_s += time.perf_counter() - called
+        stats = recorder.stop()
+
+    print(f"paced {args.paced_seconds:g} s take:")
+    print(f"{'us/block':>18}: {callback_s / paced * 1e6:.2f}")
+    for key in ("seconds", "dropped_frames", "overruns", "max_writer_lag_ms"):
+        print(f"{key:>18}: {stats[key]:g}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""Resampling latency: librosa.resample vs. the cached polyphase resampler.
+
+For each device rate, reports the cost of resampling one 200 ms detection
+window to 16 kHz, and for the streaming resampler the per-hop cost paid on
+every 100 ms hop plus the remaining cost when a stomp fires.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_resample
+"""
+
+import argparse
+import timeit
+
+import librosa
+import numpy as np
+
+from resample import PolyphaseResampler, StreamingResampler
+
+SAMPLE_RATES = [44100, 48000, 96000]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--number", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+
+    def best_ms(fn):
+        fn()
+        return min(timeit.repeat(fn, number=args.number, repeat=args.repeat)) / (
+            args.number / 1000
+        )
+
+    print(f"ms per call (best of {args.repeat})")
+    print(
+        f"{'sr':>7} {'librosa':>9} {'polyphase':>10} {'speedup':>8} "
+        f"{'stream/hop':>11} {'stream/stomp':>13}"
+    )
+    for sr in SAMPLE_RATES:
+        window = rng.standard_normal((int(0.2 * sr), 2)).astype(np.float32)
+        hop = window[: int(0.1 * sr)]
+
+        resampler = PolyphaseResampler(sr, 16000)
+        stream = StreamingResampler(sr, 16000)
+
+        librosa_ms = best_ms(
+            lambda window=window, sr=sr: librosa.resample(
+                window, orig_sr=sr, target_sr=16000, axis=0
+            )
+        )
+        poly_ms = best_ms(lambda resampler=resampler, window=window: resampler(window))
+        hop_ms = best_ms(lambda stream=stream, hop=hop: stream.process(hop))
+        stomp_ms = best_ms(stream.pending)
+
+        print(
+            f"{sr:>7} {librosa_ms:>9.3f} {poly_ms:>10.3f} "
+            f"{librosa_ms / poly_ms:>7.1f}x {hop_ms:>11.3f} {stomp_ms:>13.3f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
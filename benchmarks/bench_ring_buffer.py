@@ -0,0 +1,79 @@
+"""Microbenchmark: RingBuffer vs. the np.roll rolling window in main.py.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_ring_buffer
+"""
+
+import argparse
+import timeit
+
+import numpy as np
+
+from ring_buffer import RingBuffer
+
+SAMPLE_RATES = [44100, 48000, 96000]
+
+
+def bench_roll(window_frames: int, step_frames: int, chunks: list[np.ndarray]):
+    audio_buffer = np.zeros((window_frames, 2), dtype=np.float32)
+
+    def step():
+        nonlocal audio_buffer
+        for chunk in chunks:
+            audio_buffer = np.roll(audio_buffer, -step_frames, axis=0)
+            audio_buffer[-step_frames:] = chunk
+            _ = audio_buffer
+
+    return step
+
+
+def bench_ring(window_frames: int, chunks: list[np.ndarray]):
+    ring = RingBuffer(window_frames, 2)
+
+    def step():
+        for chunk in chunks:
+            ring.write(chunk)
+            _ = ring.latest(window_frames)
+
+    return step
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--window-ms", type=int, default=200)
+    parser.add_argument("--step-ms", type=int, default=100)
+    parser.add_argument("--hops", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    print(
+        f"window={args.window_ms}ms step={args.step_ms}ms, us per hop (best of {args.repeat})"
+    )
+    print(f"{'sr':>7} {'np.roll':>10} {'ring':>10} {'speedup':>8}")
+
+    for sr in SAMPLE_RATES:
+        window_frames = int(args.window_ms / 1000.0 * sr)
+        step_frames = int(args.step_ms / 1000.0 * sr)
+        chunks = [
+            rng.standard_normal((step_frames, 2)).astype(np.float32)
+            for _ in range(args.hops)
+        ]
+
+        results = {}
+        for name, fn in [
+            ("roll", bench_roll(window_frames, step_frames, chunks)),
+            ("ring", bench_ring(window_frames, chunks)),
+        ]:
+            best = min(timeit.repeat(fn, number=1, repeat=args.repeat))
+            results[name] = best / args.hops * 1e6
+
+        print(
+            f"{sr:>7} {results['roll']:>10.2f} {results['ring']:>10.2f} "
+            f"{results['roll'] / results['ring']:>7.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""Dataset-ready time after a recording session: offline vs. live segmentation.
+
+Synthesizes a session of takes (stomps every second over low noise, at the
+device rate) and compares
+
+- offline: the takes are recorded, then `build_dataset` streams every file
+  through the detector and extracts features;
+- live: a `StompSegmenter` cuts stomps out of each take on the recorder's
+  writer thread, the take's cache entry is stored when it ends, and
+  `build_dataset` only consolidates the cache.
+
+It reports the time from the end of the session until `features.npz` is
+written, and how much of the writer thread's time per second of audio the
+live segmentation takes.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_segment
+"""
+
+import argparse
+import contextlib
+import io
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+from dataset_builder import StompSegmenter, build_dataset
+from record import StreamingRecorder, WavWriter, store_segments
+
+BLOCK = 512
+DIRECTIONS = ["up", "down", "left", "right"]
+
+
+def take(sr, seconds, rng):
+    audio = rng.standard_normal((sr * seconds, 2)).astype(np.float32) * 1e-4
+    burst = sr // 20
+    for start in range(sr // 2, len(audio) - burst, sr):
+        audio[start : start + burst] = rng.uniform(-0.5, 0.5, (burst, 2))
+    return audio
+
+
+def build(base):
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        store = build_dataset(base, workers=1)
+    return time.perf_counter() - start, len(store["y"])
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sr", type=int, default=44100)
+    parser.add_argument("--seconds", type=int, default=60)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    takes = {d: take(args.sr, args.seconds, rng) for d in DIRECTIONS}
+
+    with tempfile.TemporaryDirectory() as tmp:
+        offline, live = Path(tmp) / "offline", Path(tmp) / "live"
+        offline.mkdir()
+        live.mkdir()
+
+        for direction, audio in takes.items():
+            writer = WavWriter(offline / f"alice_{direction}.wav", args.sr)
+            writer.write(audio)
+            writer.close()
+        offline_s, offline_n = build(offline)
+
+        segment_s = 0.0
+        store_s = 0.0
+        for direction, audio in takes.items():
+            path = live / f"alice_{direction}.wav"
+            segmenter = StompSegmenter(args.sr)
+            recorder = StreamingRecorder(
+                path, args.sr, flush_seconds=0.05, segmenter=segmenter
+            )
+            half = recorder.capture.capacity // 2
+            process = segmenter.process
+
+            def timed(block, process=process):
+                nonlocal segment_s
+                start = time.perf_counter()
+                found = process(block)
+                segment_s += time.perf_counter() - start
+                return found
+
+            segmenter.process = timed
+            recorder.start()
+            for i in range(0, len(audio), BLOCK):
+                recorder.callback(audio[i : i + BLOCK], BLOCK, None, None)
+                # Blocks arrive faster than real time; don't lap the writer
+                while recorder.capture.frames_written - recorder._pos > half:
+                    time.sleep(0.01)
+            stats = recorder.stop()
+            assert stats["dropped_frames"] == 0
+
+            start = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):
+                store_segments(path, segmenter, live / ".stomp_cache")
+            store_s += time.perf_counter() - start
+        consolidate_s, live_n = build(live)
+
+    audio_s = len(takes) * args.seconds
+    print(f"{len(takes)} takes x {args.seconds} s at {args.sr} Hz")
+    print(f"{'':>8} {'stomps':>7} {'ready after session (s)':>24}")
+    print(f"{'offline':>8} {offline_n:>7} {offline_s:>24.2f}")
+    print(f"{'live':>8} {live_n:>7} {consolidate_s:>24.2f}")
+    print()
+    print(
+        f"live segmentation: {segment_s / audio_s * 1000:.1f} ms per second of "
+        f"audio on the writer thread, {store_s / len(takes) * 1000:.0f} ms to "
+        "store each take's entry"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""Startup cost of the runtime path.
+
+Each row runs in a fresh interpreter:
+
+- the imports `main.py` does up front,
+- importing the runtime modules (detector, classifier, features) and
+  running the first classification, which is what has to happen before
+  "Listening...",
+- `main.py --list-devices`, end to end,
+- `main.py` until it prints "Listening..." (needs an audio device and a
+  display for pyautogui; reported as n/a otherwise).
+
+Run from the repository root:
+
+    python -m benchmarks.bench_startup
+"""
+
+import argparse
+import subprocess
+import sys
+import time
+
+RUNTIME = """
+import numpy as np
+from stomp_detector import StompDetector
+from classifier import FiveDirectionClassifier
+StompDetector(sr=48000, incremental=True)
+FiveDirectionClassifier().classify(np.zeros((3200, 2), dtype=np.float32))
+"""
+
+
+def run_ms(cmd, until=None, timeout=60.0):
+    """Wall time of `cmd`, or until a line containing `until` is printed."""
+    start = time.perf_counter()
+    proc = subprocess.Popen(
+        cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True
+    )
+    try:
+        if until is not None:
+            for line in proc.stdout:
+                if until in line:
+                    return (time.perf_counter() - start) * 1000
+            return None
+        proc.communicate(timeout=timeout)
+        if proc.returncode != 0:
+            return None
+        return (time.perf_counter() - start) * 1000
+    finally:
+        proc.kill()
+        proc.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    py = sys.executable
+    cases = [
+        ("interpreter", [py, "-c", "pass"], None),
+        ("import main", [py, "-c", "import main"], None),
+        ("runtime path", [py, "-c", RUNTIME], None),
+        ("--list-devices", [py, "main.py", "--list-devices"], None),
+        ("to Listening...", [py, "main.py"], "Listening..."),
+    ]
+
+    print(f"ms (best of {args.repeat})")
+    for name, cmd, until in cases:
+        times = [run_ms(cmd, until) for _ in range(args.repeat)]
+        if any(t is None for t in times):
+            print(f"{name:>16} {'n/a':>8}")
+        else:
+            print(f"{name:>16} {min(times):>8.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""Loading a training set: per-recording arrays vs. the memory-mapped dataset.
+
+Writes synthetic cache entries for `--stomps` stomps (float32, as
+`dataset_builder` stores them per recording) and compares
+
+- in memory: loading every entry and concatenating the stomps, as the
+  training notebook's per-stomp lists amount to;
+- memmap: `StompDataset` over the same stomps stored as int16 and float16.
+
+It reports the time to open the training set, the memory that takes
+(tracemalloc, numpy arrays included), the size on disk, and the time for
+one shuffled epoch of float32 batches of 256.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_stomp_dataset
+"""
+
+import argparse
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+import numpy as np
+
+from stomp_dataset import StompDataset, write_stomp_dataset
+
+PER_FILE = 250
+WINDOW = 3200
+
+
+def write_entries(base, n_stomps, rng):
+    entries = []
+    for i in range(0, n_stomps, PER_FILE):
+        n = min(PER_FILE, n_stomps - i)
+        decay = np.exp(-np.arange(WINDOW) / 800.0)[None, :, None]
+        stomps = rng.standard_normal((n, WINDOW, 2)).astype(np.float32) * 0.1 * decay
+        entry_path = base / f"entry{i}.npz"
+        np.savez(
+            entry_path,
+            stomps=stomps,
+            offsets=np.arange(n, dtype=np.int64) * 16000,
+            features=rng.standard_normal((n, 48)).astype(np.float32),
+        )
+        entries.append((base / f"speaker{i // PER_FILE % 7}_up.wav", entry_path))
+    return entries
+
+
+def load_in_memory(entries):
+    stomps, features = [], []
+    for _path, entry_path in entries:
+        with np.load(entry_path) as entry:
+            stomps.append(entry["stomps"])
+            features.append(entry["features"])
+    return np.concatenate(stomps), np.concatenate(features)
+
+
+def timed_load(load):
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = load()
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, elapsed * 1000, peak / 2**20
+
+
+def epoch_s(batches):
+    start = time.perf_counter()
+    for audio, _y in batches:
+        audio.sum()
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--stomps", type=int, default=20000)
+    args = parser.parse_args()
+    rng = np.random.default_rng(0)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        base = Path(tmp)
+        entries = write_entries(base, args.stomps, rng)
+        entry_bytes = sum(path.stat().st_size for _, path in entries)
+
+        (stomps, _X), load_ms, peak = timed_load(lambda: load_in_memory(entries))
+        order = np.random.default_rng(1).permutation(len(stomps))
+        epoch = epoch_s(
+            (stomps[order[i : i + 256]], None) for i in range(0, len(stomps), 256)
+        )
+        rows = [("in memory", load_ms, peak, entry_bytes, epoch)]
+        del stomps
+
+        for dtype in ("int16", "float16"):
+            output = base / dtype
+            write_stomp_dataset(output, entries, dtype)
+            dataset, load_ms, peak = timed_load(
+                lambda output=output: StompDataset(output)
+            )
+            epoch = epoch_s(dataset.batches(shuffle=True, seed=1))
+            size = (output / "stomps.npy").stat().st_size
+            rows.append((f"memmap {dtype}", load_ms, peak, size, epoch))
+            del dataset
+
+    print(f"{args.stomps} stomps of {WINDOW} x 2 samples")
+    print(f"{'':>15} {'open ms':>9} {'MiB':>8} {'disk MiB':>9} {'epoch s':>8}")
+    for name, load_ms, peak, size, epoch in rows:
+        print(
+            f"{name:>15} {load_ms:>9.1f} {peak:>8.1f} {size / 2**20:>9.0f} "
+            f"{epoch:>8.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
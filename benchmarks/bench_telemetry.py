@@ -0,0 +1,66 @@
+"""Overhead of per-stage telemetry on one hop.
+
+Times a hop's worth of instrumentation (start a trace, mark read, detect,
+features and inference, record it) with telemetry enabled and disabled,
+next to the cost of the detector and classifier work it measures.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_telemetry
+"""
+
+import argparse
+import timeit
+
+import numpy as np
+
+from classifier import FiveDirectionClassifier
+from stomp_detector import StompDetector
+from telemetry import Telemetry
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--number", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    def best_us(fn, number=args.number):
+        fn()
+        return min(timeit.repeat(fn, number=number, repeat=args.repeat)) / (
+            number / 1e6
+        )
+
+    def hop(telemetry):
+        def run():
+            trace = telemetry.trace()
+            trace.mark("read")
+            trace.mark("detect")
+            trace.mark("features")
+            trace.mark("inference")
+            telemetry.finish(trace)
+
+        return run
+
+    enabled_us = best_us(hop(Telemetry()))
+    disabled_us = best_us(hop(Telemetry(enabled=False)))
+
+    sr = 48000
+    rng = np.random.default_rng(0)
+    chunk = rng.standard_normal((sr // 100, 2)).astype(np.float32) * 1e-3
+    detector = StompDetector(sr=sr, incremental=True)
+    classifier = FiveDirectionClassifier()
+    stomp = rng.standard_normal((3200, 2)).astype(np.float32)
+
+    detect_us = best_us(lambda: detector.process(chunk), number=1000)
+    classify_us = best_us(lambda: classifier.classify(stomp), number=200)
+
+    print(f"us per hop (best of {args.repeat})")
+    print(f"{'telemetry on':>24} {enabled_us:>9.2f}")
+    print(f"{'telemetry off':>24} {disabled_us:>9.2f}")
+    print(f"{'detector, 10 ms hop':>24} {detect_us:>9.2f}")
+    print(f"{'classify one stomp':>24} {classify_us:>9.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,229 @@
+"""Cached per-device calibration profiles.
+
+`measure` listens to a few seconds of silence and summarizes it as a
+`CalibrationProfile`: percentiles of the per-chunk RMS, plus the noise
+spectrum if a `NoiseProfile` is given. Profiles are saved per input device
+and sample rate in `calibration_dir()`, apart from the model cache, so later
+launches load one in milliseconds instead of asking for silence again:
+
+    profile = load_profile(device, sr) or measure(stream, step_frames, sr, device)
+
+While running, a `CalibrationMonitor` follows the detector's adaptive noise
+floor. Only if it drifts beyond a bound for a while is the cached profile
+replaced, with one summarizing the live noise floor.
+"""
+
+from __future__ import annotations
+
+import json
+import math
+import os
+import re
+import sys
+import threading
+import time
+from collections import deque
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+
+import numpy as np
+
+from features import N_FFT
+
+CALIBRATION_DIR = Path(__file__).resolve().parent / "calibrations"
+
+PERCENTILES = (10, 50, 90, 99)
+
+# Lowest initial noise floor handed to the detector
+MIN_NOISE_LEVEL = 0.001
+
+
+@dataclass
+class CalibrationProfile:
+    """Background noise statistics of one input device at one sample rate."""
+
+    device: str
+    sr: int
+    # "p10", "p50", "p90", "p99" and "max" of the noise RMS
+    rms: dict[str, float]
+    # Per-channel `NoiseProfile.spectrum`, if one was learned
+    spectrum: list[list[float]] | None = None
+    created: float = field(default_factory=time.time)
+
+    @classmethod
+    def from_rms(
+        cls, device: str, sr: int, values, spectrum=None
+    ) -> CalibrationProfile:
+        values = np.asarray(values, dtype=np.float64)
+        rms = {f"p{p}": float(np.percentile(values, p)) for p in PERCENTILES}
+        rms["max"] = float(values.max())
+        if spectrum is not None:
+            spectrum = np.asarray(spectrum).tolist()
+        return cls(device, sr, rms, spectrum)
+
+    @property
+    def noise_level(self) -> float:
+        """Initial detector noise floor: the loudest calibration chunk."""
+        return max(self.rms["max"], MIN_NOISE_LEVEL)
+
+    def apply(self, detector, noise_profile=None) -> None:
+        """Seed the detector's noise floor and, if possible, the noise profile."""
+        detector.noise_level = self.noise_level
+        if noise_profile is None or self.spectrum is None:
+            return
+        spectrum = np.asarray(self.spectrum, dtype=np.float32)
+        if spectrum.shape == (noise_profile.channels, 1 + N_FFT // 2):
+            noise_profile.spectrum = spectrum
+
+    def save(self, path: Path) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(f".{os.getpid()}.tmp")
+        tmp.write_text(json.dumps(asdict(self)))
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: Path) -> CalibrationProfile:
+        return cls(**json.loads(path.read_text()))
+
+
+def calibration_dir() -> Path:
+    """Directory holding calibration profiles (`$STOMP_CALIBRATION_DIR`
+    overrides)."""
+    return Path(os.environ.get("STOMP_CALIBRATION_DIR", CALIBRATION_DIR))
+
+
+def profile_path(device: str, sr: int) -> Path:
+    """File of a device's profile at sample rate `sr`."""
+    slug = re.sub(r"[^A-Za-z0-9]+", "_", device).strip("_") or "default"
+    return calibration_dir() / f"{slug}-{sr}.json"
+
+
+def load_profile(device: str, sr: int) -> CalibrationProfile | None:
+    """The cached profile for a device, or None if there is no usable one."""
+    try:
+        profile = CalibrationProfile.load(profile_path(device, sr))
+    except (OSError, ValueError, TypeError):
+        return None
+    return profile if profile.sr == sr else None
+
+
+def measure(
+    stream,
+    step_frames: int,
+    sr: int,
+    device: str = "",
+    duration: float = 3.0,
+    noise_profile=None,
+) -> CalibrationProfile:
+    """Summarize `duration` seconds of background noise from `stream`.
+
+    Args:
+        stream: Object with a blocking `read(frames) -> (chunk, overflow)`,
+            like a sounddevice stream or `StompPipeline`.
+        step_frames: Frames per read; each read contributes one RMS value.
+        noise_profile: Optional `NoiseProfile`, updated with the audio and
+            stored in the profile.
+    """
+    chunks = []
+    for _ in range(max(1, math.ceil(duration * sr / step_frames))):
+        chunk, overflow = stream.read(step_frames)
+        if overflow:
+            print("Warning: Audio overflow during calibration", file=sys.stderr)
+        chunks.append(chunk)
+
+    audio = np.concatenate(chunks)
+    mono = np.mean(audio, axis=1) if audio.ndim > 1 else audio
+    rms = np.sqrt(np.mean(mono.reshape(len(chunks), -1) ** 2, axis=1))
+
+    spectrum = None
+    if noise_profile is not None and noise_profile.update(audio):
+        spectrum = noise_profile.spectrum
+    return CalibrationProfile.from_rms(device, sr, rms, spectrum)
+
+
+class CalibrationMonitor:
+    """Watches the detector's noise floor for drift away from a profile.
+
+    A background thread samples `detector.noise_level` every `interval`
+    seconds. When the floor has stayed more than `drift` times above or
+    below the profile's median noise RMS for `hold` seconds, the profile is
+    replaced by one summarizing the recent noise floor (and the current
+    noise spectrum) and saved, so the next launch starts from it.
+    """
+
+    def __init__(
+        self,
+        profile: CalibrationProfile,
+        detector,
+        noise_profile=None,
+        drift: float = 2.0,
+        hold: float = 10.0,
+        interval: float = 1.0,
+    ):
+        if drift <= 1:
+            raise ValueError("drift must be greater than 1")
+        self.profile = profile
+        self.detector = detector
+        self.noise_profile = noise_profile
+        self.drift = drift
+        self.hold_samples = max(1, round(hold / interval))
+        self.interval = interval
+        self.recalibrations = 0
+
+        self.levels: deque[float] = deque(maxlen=10 * self.hold_samples)
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def check(self) -> bool:
+        """Sample the noise floor once. Returns True if it recalibrated."""
+        self.levels.append(float(self.detector.noise_level))
+        if len(self.levels) < self.hold_samples:
+            return False
+
+        reference = max(self.profile.rms["p50"], 1e-9)
+        recent = list(self.levels)[-self.hold_samples :]
+        louder = all(level > reference * self.drift for level in recent)
+        quieter = all(level < reference / self.drift for level in recent)
+        if not (louder or quieter):
+            return False
+
+        spectrum = None
+        if self.noise_profile is not None:
+            spectrum = self.noise_profile.spectrum
+        self.profile = CalibrationProfile.from_rms(
+            self.profile.device, self.profile.sr, recent, spectrum
+        )
+        self.profile.save(profile_path(self.profile.device, self.profile.sr))
+        self.recalibrations += 1
+        self.levels.clear()
+        return True
+
+    def refine(self) -> None:
+        """Save the noise spectrum learned since startup into the profile."""
+        if self.noise_profile is None or self.noise_profile.spectrum is None:
+            return
+        self.profile.spectrum = self.noise_profile.spectrum.tolist()
+        self.profile.save(profile_path(self.profile.device, self.profile.sr))
+
+    def start(self) -> None:
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._run, name="calibration-monitor", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop sampling and save the refined noise spectrum, if any."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.refine()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            if self.check():
+                print(
+                    "Background noise changed; recalibrated to a noise RMS of "
+                    f"{self.profile.rms['p50']:.5f}"
+                )
@@ -1,15 +1,29 @@
+import time
+from collections import Counter
 from typing import Protocol
 import numpy as np
 import random
-from onnxruntime import InferenceSession
-from features import extract_all_features_with_xcorr
+from features import (
+    DEFAULT_FEATURE_SET,
+    extract_all_features_fused,
+    extract_features_batch,
+    feature_columns,
+)
+from model_registry import get_numpy_model, get_session
+from telemetry import NULL_TRACE, StompTrace
+
+# Inference backends for MLPClassifier
+BACKENDS = ("onnxruntime", "numpy")
 
 
 class StompClassifier(Protocol):
     """Interface for stomp classifiers."""
 
-    def classify(self, stomp: np.ndarray) -> str:
-        """Classify a stomp segment into a direction."""
+    def classify(self, stomp: np.ndarray, trace: StompTrace = NULL_TRACE) -> str:
+        """Classify a stomp segment into a direction.
+
+        Classifiers with distinct stages mark them on `trace`.
+        """
         ...
 
 
@@ -19,7 +33,7 @@ class DummyClassifier:
     def __init__(self):
         self.directions = ["up", "down", "left", "right"]
 
-    def classify(self, stomp: np.ndarray) -> str:
+    def classify(self, stomp: np.ndarray, trace: StompTrace = NULL_TRACE) -> str:
         if stomp.ndim > 1 and stomp.shape[1] >= 2:
             left_energy = np.sum(stomp[:, 0] ** 2)
             right_energy = np.sum(stomp[:, 1] ** 2)
@@ -34,46 +48,123 @@ class DummyClassifier:
 
 
 class MLPClassifier:
-    def run_model(self, features: np.ndarray) -> int:
-        pred_ort = self.sess.run(None, {"input": features.astype(np.float32)})[0]
+    """Runs a registry model on the feature set it declares.
+
+    Only the feature groups in the model's `feature_set` are computed (see
+    `numpy_mlp` for how models record it).
+    """
+
+    # Name of the model in `model_registry.MODELS`
+    MODEL: str
+
+    def __init__(self, backend: str = "onnxruntime", noise_profile=None):
+        """
+        Args:
+            backend: Where the model runs: "onnxruntime", or "numpy" for the
+                same weights run as NumPy matrix products (see `numpy_mlp`).
+            noise_profile: Optional `noise_profile.NoiseProfile` subtracted
+                from each stomp's spectrogram before feature extraction.
+        """
+        if backend not in BACKENDS:
+            raise ValueError(f"Unknown backend {backend!r}, expected one of {BACKENDS}")
+        self.backend = backend
+        self.noise_profile = noise_profile
+        # Shared by all instances; created on first use
+        if backend == "numpy":
+            self.model = get_numpy_model(self.MODEL)
+            self.feature_set = self.model.feature_set
+            n_inputs = self.model.n_features
+        else:
+            self.sess = get_session(self.MODEL)
+            metadata = self.sess.get_modelmeta().custom_metadata_map
+            self.feature_set = metadata.get("feature_set", DEFAULT_FEATURE_SET)
+            n_inputs = self.sess.get_inputs()[0].shape[-1]
+
+        n_columns = len(feature_columns(self.feature_set))
+        if isinstance(n_inputs, int) and n_inputs != n_columns:
+            raise ValueError(
+                f"Model {self.MODEL!r} takes {n_inputs} features, but its "
+                f"feature set {self.feature_set!r} has {n_columns}"
+            )
+
+    def run_model(self, features: np.ndarray) -> np.ndarray:
+        if self.backend == "numpy":
+            return self.model.predict(features)
+        pred_ort = self.sess.run(
+            ["output_label"], {"input": features.astype(np.float32)}
+        )[0]
         return pred_ort
 
     def moves(self, idx: int) -> str: ...
 
-    def classify(self, stomp: np.ndarray) -> str:
-        features = extract_all_features_with_xcorr(stomp)
-        reshaped_features = np.asarray(features).reshape(1, -1)
-        pred_ort = self.run_model(reshaped_features)
-        return self.moves(pred_ort[0])
+    def features(self, stomp: np.ndarray) -> np.ndarray:
+        """Feature vector of one stomp, as the model expects it."""
+        return np.asarray(
+            extract_all_features_fused(
+                stomp, noise_profile=self.noise_profile, feature_set=self.feature_set
+            ),
+            dtype=np.float32,
+        )
+
+    def features_batch(self, stomps: list[np.ndarray]) -> np.ndarray:
+        """(n, n_features) matrix for several stomps, vectorized when they
+        have the same length."""
+        if len(stomps) > 1 and len({stomp.shape for stomp in stomps}) == 1:
+            return extract_features_batch(
+                np.stack(stomps),
+                noise_profile=self.noise_profile,
+                feature_set=self.feature_set,
+            )
+        return np.stack([self.features(stomp) for stomp in stomps])
+
+    def predict(self, features: np.ndarray) -> list[str]:
+        """Directions for a (n, n_features) batch, in one model run."""
+        return [self.moves(idx) for idx in self.run_model(features)]
+
+    def predict_proba(self, features: np.ndarray) -> np.ndarray:
+        """(n, n_classes) class probabilities for a (n, n_features) batch."""
+        if self.backend == "numpy":
+            return self.model.predict_proba(features)
+        probabilities = self.sess.run(
+            ["output_probability"], {"input": features.astype(np.float32)}
+        )[0]
+        # The converted models emit one {class index: probability} map per row
+        n_classes = len(probabilities[0])
+        return np.array(
+            [[row[i] for i in range(n_classes)] for row in probabilities],
+            dtype=np.float32,
+        )
+
+    def classify(self, stomp: np.ndarray, trace: StompTrace = NULL_TRACE) -> str:
+        features = self.features(stomp)
+        trace.mark("features")
+        direction = self.predict(features.reshape(1, -1))[0]
+        trace.mark("inference")
+        return direction
 
 
 class LeftRightClassifier(MLPClassifier):
     """A classifier that returns left or right based on energy ratio."""
 
+    MODEL = "left_right"
     SUPER_BASIC_MOVES = ["left", "right"]
 
-    def __init__(self):
-        with open("models/mlp_left_right.onnx", "rb") as f:
-            onx = f.read()
-        self.sess = InferenceSession(onx, providers=["CPUExecutionProvider"])
-
     def moves(self, idx: int) -> str:
         return self.SUPER_BASIC_MOVES[idx]
 
 
 class FiveDirectionClassifier(MLPClassifier):
-    BASIC_MOVES = ["left", "right", "up", "down"]
-
-    def __init__(self):
-        with open("models/mlp_five_directions.onnx", "rb") as f:
-            onx = f.read()
-        self.sess = InferenceSession(onx, providers=["CPUExecutionProvider"])
+    MODEL = "five_directions"
+    # The shipped model was trained with "center" as a fifth class; its
+    # classes follow the order of dataset_builder.MOVES.
+    BASIC_MOVES = ["center", "left", "right", "up", "down"]
 
     def moves(self, idx: int) -> str:
         return self.BASIC_MOVES[idx]
 
 
 class ElevenDirectionClassifier(MLPClassifier):
+    MODEL = "all_moves"
     MOVES = [
         "center",
         "left",
@@ -88,10 +179,97 @@ class ElevenDirectionClassifier(MLPClassifier):
         "leftright",
     ]
 
-    def __init__(self):
-        with open("models/mlp_all_directions.onnx", "rb") as f:
-            onx = f.read()
-        self.sess = InferenceSession(onx, providers=["CPUExecutionProvider"])
-
     def moves(self, idx: int) -> str:
         return self.MOVES[idx]
+
+
+class EnergyRatioStage:
+    """Calls left or right from the channel energy ratio, without features.
+
+    Confidence is 1 - min(r, 1/r) for the left/right energy ratio r, so 0.8
+    needs one channel to carry 5x the energy of the other.
+    """
+
+    name = "energy_ratio"
+
+    def predict(self, stomp: np.ndarray, cache: dict) -> tuple[str, float]:
+        left_energy = float(np.sum(stomp[:, 0] ** 2))
+        right_energy = float(np.sum(stomp[:, 1] ** 2))
+        ratio = (left_energy + 1e-12) / (right_energy + 1e-12)
+        return ("left" if ratio > 1 else "right"), 1.0 - min(ratio, 1.0 / ratio)
+
+
+class MLPStage:
+    """An MLP classifier, with its top class probability as confidence.
+
+    Features are computed once per stomp and shared by all MLP stages that
+    use the same feature set.
+    """
+
+    def __init__(self, classifier: MLPClassifier):
+        self.classifier = classifier
+        self.name = classifier.MODEL
+
+    def predict(self, stomp: np.ndarray, cache: dict) -> tuple[str, float]:
+        key = ("features", self.classifier.feature_set)
+        if key not in cache:
+            cache[key] = self.classifier.features(stomp).reshape(1, -1)
+            cache["trace"].mark("features")
+        probabilities = self.classifier.predict_proba(cache[key])[0]
+        idx = int(np.argmax(probabilities))
+        cache["trace"].mark("inference")
+        return self.classifier.moves(idx), float(probabilities[idx])
+
+
+class CascadeClassifier:
+    """Runs cheap stages first and escalates only when they are unsure.
+
+    Each stage returns a direction and a confidence. The first stage whose
+    confidence reaches `threshold` decides; the last stage always does.
+    The default cascade tries the channel energy ratio before paying for
+    feature extraction and the five-direction model. Early stages should
+    only predict labels the final stage can, and `threshold` should be
+    checked against labelled recordings (e.g. with `batch.py`).
+    """
+
+    def __init__(self, stages=None, threshold: float = 0.8):
+        """
+        Args:
+            stages: Objects with a `name` and `predict(stomp, cache) ->
+                (direction, confidence)`, cheapest first. Defaults to
+                `EnergyRatioStage` then the five-direction MLP.
+            threshold: Confidence at which a stage's answer is accepted.
+        """
+        if stages is None:
+            stages = [EnergyRatioStage(), MLPStage(FiveDirectionClassifier())]
+        self.stages = stages
+        self.threshold = threshold
+
+        # Metrics
+        self.count = 0
+        self.total_time = 0.0
+        self.decided_by: Counter[str] = Counter()
+
+    def classify(self, stomp: np.ndarray, trace: StompTrace = NULL_TRACE) -> str:
+        start = time.perf_counter()
+        cache = {"trace": trace}
+        for stage in self.stages:
+            direction, confidence = stage.predict(stomp, cache)
+            if confidence >= self.threshold:
+                break
+        self.count += 1
+        self.total_time += time.perf_counter() - start
+        self.decided_by[stage.name] += 1
+        return direction
+
+    def stats(self) -> dict:
+        """Escalation rate and mean per-stomp cost so far."""
+        first = self.stages[0].name
+        return {
+            "stomps": self.count,
+            "decided_by": dict(self.decided_by),
+            "escalation_rate": 1 - self.decided_by[first] / self.count
+            if self.count
+            else 0.0,
+            "mean_ms": self.total_time / self.count * 1000 if self.count else 0.0,
+        }
@@ -1 +1,13 @@
 # This file exists to allow pytest to add the project root to sys.path
+import pytest
+
+import model_registry
+
+
+@pytest.fixture
+def registry(tmp_path, monkeypatch):
+    """`model_registry` with an empty session cache and its own cache directory."""
+    monkeypatch.setenv("STOMP_MODEL_CACHE", str(tmp_path / "cache"))
+    model_registry.clear()
+    yield model_registry
+    model_registry.clear()
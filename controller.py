@@ -1,41 +1,79 @@
-import pyautogui
+import queue
+import sys
+import threading
 import time
+from collections import deque
+from dataclasses import dataclass
 from typing import Protocol
 
+try:
+    import pyautogui
+except Exception as e:  # no display (e.g. headless replay); KeyError on X11
+    pyautogui = None  # type: ignore[assignment]
+    _pyautogui_error = e
+
+# Direction -> keys, for each player's controls
+ARROW_KEYS = {
+    "left": ["left"],
+    "right": ["right"],
+    "up": ["up"],
+    "down": ["down"],
+    "upleft": ["up", "left"],
+    "upright": ["up", "right"],
+    "downleft": ["down", "left"],
+    "downright": ["down", "right"],
+    "leftright": ["left", "right"],
+    "updown": ["up", "down"],
+    "center": [],  # No action
+}
+WASD_KEYS = {
+    direction: [{"left": "a", "right": "d", "up": "w", "down": "s"}[k] for k in keys]
+    for direction, keys in ARROW_KEYS.items()
+}
+KEY_MAPS = {"arrows": ARROW_KEYS, "wasd": WASD_KEYS}
+
 
 class InputController(Protocol):
     """Interface for controllers."""
 
-    def press(self, direction: str):
-        """Press the key(s) corresponding to the direction."""
+    def press(self, direction: str, captured_at: float | None = None):
+        """Press the key(s) corresponding to the direction.
+
+        `captured_at` is the `time.perf_counter()` time at which the audio
+        behind this press was captured, for controllers that measure latency.
+        """
         ...
 
 
 class KeyboardController:
     """Controls keyboard input based on detected directions."""
 
-    def __init__(self, verbose: bool = True, cooldown: float = 0.3):
+    def __init__(
+        self,
+        verbose: bool = True,
+        cooldown: float = 0.3,
+        key_map: dict[str, list[str]] | None = None,
+    ):
+        """
+        Args:
+            verbose: Print each key press.
+            cooldown: Minimum time between key presses (seconds).
+            key_map: Direction -> keys to press; defaults to the arrow keys.
+                See `KEY_MAPS` for presets.
+        """
         self.verbose = verbose
         self.cooldown = cooldown
         self.last_press_time = 0.0
+        if pyautogui is None:
+            raise RuntimeError(
+                f"Keyboard output is unavailable: {_pyautogui_error!r}"
+            ) from _pyautogui_error
         # Safety feature: fail-safe if mouse is in corner
         pyautogui.FAILSAFE = True
 
-        self.key_map = {
-            "left": ["left"],
-            "right": ["right"],
-            "up": ["up"],
-            "down": ["down"],
-            "upleft": ["up", "left"],
-            "upright": ["up", "right"],
-            "downleft": ["down", "left"],
-            "downright": ["down", "right"],
-            "leftright": ["left", "right"],
-            "updown": ["up", "down"],
-            "center": [],  # No action
-        }
+        self.key_map = KEY_MAPS["arrows"] if key_map is None else key_map
 
-    def press(self, direction: str):
+    def press(self, direction: str, captured_at: float | None = None):
         """Press the key(s) corresponding to the direction."""
         current_time = time.time()
         if current_time - self.last_press_time < self.cooldown:
@@ -56,18 +94,186 @@ class KeyboardController:
                 print(f"InputController: Unknown direction {direction}")
 
 
+@dataclass
+class KeyEvent:
+    """A key press travelling from the detection loop to the output worker.
+
+    All timestamps are `time.perf_counter()` seconds.
+    """
+
+    direction: str
+    keys: list[str]
+    captured_at: float
+    enqueued_at: float
+    emitted_at: float | None = None
+
+
+class AsyncKeyboardController(KeyboardController):
+    """Keyboard controller that emits key presses on a dedicated worker thread.
+
+    `press` only checks the cooldown and puts a `KeyEvent` on a queue, so the
+    detection loop never waits on pyautogui. Chords such as "upleft" are sent
+    as a single hotkey batch, with pyautogui's PAUSE disabled.
+    """
+
+    def __init__(
+        self,
+        verbose: bool = True,
+        cooldown: float = 0.3,
+        max_pending: int = 16,
+        history: int = 1000,
+        telemetry=None,
+        key_map: dict[str, list[str]] | None = None,
+    ):
+        """
+        Args:
+            verbose: Print each key press.
+            cooldown: Minimum time between key presses (seconds).
+            max_pending: Capacity of the output queue; presses beyond it
+                are dropped and counted in `dropped`.
+            history: Number of emitted events kept for `latency_stats`.
+            telemetry: Optional `telemetry.Telemetry`; each emitted press
+                records the "output" (enqueue to emit) and "end_to_end"
+                (capture to emit) stages.
+            key_map: Direction -> keys to press; defaults to the arrow keys.
+        """
+        super().__init__(verbose=verbose, cooldown=cooldown, key_map=key_map)
+        self.telemetry = telemetry
+        self._queue: queue.Queue[KeyEvent | None] = queue.Queue(maxsize=max_pending)
+        self.dropped = 0
+        self.failed = 0
+
+        # Recently emitted events, for latency measurements
+        self.emitted: deque[KeyEvent] = deque(maxlen=history)
+
+        self._worker = threading.Thread(
+            target=self._run, name="keyboard-output", daemon=True
+        )
+        self._worker.start()
+
+    def press(self, direction: str, captured_at: float | None = None):
+        """Queue the key(s) corresponding to the direction.
+
+        Args:
+            direction: Direction name, see `key_map`.
+            captured_at: `time.perf_counter()` time at which the audio that
+                produced this press was captured. Defaults to now.
+        """
+        now = time.perf_counter()
+        current_time = time.time()
+        if current_time - self.last_press_time < self.cooldown:
+            return
+
+        self.last_press_time = current_time
+
+        direction = direction.lower()
+        keys = self.key_map.get(direction)
+
+        if not keys:
+            if self.verbose and keys is None:
+                print(f"InputController: Unknown direction {direction}")
+            return
+
+        event = KeyEvent(
+            direction=direction,
+            keys=keys,
+            captured_at=now if captured_at is None else captured_at,
+            enqueued_at=now,
+        )
+        try:
+            self._queue.put_nowait(event)
+        except queue.Full:
+            self.dropped += 1
+
+    def close(self, timeout: float = 1.0):
+        """Flush pending key presses and stop the worker thread.
+
+        If the queue stays full for `timeout` seconds, the pending presses
+        are dropped instead, so closing never hangs on a stuck worker.
+        """
+        try:
+            self._queue.put(None, timeout=timeout)
+        except queue.Full:
+            while True:
+                try:
+                    self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                self.dropped += 1
+            self._queue.put_nowait(None)
+        self._worker.join(timeout)
+
+    def latency_stats(self) -> dict:
+        """Percentiles (ms) of capture->emit and enqueue->emit delays."""
+        # (capture -> emit, enqueue -> emit) of each emitted event
+        delays = [
+            (e.emitted_at - e.captured_at, e.emitted_at - e.enqueued_at)
+            for e in self.emitted
+            if e.emitted_at is not None
+        ]
+        if not delays:
+            return {}
+
+        def percentiles(values):
+            values = sorted(values)
+            return {
+                f"p{p}": values[min(len(values) - 1, int(p / 100 * len(values)))] * 1000
+                for p in (50, 95, 99)
+            }
+
+        return {
+            "count": len(delays),
+            "dropped": self.dropped,
+            "failed": self.failed,
+            "capture_to_emit_ms": percentiles([d[0] for d in delays]),
+            "enqueue_to_emit_ms": percentiles([d[1] for d in delays]),
+        }
+
+    def _run(self):
+        while True:
+            event = self._queue.get()
+            if event is None:
+                return
+
+            try:
+                pyautogui.hotkey(*event.keys, _pause=False)
+            except Exception as e:
+                # E.g. pyautogui's fail-safe, or a lost display: skip this
+                # press but keep serving the next ones
+                self.failed += 1
+                print(f"Warning: key press {event.keys} failed: {e!r}", file=sys.stderr)
+                continue
+            event.emitted_at = time.perf_counter()
+            self.emitted.append(event)
+            if self.telemetry is not None:
+                self.telemetry.record("output", event.emitted_at - event.enqueued_at)
+                self.telemetry.record(
+                    "end_to_end", event.emitted_at - event.captured_at
+                )
+
+            if self.verbose:
+                print(
+                    f"InputController: Pressed {event.keys} for '{event.direction}' "
+                    f"({(event.emitted_at - event.captured_at) * 1000:.1f} ms after capture)"
+                )
+
+
 class DummyController:
-    """Controls keyboard input based on detected directions."""
+    """Prints directions instead of pressing keys."""
 
-    def __init__(self, cooldown: float = 0.2):
+    def __init__(self, cooldown: float = 0.2, verbose: bool = True):
         self.cooldown = cooldown
+        self.verbose = verbose
         self.last_press_time = 0.0
+        self.presses = 0
 
-    def press(self, direction: str):
+    def press(self, direction: str, captured_at: float | None = None):
         """Press the key(s) corresponding to the direction."""
         current_time = time.time()
         if current_time - self.last_press_time < self.cooldown:
             return
 
         self.last_press_time = current_time
-        print(f"DummyController: Pressing '{direction}'")
+        self.presses += 1
+        if self.verbose:
+            print(f"DummyController: Pressing '{direction}'")
@@ -0,0 +1,346 @@
+"""Build the training feature matrix from a directory of labelled recordings.
+
+Each `NAME_move.wav` file is streamed through `StompDetector` to cut out
+individual stomps, and every stomp is turned into a feature vector. Files are
+processed in parallel, and per-file results are cached on disk keyed by the
+file's content hash and `CACHE_VERSION`, so only new or changed recordings
+are reprocessed. The consolidated X/y/metadata store loads in milliseconds:
+
+    python dataset_builder.py ./dataset --output ./dataset/features.npz
+
+    >>> X, y, metadata = load_dataset("./dataset/features.npz")
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+
+from features import extract_features_batch
+from file_stream import FileStream
+from stomp_detector import StompDetector
+
+MOVES = [
+    "center",
+    "left",
+    "right",
+    "up",
+    "down",
+    "downleft",
+    "downright",
+    "upleft",
+    "upright",
+    "updown",
+    "leftright",
+]
+
+SAMPLE_RATE = 16000
+WINDOW_MS = 200
+STEP_MS = 100
+ENERGY_THRESHOLD = 7.0
+
+# Bump whenever segmentation or feature extraction changes, so that cached
+# per-file results are recomputed.
+CACHE_VERSION = (
+    f"xcorr48-v3-sr{SAMPLE_RATE}-win{WINDOW_MS}-step{STEP_MS}-thr{ENERGY_THRESHOLD}"
+)
+
+
+def list_audio_files(base_path) -> list[Path]:
+    """List all WAV files under base_path whose name ends in a known move."""
+    audio_files = []
+    for root, _dirs, files in os.walk(base_path):
+        for file in files:
+            if file.endswith(".wav") and move_from_filename(file) in MOVES:
+                audio_files.append(Path(root) / file)
+    return sorted(audio_files)
+
+
+def move_from_filename(path) -> str:
+    """The move label of a `NAME_move.wav` file."""
+    return Path(path).stem.split("_")[-1]
+
+
+def file_hash(path, chunk_size: int = 1 << 20) -> str:
+    """SHA-256 of a file's contents."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        while chunk := f.read(chunk_size):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def segment_file(path) -> tuple[np.ndarray, np.ndarray]:
+    """Stream a recording through StompDetector.
+
+    Returns:
+        (n, T, 2) stomps, and the frame (at `SAMPLE_RATE`) where each stomp
+        window starts in the recording. Windows that start before the
+        recording, padded with silence, have negative offsets.
+    """
+    step_frames = int((STEP_MS / 1000.0) * SAMPLE_RATE)
+
+    detector = StompDetector(sr=SAMPLE_RATE, energy_threshold=ENERGY_THRESHOLD)
+    stomps, offsets = [], []
+
+    with FileStream(str(path), step_frames, target_sr=SAMPLE_RATE) as stream:
+        while not stream.finished:
+            chunk, _overflow = stream.read(step_frames)
+            found = detector.process(chunk)
+            stomps.extend(found)
+            offsets.extend([detector.frames_seen - detector.window_len] * len(found))
+
+    return _stack(stomps, offsets)
+
+
+def _stack(stomps, offsets) -> tuple[np.ndarray, np.ndarray]:
+    window_frames = int((WINDOW_MS / 1000.0) * SAMPLE_RATE)
+    if not stomps:
+        stacked = np.empty((0, window_frames, 2), dtype=np.float32)
+    else:
+        stacked = np.stack(stomps).astype(np.float32)
+    return stacked, np.array(offsets, dtype=np.int64)
+
+
+class StompSegmenter:
+    """Cuts stomps out of a live stream the way `segment_file` cuts them
+    out of the recording of that stream.
+
+    Blocks at the device rate are resampled to `SAMPLE_RATE` as they arrive
+    and fed to the detector in `STEP_MS` chunks, as `segment_file` reads
+    them from a `FileStream`, so `finish` returns the same stomps and
+    offsets `segment_file` would find in a WAV file of the blocks.
+    """
+
+    def __init__(self, sr: int, channels: int = 2):
+        self.channels = channels
+        self.step_frames = int((STEP_MS / 1000.0) * SAMPLE_RATE)
+        self.window_frames = int((WINDOW_MS / 1000.0) * SAMPLE_RATE)
+        self.detector = StompDetector(sr=SAMPLE_RATE, energy_threshold=ENERGY_THRESHOLD)
+        self.resampler = None
+        if sr != SAMPLE_RATE:
+            from resample import StreamingResampler
+
+            self.resampler = StreamingResampler(sr, SAMPLE_RATE, channels)
+        self.stomps: list[np.ndarray] = []
+        self.offsets: list[int] = []
+        self._buffer = np.empty((0, channels), np.float32)
+
+    def process(self, block: np.ndarray) -> int:
+        """Push a (frames, channels) block; returns the number of new stomps."""
+        if self.resampler is not None:
+            block = self.resampler.process(block)
+        return self._push(block)
+
+    def finish(self) -> tuple[np.ndarray, np.ndarray]:
+        """Flush the end of the stream; returns all stomps and their offsets."""
+        if self.resampler is not None:
+            # The rest of the output, as if the stream ended in silence
+            self._push(self.resampler.pending())
+        if len(self._buffer):
+            # The last chunk is zero-padded, like FileStream's
+            padding = np.zeros(
+                (self.step_frames - len(self._buffer), self.channels), np.float32
+            )
+            self._detect(np.concatenate([self._buffer, padding]))
+            self._buffer = self._buffer[:0]
+
+        return _stack(self.stomps, self.offsets)
+
+    def _push(self, block: np.ndarray) -> int:
+        before = len(self.stomps)
+        buffered = np.concatenate([self._buffer, block.astype(np.float32)])
+        n = len(buffered) - len(buffered) % self.step_frames
+        for i in range(0, n, self.step_frames):
+            self._detect(buffered[i : i + self.step_frames])
+        self._buffer = buffered[n:]
+        return len(self.stomps) - before
+
+    def _detect(self, chunk: np.ndarray) -> None:
+        if chunk.shape[1] == 1:
+            chunk = np.repeat(chunk, 2, axis=1)
+        found = self.detector.process(chunk)
+        self.stomps.extend(found)
+        offset = self.detector.frames_seen - self.detector.window_len
+        self.offsets.extend([offset] * len(found))
+
+
+def cache_path(path, cache_dir) -> Path:
+    """Cache entry of a recording's current contents."""
+    return Path(cache_dir) / f"{file_hash(path)}-{CACHE_VERSION}.npz"
+
+
+def store_stomps(
+    entry_path: Path, stomps: np.ndarray, offsets: np.ndarray
+) -> dict[str, np.ndarray]:
+    """Featurize a recording's stomps and store them as its cache entry.
+
+    With `entry_path` from `cache_path`, `build_dataset` then picks them up
+    without segmenting the recording again.
+    """
+    if len(stomps):
+        features = extract_features_batch(stomps, SAMPLE_RATE)
+    else:
+        features = np.empty((0, 48), dtype=np.float32)
+    entry = {"stomps": stomps, "offsets": offsets, "features": features}
+
+    # Write atomically so an interrupted build never leaves a corrupt entry
+    entry_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = entry_path.with_suffix(f".{os.getpid()}.tmp.npz")
+    np.savez(tmp_path, **entry)
+    os.replace(tmp_path, entry_path)
+    return entry
+
+
+def process_file(path, cache_dir) -> tuple[dict[str, np.ndarray], bool]:
+    """Segment and featurize one file, using the on-disk cache if possible.
+
+    Returns the cache entry (`stomps`, `features`) and whether it was a
+    cache hit.
+    """
+    entry_path = cache_path(path, cache_dir)
+    if entry_path.exists():
+        with np.load(entry_path) as entry:
+            return dict(entry), True
+
+    return store_stomps(entry_path, *segment_file(path)), False
+
+
+def _process_file_safe(args):
+    path, cache_dir = args
+    try:
+        return process_file(path, cache_dir)
+    except Exception as e:
+        return e
+
+
+def build_dataset(base_path, output=None, cache_dir=None, workers=None) -> dict:
+    """Build (or refresh) the consolidated dataset store.
+
+    Args:
+        base_path: Directory searched recursively for `NAME_move.wav` files.
+        output: Path of the consolidated `.npz` store. Defaults to
+            `<base_path>/features.npz`.
+        cache_dir: Per-file cache directory. Defaults to
+            `<base_path>/.stomp_cache`.
+        workers: Number of worker processes (default: CPU count). With 1,
+            files are processed in this process.
+
+    Returns:
+        The consolidated store as a dict of arrays (see `load_dataset`).
+    """
+    base_path = Path(base_path)
+    output = Path(output) if output else base_path / "features.npz"
+    cache_dir = Path(cache_dir) if cache_dir else base_path / ".stomp_cache"
+    cache_dir.mkdir(parents=True, exist_ok=True)
+
+    audio_files = list_audio_files(base_path)
+    jobs = [(path, cache_dir) for path in audio_files]
+
+    start = time.perf_counter()
+    if workers == 1:
+        results = list(map(_process_file_safe, jobs))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(_process_file_safe, jobs))
+    elapsed = time.perf_counter() - start
+
+    X, y, files, moves, n_samples = [], [], [], [], []
+    stomp_idx: list[int] = []
+    cached = 0
+    for path, result in zip(audio_files, results):
+        if isinstance(result, Exception):
+            print(f"Skipping {path} due to error: {result}", file=sys.stderr)
+            continue
+
+        entry, hit = result
+        cached += hit
+        n = len(entry["features"])
+        if n == 0:
+            print(f"Warning: no stomps detected in {path}", file=sys.stderr)
+            continue
+
+        move = move_from_filename(path)
+        X.append(entry["features"])
+        y.extend([MOVES.index(move)] * n)
+        files.extend([path.name] * n)
+        moves.extend([move] * n)
+        stomp_idx.extend(range(n))
+        n_samples.extend([entry["stomps"].shape[1]] * n)
+
+    store = {
+        "X": np.concatenate(X) if X else np.empty((0, 48), dtype=np.float32),
+        "y": np.array(y, dtype=np.int64),
+        # Not "file": that would clash with np.savez's own argument
+        "filename": np.array(files, dtype=str),
+        "move": np.array(moves, dtype=str),
+        "stomp_idx": np.array(stomp_idx, dtype=np.int64),
+        "n_samples": np.array(n_samples, dtype=np.int64),
+    }
+    np.savez(output, allow_pickle=False, **store)
+
+    print(
+        f"{len(audio_files)} files ({cached} cached, {len(audio_files) - cached} "
+        f"processed) -> {len(store['y'])} stomps in {elapsed:.1f}s; wrote {output}"
+    )
+    return store
+
+
+def load_dataset(path):
+    """Load a consolidated store as (X, y, metadata DataFrame)."""
+    import pandas as pd
+
+    with np.load(path) as store:
+        metadata = pd.DataFrame(
+            {
+                "file": store["filename"],
+                "move": store["move"],
+                "stomp_idx": store["stomp_idx"],
+                "n_samples": store["n_samples"],
+            }
+        )
+        return store["X"], store["y"], metadata
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Build the stomp feature dataset from labelled recordings."
+    )
+    parser.add_argument(
+        "base_path", type=Path, help="Directory containing NAME_move.wav files."
+    )
+    parser.add_argument(
+        "--output",
+        type=Path,
+        default=None,
+        help="Consolidated store to write (default: <base_path>/features.npz).",
+    )
+    parser.add_argument(
+        "--cache-dir",
+        type=Path,
+        default=None,
+        help="Per-file cache directory (default: <base_path>/.stomp_cache).",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="Number of worker processes (default: CPU count).",
+    )
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    build_dataset(args.base_path, args.output, args.cache_dir, args.workers)
+
+
+if __name__ == "__main__":
+    main()
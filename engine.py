@@ -0,0 +1,347 @@
+"""Several inputs (dance pads / mic pairs) in one process, sharing one model.
+
+Each input gets its own `StompPipeline`: a capture ring, a `StompDetector`
+and a controller with its own key map. The inputs share one classifier
+through a `MicroBatcher`. Each pipeline's classify thread submits its stomp
+and waits. The batcher's thread extracts features for all pending stomps in
+one vectorized call, then runs them through the shared ONNX session in a
+single `sess.run`. After the first stomp arrives, the batcher waits at most
+`max_wait_ms` for others. It stops waiting as soon as every input has a
+stomp pending, so a single player never waits at all:
+
+    python engine.py --input 1 --input 3:wasd
+"""
+
+from __future__ import annotations
+
+import argparse
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from contextlib import ExitStack
+
+import numpy as np
+
+from pipeline import DROP_POLICIES, DropPolicy, StompPipeline
+from stomp_detector import StompDetector
+from telemetry import NULL_TRACE, StompTrace, Telemetry
+
+
+class MicroBatcher:
+    """Classifies stomps from many threads in batched model runs.
+
+    Wraps an `MLPClassifier` (anything with `features_batch(stomps)` and
+    `predict(features)`) and has the `classify(stomp, trace)` interface, so
+    it can stand in for the classifier of any number of pipelines. Traces
+    get a "batch_wait" mark for the time a stomp waited for its batch.
+    """
+
+    def __init__(self, classifier, max_batch: int = 8, max_wait_ms: float = 2.0):
+        """
+        Args:
+            classifier: Classifier that featurizes and predicts in batches.
+            max_batch: Largest batch; a batch this size runs immediately.
+            max_wait_ms: Longest time the oldest pending stomp waits for the
+                batch to fill.
+        """
+        self.classifier = classifier
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000.0
+
+        # (stomp, trace, enqueued_at, future) per pending stomp
+        self._pending: deque[tuple[np.ndarray, StompTrace, float, Future]] = deque()
+        self._cond = threading.Condition()
+        self._closed = False
+
+        # Metrics
+        self.batches = 0
+        self.stomps = 0
+        self.largest_batch = 0
+
+        self._worker = threading.Thread(
+            target=self._run, name="batch-inference", daemon=True
+        )
+        self._worker.start()
+
+    def classify(self, stomp: np.ndarray, trace: StompTrace = NULL_TRACE) -> str:
+        """Classify one stomp, blocking until its batch has run."""
+        future: Future[str] = Future()
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("MicroBatcher is closed")
+            self._pending.append((stomp, trace, time.perf_counter(), future))
+            self._cond.notify_all()
+        return future.result()
+
+    def close(self, timeout: float = 1.0) -> None:
+        """Run the remaining pending stomps and stop the worker thread."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        self._worker.join(timeout)
+
+    def metrics(self) -> dict:
+        return {
+            "batches": self.batches,
+            "stomps": self.stomps,
+            "mean_batch": self.stomps / self.batches if self.batches else 0.0,
+            "largest_batch": self.largest_batch,
+        }
+
+    def _next_batch(self) -> list[tuple[np.ndarray, StompTrace, float, Future]]:
+        with self._cond:
+            self._cond.wait_for(lambda: self._pending or self._closed)
+            deadline = self._pending[0][2] + self.max_wait if self._pending else 0.0
+            while len(self._pending) < self.max_batch and not self._closed:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+            n = min(self.max_batch, len(self._pending))
+            return [self._pending.popleft() for _ in range(n)]
+
+    def _run(self) -> None:
+        while True:
+            batch = self._next_batch()
+            if not batch:
+                return  # Closed and drained
+
+            stomps, traces, _, futures = zip(*batch)
+            for trace in traces:
+                trace.mark("batch_wait")
+            try:
+                features = self.classifier.features_batch(list(stomps))
+                for trace in traces:
+                    trace.mark("features")
+                directions = self.classifier.predict(features)
+                for trace in traces:
+                    trace.mark("inference")
+            except Exception as e:
+                for future in futures:
+                    future.set_exception(e)
+                continue
+
+            self.batches += 1
+            self.stomps += len(batch)
+            self.largest_batch = max(self.largest_batch, len(batch))
+            for future, direction in zip(futures, directions):
+                future.set_result(direction)
+
+
+class MultiInputEngine:
+    """One `StompPipeline` per input, all classified by one `MicroBatcher`."""
+
+    def __init__(
+        self,
+        classifier,
+        max_wait_ms: float = 2.0,
+        hop_ms: float = 100,
+        threshold: float = 7.0,
+        cooldown_ms: float = 300,
+        low_latency: bool = False,
+        queue_size: int = 8,
+        policy: DropPolicy = "drop_oldest",
+        telemetry: Telemetry | None = None,
+    ):
+        """
+        Args:
+            classifier: Shared classifier, see `MicroBatcher`.
+            max_wait_ms: Longest time a stomp waits for its batch to fill.
+            hop_ms: Detection hop (ms) of every input.
+            threshold: Detector energy threshold (multiple of the noise floor).
+            cooldown_ms: Minimum time between stomps of one input (ms).
+            low_latency: Use the detectors' low-latency mode.
+            queue_size: Capacity of each pipeline stage queue.
+            policy: What a full pipeline stage queue does with new items.
+            telemetry: Shared by all inputs; stage latencies are pooled and
+                counters are prefixed with the input's name.
+        """
+        self.batcher = MicroBatcher(classifier, max_batch=1, max_wait_ms=max_wait_ms)
+        self.hop_ms = hop_ms
+        self.threshold = threshold
+        self.cooldown_ms = cooldown_ms
+        self.low_latency = low_latency
+        self.queue_size = queue_size
+        self.policy = policy
+        self.telemetry = telemetry if telemetry is not None else Telemetry(False)
+        self.pipelines: dict[str, StompPipeline] = {}
+
+    def add_input(
+        self, name: str, controller, sr: int, channels: int = 2
+    ) -> StompPipeline:
+        """Add an input; feed its audio to the returned pipeline's `callback`."""
+        step_frames = int((self.hop_ms / 1000.0) * sr)
+        detector = StompDetector(
+            sr=sr,
+            energy_threshold=self.threshold,
+            cooldown_ms=self.cooldown_ms,
+            incremental=True,
+            low_latency=self.low_latency,
+            telemetry=self.telemetry,
+        )
+        pipeline = StompPipeline(
+            detector,
+            self.batcher,
+            controller,
+            sr=sr,
+            window_frames=detector.window_len,
+            step_frames=step_frames,
+            channels=channels,
+            queue_size=self.queue_size,
+            policy=self.policy,
+            telemetry=self.telemetry,
+            name=name,
+        )
+        self.pipelines[name] = pipeline
+        # Each input has at most one stomp in classification at a time, so a
+        # batch with one stomp per input is as full as it can get.
+        self.batcher.max_batch = len(self.pipelines)
+        return pipeline
+
+    def start(self) -> None:
+        for pipeline in self.pipelines.values():
+            pipeline.start()
+
+    def stop(self) -> None:
+        for pipeline in self.pipelines.values():
+            pipeline.stop()
+        self.batcher.close()
+
+    def metrics(self) -> dict:
+        return {
+            "batching": self.batcher.metrics(),
+            **{name: p.metrics() for name, p in self.pipelines.items()},
+        }
+
+
+def parse_input(spec: str) -> tuple[int | None, str]:
+    """`DEVICE[:KEYMAP]` -> (device index or None for default, key map name)."""
+    device, _, key_map = spec.partition(":")
+    return (int(device) if device else None), key_map or "arrows"
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Run several stomp inputs in one process with a shared classifier."
+    )
+    parser.add_argument(
+        "--input",
+        action="append",
+        required=True,
+        metavar="DEVICE[:KEYMAP]",
+        help="Audio input device index and key map (arrows, wasd); repeat per player.",
+    )
+    parser.add_argument(
+        "--max-wait-ms",
+        type=float,
+        default=2.0,
+        help="Longest time a stomp waits for others to batch with (default: 2)",
+    )
+    parser.add_argument("--hop-ms", type=float, default=None)
+    parser.add_argument("--threshold", type=float, default=7.0)
+    parser.add_argument("--cooldown-ms", type=float, default=300)
+    parser.add_argument("--low-latency", action="store_true")
+    parser.add_argument(
+        "--queue-size", type=int, default=8, help="Capacity of each stage queue"
+    )
+    parser.add_argument("--drop-policy", choices=DROP_POLICIES, default="drop_oldest")
+    parser.add_argument(
+        "--recalibrate",
+        action="store_true",
+        help="Measure background noise again instead of using cached calibrations",
+    )
+    parser.add_argument("--telemetry", type=str, default=None)
+    parser.add_argument("--telemetry-interval", type=float, default=10.0)
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+
+    import sounddevice as sd  # type: ignore
+    from classifier import FiveDirectionClassifier
+    from controller import KEY_MAPS, AsyncKeyboardController
+    from calibration import CalibrationMonitor
+    from main import load_or_calibrate, query_device_name, query_sample_rate
+
+    telemetry = Telemetry(enabled=args.telemetry is not None)
+    if args.telemetry is not None:
+        telemetry.start_export(args.telemetry, args.telemetry_interval)
+
+    engine = MultiInputEngine(
+        FiveDirectionClassifier(),
+        max_wait_ms=args.max_wait_ms,
+        hop_ms=args.hop_ms or (10 if args.low_latency else 100),
+        threshold=args.threshold,
+        cooldown_ms=args.cooldown_ms,
+        low_latency=args.low_latency,
+        queue_size=args.queue_size,
+        policy=args.drop_policy,
+        telemetry=telemetry,
+    )
+
+    with ExitStack() as stack:
+        for i, spec in enumerate(args.input):
+            device, key_map = parse_input(spec)
+            sr = query_sample_rate(device)
+            controller = AsyncKeyboardController(
+                key_map=KEY_MAPS[key_map], telemetry=telemetry
+            )
+            stack.callback(controller.close)
+            pipeline = engine.add_input(f"p{i + 1}", controller, sr)
+            print(f"Player {i + 1}: device {device}, SR {sr}, keys {key_map}")
+            stack.enter_context(
+                sd.InputStream(
+                    samplerate=sr,
+                    blocksize=pipeline.step_frames,
+                    device=device,
+                    channels=2,
+                    dtype="float32",
+                    callback=pipeline.callback,
+                )
+            )
+
+        # Inputs without a cached calibration are calibrated over the same
+        # few seconds of silence
+        monitors = []
+        threads = []
+        for (device, _key_map), pipeline in zip(
+            map(parse_input, args.input), engine.pipelines.values()
+        ):
+
+            def run(pipeline=pipeline, device=device):
+                profile = load_or_calibrate(
+                    pipeline,
+                    pipeline.step_frames,
+                    pipeline.sr,
+                    query_device_name(device),
+                    pipeline.detector,
+                    recalibrate=args.recalibrate,
+                )
+                monitors.append(CalibrationMonitor(profile, pipeline.detector))
+
+            threads.append(threading.Thread(target=run))
+            threads[-1].start()
+        for thread in threads:
+            thread.join()
+
+        engine.start()
+        for monitor in monitors:
+            monitor.start()
+        print("Listening... Press Ctrl+C to stop.")
+        try:
+            while True:
+                time.sleep(1.0)
+        except KeyboardInterrupt:
+            print("\nStopping...")
+        finally:
+            for monitor in monitors:
+                monitor.stop()
+            engine.stop()
+            print(f"Engine metrics: {engine.metrics()}")
+            telemetry.stop()
+
+
+if __name__ == "__main__":
+    main()
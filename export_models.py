@@ -0,0 +1,333 @@
+"""Export the direction models as optimized, optionally int8, ONNX files.
+
+Each model is read from a registry name (the shipped skl2onnx graph), an
+`.onnx` file, or a scikit-learn scaler + MLP pipeline saved with joblib by
+the notebook. It is then written as:
+
+- `<name>.onnx`: the scaler folded into the first layer's weights, and
+  onnxruntime's basic graph optimizations applied offline, which turn each
+  MatMul + Add into one Gemm. It runs on both backends.
+- `<name>.int8.onnx` (with `--int8`): the same graph with the weights of
+  every layer after the first quantized to int8, and activations quantized
+  on the fly (onnxruntime dynamic quantization). The first layer stays
+  float: its inputs are the raw features, whose columns differ by orders
+  of magnitude, so quantizing them per tensor would erase the small ones.
+  Extended optimizations fuse the quantization into the matrix products;
+  int8 models run on onnxruntime only, not the NumPy backend.
+
+The float and int8 models are compared with the source in `report.json`
+and a printed table. The table gives file size, session load time, and
+inference latency for one row and per row in batches of 256. It also gives
+agreement with the source model's predictions on a held-out set, and
+accuracy against the labels. With `--dataset`, the held-out set is the
+stomp dataset's test split (the same split `feature_search.py` uses).
+Without it, rows are drawn around the scaler's mean, and only agreement is
+reported.
+
+    python export_models.py                       # the three registry models
+    python export_models.py five_directions --int8 --dataset ./recordings/stomps
+    python export_models.py mlp_basic.joblib --feature-set rms_zcr+xcorr --int8
+
+Copy an exported file over the model in `models/` to use it.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+import model_registry
+from classifier import (
+    ElevenDirectionClassifier,
+    FiveDirectionClassifier,
+    LeftRightClassifier,
+)
+from dataset_builder import MOVES
+from features import DEFAULT_FEATURE_SET, extract_features_batch, feature_columns
+from numpy_mlp import NumpyMLP, from_onnx
+
+# Class labels of a model, by its number of classes
+MODEL_MOVES = {
+    2: LeftRightClassifier.SUPER_BASIC_MOVES,
+    5: FiveDirectionClassifier.BASIC_MOVES,
+    11: ElevenDirectionClassifier.MOVES,
+}
+
+
+def load_model(source: str, feature_set: str = DEFAULT_FEATURE_SET):
+    """(name, model, ONNX path or None) of a registry name or model file.
+
+    Args:
+        feature_set: Feature set of a joblib pipeline; ONNX models declare
+            their own.
+    """
+    if source in model_registry.MODELS:
+        path = model_registry.model_path(source)
+        return path.stem, from_onnx(path), path
+    path = Path(source)
+    if path.suffix == ".onnx":
+        return path.stem, from_onnx(path), path
+
+    import joblib
+
+    pipeline = joblib.load(path)
+    # The notebook's models are grid searches over pipelines
+    pipeline = getattr(pipeline, "best_estimator_", pipeline)
+    return path.stem, NumpyMLP.from_sklearn(pipeline, feature_set), None
+
+
+def optimize(source: Path, output: Path, level: str = "basic") -> None:
+    """Save the graph onnxruntime's optimizations make of `source`.
+
+    Basic optimizations (constant folding, MatMul + Add -> Gemm) keep to
+    standard ONNX operators, which `numpy_mlp.from_onnx` can read too.
+    Extended ones also fuse into onnxruntime's own operators; they leave
+    out hardware-specific layout transforms, so the graph stays portable.
+    """
+    import onnxruntime as ort
+
+    levels = {
+        "basic": ort.GraphOptimizationLevel.ORT_ENABLE_BASIC,
+        "extended": ort.GraphOptimizationLevel.ORT_ENABLE_EXTENDED,
+    }
+    options = model_registry.session_options()
+    options.graph_optimization_level = levels[level]
+    options.optimized_model_filepath = str(output)
+    ort.InferenceSession(str(source), options, providers=["CPUExecutionProvider"])
+
+
+def export(model: NumpyMLP, name: str, output_dir: Path, int8: bool) -> dict:
+    """Write the float (and int8) exports of `model`; returns their paths."""
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+    output_dir.mkdir(parents=True, exist_ok=True)
+    paths = {"float": output_dir / f"{name}.onnx"}
+    with tempfile.TemporaryDirectory() as tmp:
+        folded = Path(tmp) / "folded.onnx"
+        model.to_onnx(folded, fold_scaler=True)
+        optimize(folded, paths["float"])
+        if int8:
+            quantized = Path(tmp) / "int8.onnx"
+            quantize_dynamic(
+                folded,
+                quantized,
+                weight_type=QuantType.QInt8,
+                nodes_to_exclude=["MatMul0"],
+            )
+            paths["int8"] = output_dir / f"{name}.int8.onnx"
+            optimize(quantized, paths["int8"], "extended")
+    return paths
+
+
+def held_out(
+    model: NumpyMLP,
+    dataset=None,
+    moves=None,
+    test_size: float = 0.2,
+    seed: int = 42,
+    n: int = 2000,
+):
+    """(features, labels) to compare the exports on.
+
+    With a `stomp_dataset.StompDataset`, its test split of `moves`; the
+    labels are indices in `moves`, which default to the shipped model's
+    with as many classes. Otherwise `n` rows drawn around the scaler's
+    mean, with no labels.
+    """
+    if dataset is None:
+        rng = np.random.default_rng(seed)
+        rows = rng.standard_normal((n, model.n_features)).astype(np.float32)
+        return rows / model.scale + model.offset, None
+
+    moves = moves or MODEL_MOVES.get(len(model.classes))
+    if moves is None:
+        raise ValueError(f"No default moves for {len(model.classes)} classes")
+    labels = dataset.labels(moves)
+    _, test = dataset.split(dataset.select(moves=moves), test_size, seed, by=labels)
+    if model.feature_set == DEFAULT_FEATURE_SET:
+        X = dataset.X[test]
+    else:
+        X = extract_features_batch(
+            dataset.audio(test), dataset.sample_rate, feature_set=model.feature_set
+        )
+    return X, labels[test]
+
+
+def measure(path: Path, X: np.ndarray, loads: int = 5, runs: int = 1000) -> dict:
+    """Size, load time, latency and outputs of the model at `path`."""
+    import onnxruntime as ort
+
+    load_ms = []
+    for _ in range(loads):
+        start = time.perf_counter()
+        sess = model_registry.load_session(path, use_cache=False)
+        load_ms.append((time.perf_counter() - start) * 1000)
+
+    row = X[:1].astype(np.float32)
+    batch = np.resize(X, (256, X.shape[1])).astype(np.float32)
+    for _ in range(50):
+        sess.run(["output_label"], {"input": row})
+    best = batch_best = float("inf")
+    for _ in range(3):
+        start = time.perf_counter()
+        for _ in range(runs):
+            sess.run(["output_label"], {"input": row})
+        best = min(best, (time.perf_counter() - start) / runs)
+        start = time.perf_counter()
+        for _ in range(runs // 100):
+            sess.run(["output_label"], {"input": batch})
+        batch_best = min(batch_best, (time.perf_counter() - start) / (runs // 100))
+
+    labels, maps = sess.run(None, {"input": X.astype(np.float32)})
+    classes = sorted(maps[0]) if len(maps) else []
+    probabilities = np.array([[m[c] for c in classes] for m in maps])
+    return {
+        "path": str(path),
+        "size_kib": os.path.getsize(path) / 1024,
+        "load_ms": float(np.median(load_ms)),
+        "latency_us": best * 1e6,
+        "batch_us_per_row": batch_best / len(batch) * 1e6,
+        "labels": labels,
+        "probabilities": probabilities,
+        "ort_version": ort.__version__,
+    }
+
+
+def compare(reference: dict, result: dict, y=None) -> dict:
+    """`result` without its outputs, plus their agreement with `reference`."""
+    report = {k: v for k, v in result.items() if k not in ("labels", "probabilities")}
+    report["agreement"] = float(np.mean(result["labels"] == reference["labels"]))
+    report["max_probability_delta"] = float(
+        np.max(np.abs(result["probabilities"] - reference["probabilities"]), initial=0)
+    )
+    if y is not None:
+        report["accuracy"] = float(np.mean(result["labels"] == y))
+        report["accuracy_delta"] = report["accuracy"] - float(
+            np.mean(reference["labels"] == y)
+        )
+    return report
+
+
+def export_and_compare(
+    source: str,
+    output_dir: Path,
+    int8: bool = False,
+    dataset=None,
+    moves=None,
+    feature_set: str = DEFAULT_FEATURE_SET,
+    test_size: float = 0.2,
+    seed: int = 42,
+) -> list[dict]:
+    """Export one model (see `load_model`) and report on each variant.
+
+    The variants are compared with the source model, or with the float
+    export when the source is a pipeline, on `held_out` features.
+    """
+    name, model, source_path = load_model(source, feature_set)
+    paths = export(model, name, output_dir, int8)
+    X, y = held_out(model, dataset, moves, test_size, seed)
+
+    results = {"source": measure(source_path, X)} if source_path else {}
+    results.update({variant: measure(path, X) for variant, path in paths.items()})
+    reference = next(iter(results.values()))
+    return [
+        {"model": name, "variant": variant, **compare(reference, result, y)}
+        for variant, result in results.items()
+    ]
+
+
+def print_report(reports: list[dict]) -> None:
+    print(
+        f"{'model':<22} {'variant':<8} {'KiB':>7} {'load ms':>8} {'us/row':>7} "
+        f"{'us/row@256':>10} {'agree':>7} {'accuracy':>8} {'delta':>7}"
+    )
+    for r in reports:
+        accuracy = f"{r['accuracy']:>8.4f}" if "accuracy" in r else f"{'-':>8}"
+        delta = f"{r['accuracy_delta']:>+7.4f}" if "accuracy" in r else f"{'-':>7}"
+        print(
+            f"{r['model']:<22} {r['variant']:<8} {r['size_kib']:>7.1f} "
+            f"{r['load_ms']:>8.2f} {r['latency_us']:>7.1f} "
+            f"{r['batch_us_per_row']:>10.2f} {r['agreement']:>7.4f} {accuracy} {delta}"
+        )
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Export the direction models as optimized (and int8) ONNX."
+    )
+    parser.add_argument(
+        "models",
+        nargs="*",
+        default=list(model_registry.MODELS),
+        help="Registry model names, .onnx files or joblib-saved sklearn "
+        "pipelines (default: every registry model).",
+    )
+    parser.add_argument(
+        "--output-dir",
+        type=Path,
+        default=Path("models/optimized"),
+        help="Where to write the exports and report.json (default: models/optimized).",
+    )
+    parser.add_argument(
+        "--int8", action="store_true", help="Also write int8 dynamic-quantized models."
+    )
+    parser.add_argument(
+        "--dataset",
+        type=Path,
+        default=None,
+        help="Stomp dataset (stomp_dataset.py) whose test split is the held-out set.",
+    )
+    parser.add_argument(
+        "--moves",
+        nargs="+",
+        choices=MOVES,
+        default=None,
+        help="Class labels of the models, in output order "
+        "(default: the shipped model with as many classes).",
+    )
+    parser.add_argument(
+        "--feature-set",
+        default=DEFAULT_FEATURE_SET,
+        help="Feature set of joblib pipelines (default: %(default)s).",
+    )
+    parser.add_argument("--test-size", type=float, default=0.2)
+    parser.add_argument("--seed", type=int, default=42)
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    feature_columns(args.feature_set)  # Fail early on an unknown set
+    dataset = None
+    if args.dataset:
+        from stomp_dataset import StompDataset
+
+        dataset = StompDataset(args.dataset)
+
+    reports = []
+    for source in args.models:
+        reports += export_and_compare(
+            source,
+            args.output_dir,
+            args.int8,
+            dataset,
+            args.moves,
+            args.feature_set,
+            args.test_size,
+            args.seed,
+        )
+
+    print_report(reports)
+    report_path = args.output_dir / "report.json"
+    report_path.write_text(json.dumps(reports, indent=2) + "\n")
+    print(f"Wrote {report_path}")
+
+
+if __name__ == "__main__":
+    main()
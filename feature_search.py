@@ -0,0 +1,267 @@
+"""Accuracy vs. per-stomp extraction cost of candidate feature sets.
+
+For each feature set (see `features.feature_columns`), trains the
+notebook's scaler + MLP on the training split of a `stomp_dataset` and
+reports its test accuracy next to the time `extract_feature_set` takes for
+one stomp, broken down by feature group:
+
+    python feature_search.py ./dataset/stomps
+    python feature_search.py ./dataset/stomps --moves left right \\
+        --sets xcorr48 rms_zcr+xcorr xcorr
+
+The features of every group are extracted once, and each set's columns are
+taken from them. Sets on the accuracy/cost frontier (no cheaper set is as
+accurate) are marked with "*". `--export SET PATH` saves the model trained
+on SET as ONNX, with its feature set in the metadata, so dropping it in
+`models/` makes the classifier compute only those features.
+"""
+
+from __future__ import annotations
+
+import argparse
+import itertools
+import time
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+
+from dataset_builder import MOVES
+from features import (
+    DEFAULT_FEATURE_SET,
+    FEATURE_GROUPS,
+    extract_feature_set,
+    extract_features_batch,
+    feature_columns,
+)
+from stomp_dataset import StompDataset
+
+
+def candidate_sets() -> list[str]:
+    """The default feature set and every combination of feature groups."""
+    groups = list(FEATURE_GROUPS)
+    combinations = [
+        "+".join(combination)
+        for n in range(len(groups), 0, -1)
+        for combination in itertools.combinations(groups, n)
+    ]
+    return [DEFAULT_FEATURE_SET] + combinations
+
+
+def extraction_costs(
+    stomps: np.ndarray, feature_sets: list[str], sr: int, repeats: int = 5
+) -> dict[str, tuple[float, dict[str, float]]]:
+    """Per-stomp milliseconds to extract each feature set from each of
+    `stomps` in turn, and the share of each feature group (and the STFT).
+
+    The sets take turns over `repeats` rounds and each keeps its fastest
+    pass, so load on a busy machine neither favours nor penalizes any.
+    """
+    costs: dict[str, tuple[float, dict[str, float]]] = {}
+    for _ in range(repeats):
+        for feature_set in feature_sets:
+            timings: dict[str, float] = {}
+            start = time.perf_counter()
+            for stomp in stomps:
+                extract_feature_set(stomp, feature_set, sr, timings=timings)
+            ms = (time.perf_counter() - start) / len(stomps) * 1000
+            if feature_set not in costs or ms < costs[feature_set][0]:
+                groups = {name: t / len(stomps) * 1000 for name, t in timings.items()}
+                costs[feature_set] = ms, groups
+    return costs
+
+
+def make_classifier(hidden: tuple[int, ...], seed: int):
+    """The notebook's scaler + MLP, without the hyperparameter search."""
+    from sklearn.neural_network import MLPClassifier
+    from sklearn.pipeline import make_pipeline
+    from sklearn.preprocessing import StandardScaler
+
+    return make_pipeline(
+        StandardScaler(),
+        MLPClassifier(
+            hidden_layer_sizes=hidden,
+            activation="relu",
+            solver="adam",
+            batch_size=32,
+            learning_rate="adaptive",
+            max_iter=300,
+            early_stopping=True,
+            n_iter_no_change=10,
+            random_state=seed,
+        ),
+    )
+
+
+def search(
+    dataset: StompDataset,
+    moves: list[str],
+    feature_sets: list[str],
+    test_size: float = 0.2,
+    seed: int = 42,
+    hidden: tuple[int, ...] = (256, 128),
+    timing_stomps: int = 200,
+) -> tuple[list[dict[str, Any]], dict]:
+    """Train and time a model per feature set.
+
+    Args:
+        dataset: Labelled stomps.
+        moves: Moves to classify; a stomp's label is the index of its move
+            in this list.
+        feature_sets: Feature sets to compare.
+        test_size: Share of each move held out for the accuracy.
+        seed: Seed of the split and of the MLP initialization.
+        hidden: Hidden layer sizes of the MLP.
+        timing_stomps: Number of test stomps the extraction is timed on.
+
+    Returns:
+        One result per feature set: its "feature_set", "n_features",
+        "accuracy", "ms" per stomp, per-group "timings" and "frontier"
+        flag. And the fitted pipelines, by feature set.
+    """
+    import warnings
+
+    from sklearn.exceptions import ConvergenceWarning
+
+    indices = dataset.select(moves=moves)
+    missing = set(moves) - set(dataset.move[indices])
+    if missing:
+        raise ValueError(f"No stomps of {sorted(missing)} in the dataset")
+    labels = dataset.labels(moves)
+    train, test = dataset.split(indices, test_size, seed, by=labels)
+
+    # Every group once, in one pass over the memmap
+    groups = "+".join(FEATURE_GROUPS)
+    all_columns = feature_columns(groups)
+    X = np.concatenate(
+        [
+            extract_features_batch(audio, dataset.sample_rate, feature_set=groups)
+            for audio, _ in dataset.batches(indices, batch_size=1024)
+        ]
+    )
+    rows = {index: row for row, index in enumerate(indices)}
+    X_train = X[[rows[i] for i in train]]
+    X_test = X[[rows[i] for i in test]]
+
+    costs = extraction_costs(
+        dataset.audio(test[:timing_stomps]), feature_sets, dataset.sample_rate
+    )
+    results: list[dict[str, Any]] = []
+    models = {}
+    for feature_set in feature_sets:
+        columns = [all_columns.index(c) for c in feature_columns(feature_set)]
+        model = make_classifier(hidden, seed)
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", ConvergenceWarning)
+            model.fit(X_train[:, columns], labels[train])
+        accuracy = float(np.mean(model.predict(X_test[:, columns]) == labels[test]))
+        ms, timings = costs[feature_set]
+        models[feature_set] = model
+        results.append(
+            {
+                "feature_set": feature_set,
+                "n_features": len(columns),
+                "accuracy": accuracy,
+                "ms": ms,
+                "timings": timings,
+            }
+        )
+
+    results.sort(key=lambda result: result["ms"])
+    best = -1.0
+    for result in results:
+        result["frontier"] = result["accuracy"] > best
+        best = max(best, result["accuracy"])
+    return results, models
+
+
+def print_report(results: list[dict]) -> None:
+    names = ["stft"] + list(FEATURE_GROUPS)
+    print(
+        f"  {'feature set':<28} {'n':>3} {'accuracy':>8} {'ms':>6}  "
+        + " ".join(f"{name:>8}" for name in names)
+    )
+    for result in results:
+        timings = result["timings"]
+        print(
+            f"{'*' if result['frontier'] else ' '} {result['feature_set']:<28} "
+            f"{result['n_features']:>3} {result['accuracy']:>8.3f} "
+            f"{result['ms']:>6.2f}  "
+            + " ".join(
+                f"{timings[name]:>8.2f}" if name in timings else f"{'-':>8}"
+                for name in names
+            )
+        )
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Compare feature sets by model accuracy and extraction cost."
+    )
+    parser.add_argument(
+        "dataset", type=Path, help="Dataset directory written by stomp_dataset.py."
+    )
+    parser.add_argument(
+        "--moves",
+        nargs="+",
+        choices=MOVES,
+        default=["center", "left", "right", "up", "down"],
+        help="Moves to classify, in model output order "
+        "(default: the five-direction model's).",
+    )
+    parser.add_argument(
+        "--sets",
+        nargs="+",
+        default=None,
+        help="Feature sets to compare (default: xcorr48 and every combination "
+        f"of {', '.join(FEATURE_GROUPS)}).",
+    )
+    parser.add_argument("--test-size", type=float, default=0.2)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument(
+        "--hidden",
+        type=int,
+        nargs="+",
+        default=[256, 128],
+        help="Hidden layer sizes (default: 256 128, as the shipped models).",
+    )
+    parser.add_argument(
+        "--export",
+        nargs=2,
+        metavar=("SET", "PATH"),
+        default=None,
+        help="Save the model trained on feature set SET as ONNX to PATH.",
+    )
+    return parser.parse_args()
+
+
+def main() -> None:
+    from numpy_mlp import NumpyMLP
+
+    args = parse_args()
+    feature_sets = args.sets or candidate_sets()
+    if args.export and args.export[0] not in feature_sets:
+        feature_sets.append(args.export[0])
+    for feature_set in feature_sets:
+        feature_columns(feature_set)  # Fail before training on unknown names
+
+    dataset = StompDataset(args.dataset)
+    results, models = search(
+        dataset,
+        args.moves,
+        feature_sets,
+        args.test_size,
+        args.seed,
+        tuple(args.hidden),
+    )
+    print(f"{len(dataset.select(moves=args.moves))} stomps, moves: {args.moves}")
+    print_report(results)
+
+    if args.export:
+        feature_set, path = args.export
+        NumpyMLP.from_sklearn(models[feature_set], feature_set).to_onnx(path)
+        print(f"Wrote {path} ({feature_set})")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,22 +1,60 @@
-from scipy import signal
+"""Stomp feature extraction.
+
+`extract_all_features_with_xcorr` is the librosa reference the models were
+trained with. The fused and batched extractors compute the same features
+with NumPy only, so the runtime path never imports librosa (or
+scipy.signal, which is slow to import).
+
+They are built from named feature groups (`FEATURE_GROUPS`), computed and
+timed independently. A feature set is the 48 default columns
+(`DEFAULT_FEATURE_SET`) or groups joined by "+", and only the groups a set
+needs are computed.
+"""
+
+import time
+from dataclasses import dataclass
+from functools import cached_property, lru_cache
+from typing import Callable
+
 import numpy as np
-import librosa
 
+N_FFT = 2048
+HOP_LENGTH = 512
+N_MELS = 128
+N_MFCC = 7
 
-def reduce_noise(audio_signal, sr=16000, noise_reduction_strength=0.5):
-    """Apply spectral gating noise reduction."""
-    stft = librosa.stft(audio_signal, n_fft=2048, hop_length=512)
-    magnitude = np.abs(stft)
-    phase = np.angle(stft)
 
+def estimate_noise_profile(magnitude):
+    """Mean spectrum of the quietest 10% of frames of a (bins, frames) STFT."""
     frame_energy = np.mean(magnitude, axis=0)
     noise_threshold = np.percentile(frame_energy, 10)
     noise_frames = magnitude[:, frame_energy <= noise_threshold]
 
     if noise_frames.size > 0:
-        noise_profile = np.mean(noise_frames, axis=1, keepdims=True)
+        return np.mean(noise_frames, axis=1, keepdims=True)
+    return np.min(magnitude, axis=1, keepdims=True)
+
+
+def reduce_noise(
+    audio_signal, sr=16000, noise_reduction_strength=0.5, noise_profile=None
+):
+    """Apply spectral gating noise reduction.
+
+    Args:
+        noise_profile: Noise magnitude spectrum with 1 + 2048 // 2 bins,
+            such as one channel of `NoiseProfile.spectrum`. Estimated from
+            the quietest frames of `audio_signal` when omitted.
+    """
+    import librosa
+
+    stft = librosa.stft(audio_signal, n_fft=2048, hop_length=512)
+    magnitude = np.abs(stft)
+    phase = np.angle(stft)
+
+    if noise_profile is None:
+        noise_profile = estimate_noise_profile(magnitude)
     else:
-        noise_profile = np.min(magnitude, axis=1, keepdims=True)
+        noise_profile = np.asarray(noise_profile)[:, np.newaxis]
 
     magnitude_clean = np.maximum(
         magnitude - noise_reduction_strength * noise_profile, 0
@@ -31,6 +69,9 @@ def reduce_noise(audio_signal, sr=16000, noise_reduction_strength=0.5):
 def extract_cross_correlation_features(
     audio_signal, sr=16000, apply_noise_reduction=True
 ):
+    import librosa
+    from scipy import signal
+
     if apply_noise_reduction:
         audio_signal = reduce_noise(audio_signal, sr)
 
@@ -62,6 +103,8 @@ def extract_cross_correlation_features(
 
 
 def extract_all_features_with_xcorr(audio_signal, sr=16000):
+    import librosa
+
     left = audio_signal[:, 0]
     right = audio_signal[:, 1]
 
@@ -95,3 +138,446 @@ def extract_all_features_with_xcorr(audio_signal, sr=16000):
         return np.hstack([mfcc_features, basic_features, xcorr_features])
 
     return np.hstack([extract_per_channel(left), extract_per_channel(right)])
+
+
+def _hz_to_mel(freqs):
+    """Slaney mel scale: linear below 1 kHz, logarithmic above."""
+    freqs = np.asarray(freqs, dtype=np.float64)
+    mels = freqs / (200.0 / 3)
+    log_region = freqs >= 1000.0
+    return np.where(
+        log_region,
+        15.0 + np.log(np.maximum(freqs, 1000.0) / 1000.0) / (np.log(6.4) / 27.0),
+        mels,
+    )
+
+
+def _mel_to_hz(mels):
+    """Inverse of `_hz_to_mel`."""
+    mels = np.asarray(mels, dtype=np.float64)
+    freqs = mels * (200.0 / 3)
+    return np.where(
+        mels >= 15.0, 1000.0 * np.exp((np.log(6.4) / 27.0) * (mels - 15.0)), freqs
+    )
+
+
+@lru_cache(maxsize=None)
+def _mel_basis(sr: int, n_fft: int, n_mels: int) -> np.ndarray:
+    """(n_mels, 1 + n_fft // 2) mel filterbank, as used by librosa.feature.mfcc.
+
+    Slaney-style triangular filters with area normalization, equal to
+    `librosa.filters.mel(sr=sr, n_fft=n_fft, n_mels=n_mels)`.
+    """
+    fft_freqs = np.fft.rfftfreq(n_fft, 1.0 / sr)
+    mel_freqs = _mel_to_hz(np.linspace(_hz_to_mel(0.0), _hz_to_mel(sr / 2), n_mels + 2))
+
+    fdiff = np.diff(mel_freqs)
+    ramps = mel_freqs[:, np.newaxis] - fft_freqs
+    lower = -ramps[:-2] / fdiff[:-1, np.newaxis]
+    upper = ramps[2:] / fdiff[1:, np.newaxis]
+    weights = np.maximum(0, np.minimum(lower, upper))
+
+    weights *= (2.0 / (mel_freqs[2:] - mel_freqs[:-2]))[:, np.newaxis]
+    return weights.astype(np.float32)
+
+
+@lru_cache(maxsize=None)
+def _dct_basis(n_mfcc: int, n_mels: int) -> np.ndarray:
+    """(n_mfcc, n_mels) orthonormal DCT-II matrix (scipy.fft.dct(norm="ortho"))."""
+    n = np.arange(n_mels)
+    k = np.arange(n_mfcc)[:, np.newaxis]
+    basis = np.cos(np.pi * k * (2 * n + 1) / (2 * n_mels)) * np.sqrt(2.0 / n_mels)
+    basis[0] /= np.sqrt(2.0)
+    return basis.astype(np.float32)
+
+
+@lru_cache(maxsize=None)
+def _hann_window(n_fft: int) -> np.ndarray:
+    """Periodic Hann window (scipy.signal.get_window("hann", n_fft))."""
+    return (0.5 - 0.5 * np.cos(2 * np.pi * np.arange(n_fft) / n_fft)).astype(np.float32)
+
+
+def _frames(y: np.ndarray, frame_length: int, hop_length: int) -> np.ndarray:
+    """View of y (..., T) as (..., n_frames, frame_length) frames."""
+    windows = np.lib.stride_tricks.sliding_window_view(y, frame_length, axis=-1)
+    return windows[..., ::hop_length, :]
+
+
+def _peak(y: np.ndarray) -> np.ndarray:
+    """Peak magnitude along the last axis, or 1 for silence."""
+    peak = np.max(np.abs(y), axis=-1)
+    peak[peak < np.finfo(y.dtype).tiny] = 1.0
+    return peak
+
+
+def _normalize(y: np.ndarray) -> np.ndarray:
+    """Peak-normalize along the last axis, like librosa.util.normalize."""
+    return y / _peak(y)[..., np.newaxis]
+
+
+CHANNELS = ("left", "right")
+
+
+class NormalizedStomps:
+    """Peak-normalized stereo stomps, and the intermediates that feature
+    groups share, each computed on first use.
+
+    Attributes:
+        y: (..., 2, T) channels, each normalized to a peak of 1.
+        gain: (..., 2) gain the normalization applied to each channel.
+        sr: Sampling rate.
+        timings: Optional dict; the STFT's duration is added to "stft".
+    """
+
+    def __init__(self, audio: np.ndarray, sr: int, noise_profile=None, timings=None):
+        if noise_profile is not None and noise_profile.feature_sr != sr:
+            raise ValueError(
+                f"Noise profile is for {noise_profile.feature_sr} Hz stomps, "
+                f"not {sr} Hz"
+            )
+        channels = np.swapaxes(audio, -1, -2)
+        peak = _peak(channels)
+        self.y = channels / peak[..., np.newaxis]
+        self.gain = 1.0 / peak
+        self.sr = sr
+        self.noise_profile = noise_profile
+        self.timings = timings
+
+    @cached_property
+    def frames(self) -> np.ndarray:
+        """Centered, zero-padded (..., 2, n_frames, N_FFT) frames."""
+        pad = N_FFT // 2
+        padding = [(0, 0)] * (self.y.ndim - 1) + [(pad, pad)]
+        return _frames(np.pad(self.y, padding, mode="constant"), N_FFT, HOP_LENGTH)
+
+    @cached_property
+    def magnitude(self) -> np.ndarray:
+        """(..., 2, n_frames, 1 + N_FFT // 2) STFT magnitude of `frames`.
+
+        With a `NoiseProfile`, the magnitude is noise-gated.
+        """
+        start = time.perf_counter()
+        magnitude = np.abs(np.fft.rfft(self.frames * _hann_window(N_FFT), axis=-1))
+        if self.noise_profile is not None:
+            magnitude = self.noise_profile.gate(magnitude, self.gain)
+        if self.timings is not None:
+            elapsed = time.perf_counter() - start
+            self.timings["stft"] = self.timings.get("stft", 0.0) + elapsed
+        return magnitude
+
+
+@dataclass(frozen=True)
+class FeatureGroup:
+    """Feature columns that are computed together."""
+
+    name: str
+    columns: tuple[str, ...]
+    # NormalizedStomps -> (..., len(columns)) array
+    compute: Callable[[NormalizedStomps], np.ndarray]
+
+
+# Registry name -> group, in registration order
+FEATURE_GROUPS: dict[str, FeatureGroup] = {}
+
+# Feature set -> (groups to compute, columns to take from their output)
+_plans: dict[str, tuple[tuple[FeatureGroup, ...], np.ndarray | None]] = {}
+
+
+def register_feature_group(name: str, columns):
+    """Register the decorated function as the feature group `name`.
+
+    The function maps a `NormalizedStomps` to a (..., len(columns)) array.
+    Column names must be unique across groups.
+    """
+    columns = tuple(columns)
+
+    def decorator(compute):
+        others = [g for g in FEATURE_GROUPS.values() if g.name != name]
+        taken = {c for g in others for c in g.columns}
+        if taken.intersection(columns):
+            raise ValueError(f"Feature group {name!r} reuses existing column names")
+        FEATURE_GROUPS[name] = FeatureGroup(name, columns, compute)
+        _plans.clear()
+        return compute
+
+    return decorator
+
+
+def _per_channel(stats: list[np.ndarray]) -> np.ndarray:
+    """(..., 2) statistics -> (..., 2 * len(stats)), grouped by channel."""
+    stacked = np.stack(stats, axis=-1)
+    return stacked.reshape(stacked.shape[:-2] + (-1,))
+
+
+@register_feature_group(
+    "mfcc",
+    [
+        f"{channel}.mfcc_{stat}{i}"
+        for channel in CHANNELS
+        for stat in ("mean", "std")
+        for i in range(N_MFCC)
+    ],
+)
+def _mfcc_features(stomps: NormalizedStomps) -> np.ndarray:
+    """Mean and std over frames of 7 MFCCs."""
+    power = stomps.magnitude**2
+
+    # Mel power spectrogram -> dB (top_db=80 per signal) -> DCT-II
+    mel = power @ _mel_basis(stomps.sr, N_FFT, N_MELS).T
+    log_mel = 10.0 * np.log10(np.maximum(mel, 1e-10))
+    log_mel = np.maximum(log_mel, np.max(log_mel, axis=(-2, -1), keepdims=True) - 80.0)
+    mfccs = log_mel @ _dct_basis(N_MFCC, N_MELS).T
+
+    stats = np.concatenate([np.mean(mfccs, axis=-2), np.std(mfccs, axis=-2)], axis=-1)
+    return stats.reshape(stats.shape[:-2] + (-1,))
+
+
+@register_feature_group(
+    "spectral",
+    [f"{channel}.centroid_{stat}" for channel in CHANNELS for stat in ("mean", "std")],
+)
+def _spectral_features(stomps: NormalizedStomps) -> np.ndarray:
+    """Mean and std over frames of the spectral centroid."""
+    magnitude = stomps.magnitude
+    freqs = np.linspace(0, stomps.sr / 2, 1 + N_FFT // 2)
+    total = np.sum(magnitude, axis=-1)
+    total[total < np.finfo(magnitude.dtype).tiny] = 1.0
+    centroid = (magnitude @ freqs) / total
+    return _per_channel([np.mean(centroid, axis=-1), np.std(centroid, axis=-1)])
+
+
+@register_feature_group(
+    "rms_zcr",
+    [
+        f"{channel}.{feature}_{stat}"
+        for channel in CHANNELS
+        for feature in ("rms", "zcr")
+        for stat in ("mean", "std")
+    ],
+)
+def _rms_zcr_features(stomps: NormalizedStomps) -> np.ndarray:
+    """Mean and std over frames of the RMS and zero-crossing rate.
+
+    Computed from the raw signal, without noise gating. Frames overlap 4x,
+    so per-frame sums are taken as differences of running sums instead of
+    summing each frame.
+    """
+    y = stomps.y
+    pad = N_FFT // 2
+    padding = [(0, 0)] * (y.ndim - 1) + [(pad, pad)]
+    n_frames = 1 + (y.shape[-1] + 2 * pad - N_FFT) // HOP_LENGTH
+    starts = np.arange(n_frames) * HOP_LENGTH
+
+    def frame_sums(x, frame_length):
+        prefix = np.zeros(x.shape[:-1] + (x.shape[-1] + 1,), dtype=np.float64)
+        np.cumsum(x, axis=-1, dtype=np.float64, out=prefix[..., 1:])
+        return prefix[..., starts + frame_length] - prefix[..., starts]
+
+    # RMS of the centered, zero-padded frames
+    squares = np.square(np.pad(y, padding, mode="constant"))
+    rms = np.sqrt(np.maximum(frame_sums(squares, N_FFT), 0.0) / N_FFT)
+
+    # ZCR uses edge padding; the first sample of each frame never counts
+    y_edge = np.pad(y, padding, mode="edge")
+    signs = np.signbit(np.where(np.abs(y_edge) <= 1e-10, 0, y_edge))
+    crossings = signs[..., 1:] != signs[..., :-1]
+    zcr = frame_sums(crossings, N_FFT - 1) / N_FFT
+
+    return _per_channel(
+        [
+            np.mean(rms, axis=-1),
+            np.std(rms, axis=-1),
+            np.mean(zcr, axis=-1),
+            np.std(zcr, axis=-1),
+        ]
+    )
+
+
+def _cross_correlation_features(left: np.ndarray, right: np.ndarray, sr: int):
+    """Vectorized `extract_cross_correlation_features` over (..., T) channels.
+
+    Expects already-normalized channels. Returns (..., 4) features.
+    """
+    # Full cross-correlation as an FFT convolution with the reversed channel
+    length = left.shape[-1] + right.shape[-1] - 1
+    n_fft = 1 << (length - 1).bit_length()
+    cross_corr = np.fft.irfft(
+        np.fft.rfft(left, n_fft) * np.fft.rfft(right[..., ::-1], n_fft), n_fft
+    )[..., :length]
+    cross_corr = cross_corr / (
+        np.max(np.abs(cross_corr), axis=-1, keepdims=True) + 1e-10
+    )
+
+    length = cross_corr.shape[-1]
+    peak_idx = np.argmax(cross_corr, axis=-1)
+    phase_shift_ms = (peak_idx - length // 2) / sr * 1000
+
+    cross_corr_center = cross_corr[..., length // 4 : 3 * length // 4]
+
+    return np.stack(
+        [
+            phase_shift_ms,
+            np.max(cross_corr, axis=-1),
+            np.std(cross_corr_center, axis=-1),
+            np.sum(np.abs(np.diff(cross_corr, axis=-1)), axis=-1),
+        ],
+        axis=-1,
+    )
+
+
+@register_feature_group(
+    "xcorr",
+    ["xcorr.shift_ms", "xcorr.peak", "xcorr.center_std", "xcorr.diff_sum"],
+)
+def _xcorr_features(stomps: NormalizedStomps) -> np.ndarray:
+    """Time difference of arrival and shape of the channel cross-correlation."""
+    return _cross_correlation_features(
+        stomps.y[..., 0, :], stomps.y[..., 1, :], stomps.sr
+    )
+
+
+def _legacy_channel_columns(channel: str) -> list[str]:
+    return (
+        [f"{channel}.mfcc_{stat}{i}" for stat in ("mean", "std") for i in range(N_MFCC)]
+        + [f"{channel}.{f}_{stat}" for f in ("rms", "zcr") for stat in ("mean", "std")]
+        + [f"{channel}.centroid_{stat}" for stat in ("mean", "std")]
+        + list(FEATURE_GROUPS["xcorr"].columns)
+    )
+
+
+DEFAULT_FEATURE_SET = "xcorr48"
+
+# Named feature sets: name -> ordered columns. Models declare the set they
+# were trained on; "xcorr48" is the layout of
+# `extract_all_features_with_xcorr`, which repeats the xcorr block after
+# each channel.
+FEATURE_SETS: dict[str, tuple[str, ...]] = {
+    "xcorr48": tuple(_legacy_channel_columns("left") + _legacy_channel_columns("right"))
+}
+
+
+def feature_columns(feature_set: str) -> tuple[str, ...]:
+    """Columns of a feature set.
+
+    Args:
+        feature_set: A name in `FEATURE_SETS`, or feature group names joined
+            by "+" (e.g. "rms_zcr+xcorr"), whose columns are concatenated.
+    """
+    if feature_set in FEATURE_SETS:
+        return FEATURE_SETS[feature_set]
+    columns: list[str] = []
+    for name in feature_set.split("+"):
+        if name not in FEATURE_GROUPS:
+            raise KeyError(
+                f"Unknown feature set or group {name!r}; expected one of "
+                f"{sorted(FEATURE_SETS)} or groups {list(FEATURE_GROUPS)}"
+            )
+        columns.extend(FEATURE_GROUPS[name].columns)
+    return tuple(columns)
+
+
+def _plan(feature_set: str) -> tuple[tuple[FeatureGroup, ...], np.ndarray | None]:
+    """Groups a feature set needs, and the columns to take from their output
+    (None if the output already is the feature set)."""
+    plan = _plans.get(feature_set)
+    if plan is None:
+        columns = feature_columns(feature_set)
+        owner = {c: g for g in FEATURE_GROUPS.values() for c in g.columns}
+        groups = tuple(dict.fromkeys(owner[c] for c in columns))
+        computed = [c for g in groups for c in g.columns]
+        index = None
+        if tuple(computed) != columns:
+            index = np.array([computed.index(c) for c in columns])
+        plan = _plans[feature_set] = (groups, index)
+    return plan
+
+
+def extract_feature_set(
+    audio,
+    feature_set: str = DEFAULT_FEATURE_SET,
+    sr=16000,
+    noise_profile=None,
+    timings=None,
+) -> np.ndarray:
+    """Features of stereo audio (..., T, 2), computing only the needed groups.
+
+    Args:
+        feature_set: See `feature_columns`.
+        noise_profile: Optional `NoiseProfile`; see
+            `extract_all_features_fused`.
+        timings: Optional dict to which the time spent in each group (and in
+            the STFT the spectral groups share, as "stft") is added.
+
+    Returns:
+        (..., len(feature_columns(feature_set))) features.
+    """
+    groups, index = _plan(feature_set)
+    stomps = NormalizedStomps(np.asarray(audio), sr, noise_profile, timings)
+
+    parts = []
+    for group in groups:
+        if timings is None:
+            parts.append(group.compute(stomps))
+            continue
+        stft = timings.get("stft", 0.0)
+        start = time.perf_counter()
+        parts.append(group.compute(stomps))
+        # Time spent in the shared STFT is not this group's
+        elapsed = time.perf_counter() - start - (timings.get("stft", 0.0) - stft)
+        timings[group.name] = timings.get(group.name, 0.0) + elapsed
+
+    features = np.concatenate(parts, axis=-1) if len(parts) > 1 else parts[0]
+    return features if index is None else features[..., index]
+
+
+def extract_all_features_fused(
+    audio_signal, sr=16000, noise_profile=None, feature_set=DEFAULT_FEATURE_SET
+):
+    """Single-pass equivalent of `extract_all_features_with_xcorr`.
+
+    Computes one spectrogram per channel and the stereo cross-correlation
+    once, and returns the same 48 features (up to float32 rounding), so
+    models trained on the original extractor keep working. Another
+    `feature_set` computes only the groups it needs.
+
+    A `noise_profile.NoiseProfile` is subtracted from the spectrogram, which
+    changes the MFCC and spectral centroid features. The shipped models were
+    trained without it.
+    """
+    return extract_feature_set(audio_signal, feature_set, sr, noise_profile)
+
+
+def extract_features_batch(
+    stomps,
+    sr=16000,
+    batch_size=256,
+    noise_profile=None,
+    feature_set=DEFAULT_FEATURE_SET,
+):
+    """Extract features for a batch of equal-length stereo stomps.
+
+    Args:
+        stomps: (N, T, 2) array of stomps.
+        sr: Sampling rate of the stomps.
+        batch_size: Number of stomps processed per vectorized call, which
+            bounds peak memory for large N.
+        noise_profile: Optional `NoiseProfile`; see
+            `extract_all_features_fused`.
+        feature_set: See `feature_columns`.
+
+    Returns:
+        (N, n_features) float32 matrix; with the default feature set, row i
+        matches `extract_all_features_with_xcorr(stomps[i], sr)`.
+    """
+    stomps = np.asarray(stomps)
+    if stomps.ndim != 3 or stomps.shape[-1] != 2:
+        raise ValueError(f"Expected stomps of shape (N, T, 2), got {stomps.shape}")
+
+    n_features = len(feature_columns(feature_set))
+    features = np.empty((len(stomps), n_features), dtype=np.float32)
+    for start in range(0, len(stomps), batch_size):
+        batch = stomps[start : start + batch_size]
+        features[start : start + len(batch)] = extract_feature_set(
+            batch, feature_set, sr, noise_profile
+        )
+    return features
@@ -1,41 +1,253 @@
+"""Read an audio file block by block, like a live input stream.
+
+`FileStream` serves `(frames, channels)` float32 blocks through the same
+`read(frames) -> (chunk, overflow)` / `finished` contract as
+`sounddevice.InputStream`, so recordings can be replayed through the live
+code paths. Nothing is decoded up front: PCM and float WAV files are
+memory-mapped and each block is converted as it is read, and other formats
+are decoded a block at a time with soundfile. Audio is served at the file's
+native sample rate (`sr`) unless `target_sr` asks for streaming resampling.
+"""
+
+from __future__ import annotations
+
+import os
+import struct
+from math import ceil
+
 import numpy as np
-import librosa
 
+# WAVE format tags
+_PCM = 0x0001
+_IEEE_FLOAT = 0x0003
+_EXTENSIBLE = 0xFFFE
 
-class FileStream:
-    def __init__(self, file_path, blocksize):
-        self.data, self.file_sr = librosa.load(file_path, sr=16000, mono=False)
-        if self.data.ndim == 1:
-            # Convert mono to stereo by duplicating channels
-            self.data = np.stack([self.data, self.data], axis=-1)
+# (format tag, bits per sample) -> sample dtype
+_WAV_DTYPES = {
+    (_PCM, 8): np.dtype("u1"),
+    (_PCM, 16): np.dtype("<i2"),
+    (_PCM, 24): np.dtype("u1"),  # 3 bytes per sample, unpacked per block
+    (_PCM, 32): np.dtype("<i4"),
+    (_IEEE_FLOAT, 32): np.dtype("<f4"),
+    (_IEEE_FLOAT, 64): np.dtype("<f8"),
+}
+
+
+def read_wav_header(f) -> tuple[int, int, int, int, int]:
+    """Parse a RIFF/WAVE header up to the start of the sample data.
+
+    Returns:
+        (format tag, channels, sample rate, bits per sample, data size in
+        bytes), with `f` positioned at the first sample.
+
+    Raises:
+        ValueError: If `f` is not a WAV file or has no data chunk.
+    """
+    riff, _size, wave = struct.unpack("<4sI4s", f.read(12))
+    if riff != b"RIFF" or wave != b"WAVE":
+        raise ValueError("not a RIFF/WAVE file")
+
+    fmt = None
+    while True:
+        header = f.read(8)
+        if len(header) < 8:
+            raise ValueError("WAV file has no data chunk")
+        chunk_id, chunk_size = struct.unpack("<4sI", header)
+
+        if chunk_id == b"data":
+            if fmt is None:
+                raise ValueError("WAV data chunk precedes its fmt chunk")
+            return (*fmt, chunk_size)
+
+        if chunk_id == b"fmt ":
+            body = f.read(chunk_size)
+            tag, channels, sr, _byte_rate, _align, bits = struct.unpack(
+                "<HHIIHH", body[:16]
+            )
+            if tag == _EXTENSIBLE and len(body) >= 26:
+                # The real tag is the start of the SubFormat GUID
+                (tag,) = struct.unpack("<H", body[24:26])
+            fmt = (tag, channels, sr, bits)
+            f.seek(chunk_size & 1, os.SEEK_CUR)
         else:
-            self.data = self.data.T  # (channels, samples) -> (samples, channels)
+            # Chunks are padded to an even size
+            f.seek(chunk_size + (chunk_size & 1), os.SEEK_CUR)
+
+
+class _WavSource:
+    """Memory-mapped PCM/float WAV samples, converted to float32 per block."""
+
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            tag, channels, sr, bits, size = read_wav_header(f)
+            offset = f.tell()
+            file_size = os.fstat(f.fileno()).st_size
+
+        dtype = _WAV_DTYPES.get((tag, bits))
+        if dtype is None:
+            raise ValueError(f"unsupported WAV encoding (format {tag}, {bits} bits)")
+
+        # Files that were still being written may carry a stale data size
+        width = bits // 8
+        size = min(size, file_size - offset)
+        self.frames = size // (width * channels)
+        self.sr = sr
+        self.channels = channels
+        self.bits = bits
+        self.position = 0
+        self._data = (
+            np.memmap(
+                path,
+                dtype=dtype,
+                mode="r",
+                offset=offset,
+                shape=(self.frames, channels * width // dtype.itemsize),
+            )
+            if self.frames
+            else np.empty((0, channels), dtype)
+        )
+
+    def read(self, frames: int) -> np.ndarray:
+        block = self._data[self.position : self.position + frames]
+        self.position += len(block)
+
+        if self.bits == 24:
+            # Little-endian 3-byte samples -> top 3 bytes of an int32
+            raw = block.reshape(len(block), self.channels, 3)
+            wide = np.zeros((len(block), self.channels, 4), np.uint8)
+            wide[..., 1:] = raw
+            block = wide.view("<i4")[..., 0]
+            return block.astype(np.float32) / 2.0**31
+        if block.dtype == np.uint8:
+            return (block.astype(np.float32) - 128.0) / 128.0
+        if block.dtype.kind == "i":
+            return block.astype(np.float32) / float(2 ** (self.bits - 1))
+        return block.astype(np.float32)
+
+    def close(self) -> None:
+        self._data = None
+
+
+class _SoundFileSource:
+    """Any format libsndfile reads, decoded one block at a time."""
 
+    def __init__(self, path):
+        import soundfile as sf
+
+        self._file = sf.SoundFile(path)
+        self.frames = self._file.frames
+        self.sr = self._file.samplerate
+        self.channels = self._file.channels
+        self.position = 0
+
+    def read(self, frames: int) -> np.ndarray:
+        block = self._file.read(frames, dtype="float32", always_2d=True)
+        self.position += len(block)
+        return block
+
+    def close(self) -> None:
+        self._file.close()
+
+
+def open_source(path):
+    """Block reader for `path`: memory-mapped for WAV, else soundfile."""
+    try:
+        return _WavSource(path)
+    except (ValueError, struct.error):
+        return _SoundFileSource(path)
+
+
+class FileStream:
+    """Audio file served in blocks, with the `sounddevice` stream interface."""
+
+    def __init__(self, file_path, blocksize=None, target_sr=None):
+        """
+        Args:
+            file_path: Audio file to read.
+            blocksize: Default number of frames per `read`.
+            target_sr: Resample to this rate while streaming; defaults to the
+                file's native rate.
+        """
+        self._source = open_source(file_path)
+        self.file_sr = self._source.sr
+        self.sr = target_sr or self.file_sr
+        # Mono is served as stereo by duplicating the channel
+        self.channels = max(self._source.channels, 2)
         self.blocksize = blocksize
+
+        self._resampler = None
+        if self.sr != self.file_sr:
+            from resample import StreamingResampler
+
+            self._resampler = StreamingResampler(
+                self.file_sr, self.sr, self._source.channels
+            )
+        self._buffer = np.empty((0, self._source.channels), np.float32)
+        self._flushed = False
+
         self.position = 0
-        self.finished = False
+        self.finished = self._source.frames == 0
+
+    @property
+    def frames(self) -> int:
+        """Total number of frames the stream serves, at `sr`."""
+        return ceil(self._source.frames * self.sr / self.file_sr)
 
     def __enter__(self):
         return self
 
     def __exit__(self, exc_type, exc_value, traceback):
-        pass
+        self.close()
 
-    def read(self, frames):
-        if self.position >= len(self.data):
-            self.finished = True
-            return np.zeros((frames, self.data.shape[1]), dtype=np.float32), False
+    def close(self):
+        self._source.close()
+
+    def read(self, frames=None):
+        """Next `frames` frames (default `blocksize`), zero-padded at the end.
+
+        The stream is `finished` once a read comes up short, so a file that
+        ends on a block boundary still serves one all-zero block after its
+        last frame. Detectors that look ahead of an onset get that hop too.
 
-        end = self.position + frames
-        chunk = self.data[self.position : end]
+        Returns:
+            (frames, channels) float32 block and an overflow flag, which is
+            always False for files.
+        """
+        frames = frames or self.blocksize
+        if self.finished:
+            return np.zeros((frames, self.channels), dtype=np.float32), False
+
+        if self._resampler is None:
+            chunk = self._source.read(frames)
+        else:
+            chunk = self._read_resampled(frames)
+
+        if chunk.shape[1] == 1:
+            chunk = np.repeat(chunk, 2, axis=1)
 
         # Pad with zeros if we reached the end
         if len(chunk) < frames:
-            padding = np.zeros(
-                (frames - len(chunk), self.data.shape[1]), dtype=np.float32
-            )
+            padding = np.zeros((frames - len(chunk), chunk.shape[1]), dtype=np.float32)
             chunk = np.vstack([chunk, padding])
             self.finished = True
 
-        self.position = end
+        self.position += frames
         return chunk, False
+
+    def _read_resampled(self, frames: int) -> np.ndarray:
+        ratio = self.file_sr / self.sr
+        parts = [self._buffer]
+        have = len(self._buffer)
+        while have < frames and not self._flushed:
+            block = self._source.read(ceil((frames - have) * ratio) + 1)
+            out = self._resampler.process(block)
+            if self._source.position >= self._source.frames:
+                # Outputs near the end of the file, as if it ended in silence
+                out = np.concatenate([out, self._resampler.pending()])
+                self._flushed = True
+            parts.append(out)
+            have += len(out)
+
+        buffered = np.concatenate(parts) if len(parts) > 1 else self._buffer
+        self._buffer = buffered[frames:]
+        return buffered[:frames]
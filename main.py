@@ -1,12 +1,12 @@
 import argparse
 import sys
 import time
-import numpy as np
-import sounddevice as sd  # type: ignore
-from stomp_detector import StompDetector
-from classifier import FiveDirectionClassifier as Classifier
-from controller import KeyboardController as Controller
-from file_stream import FileStream
+from pipeline import DROP_POLICIES
+from telemetry import Telemetry
+
+# sounddevice, the detector, the classifier (onnxruntime) and the controller
+# (pyautogui) are imported where they are first needed, so that e.g.
+# --list-devices doesn't pay for all of them.
 
 
 def parse_args():
@@ -25,11 +25,99 @@ def parse_args():
     parser.add_argument(
         "--select", action="store_true", help="Interactively select an audio device"
     )
+    parser.add_argument(
+        "--stream-resample",
+        action="store_true",
+        help="Resample to 16 kHz continuously instead of on each detection",
+    )
+    parser.add_argument(
+        "--pipeline",
+        action="store_true",
+        help="Capture in a callback and run detection/classification/output on worker threads",
+    )
+    parser.add_argument(
+        "--queue-size",
+        type=int,
+        default=8,
+        help="Capacity of each pipeline stage queue (default: 8)",
+    )
+    parser.add_argument(
+        "--drop-policy",
+        choices=DROP_POLICIES,
+        default="drop_oldest",
+        help="What a full pipeline stage queue does with new items (default: drop_oldest)",
+    )
+    parser.add_argument(
+        "--low-latency",
+        action="store_true",
+        help="Detect on small hops and emit each stomp as soon as its onset is located",
+    )
+    parser.add_argument(
+        "--hop-ms",
+        type=float,
+        default=None,
+        help="Detection hop in ms (default: 10 with --low-latency, else 100)",
+    )
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=7.0,
+        help="Detection threshold as a multiple of the noise floor (default: 7.0)",
+    )
+    parser.add_argument(
+        "--cascade-threshold",
+        type=float,
+        default=None,
+        help="Classify with a cascade that only extracts features and runs the "
+        "model when the left/right energy ratio is less confident than this "
+        "(0-1, e.g. 0.8)",
+    )
+    parser.add_argument(
+        "--backend",
+        choices=["onnxruntime", "numpy"],
+        default="onnxruntime",
+        help="Run the classifier model with onnxruntime or as NumPy matrix "
+        "products (default: onnxruntime)",
+    )
+    parser.add_argument(
+        "--recalibrate",
+        action="store_true",
+        help="Measure the background noise again instead of using the "
+        "device's cached calibration",
+    )
+    parser.add_argument(
+        "--noise-gate",
+        action="store_true",
+        help="Subtract a running background noise spectrum, learned during "
+        "calibration and between stomps, before extracting features (the "
+        "shipped models were trained without it)",
+    )
+    parser.add_argument(
+        "--cooldown-ms",
+        type=float,
+        default=300,
+        help="Minimum time between stomps in ms (default: 300)",
+    )
+    parser.add_argument(
+        "--telemetry",
+        type=str,
+        default=None,
+        help="Export per-stage latency telemetry to this file "
+        "(Prometheus textfile if it ends in .prom, else JSON lines)",
+    )
+    parser.add_argument(
+        "--telemetry-interval",
+        type=float,
+        default=10.0,
+        help="Seconds between telemetry exports (default: 10)",
+    )
     return parser.parse_args()
 
 
 def list_audio_devices():
     """Prints available audio input devices."""
+    import sounddevice as sd  # type: ignore
+
     print("\nAvailable Audio Input Devices:")
     print(sd.query_devices())
     print("\n")
@@ -37,6 +125,8 @@ def list_audio_devices():
 
 def select_audio_device():
     """Interactively selects an audio device."""
+    import sounddevice as sd  # type: ignore
+
     list_audio_devices()
     while True:
         try:
@@ -56,32 +146,145 @@ def select_audio_device():
             print("Invalid input. Please enter a number.")
 
 
-def calibrate(stream, step_frames, duration=3.0):
-    """Calibrates the noise floor and returns the max noise RMS."""
-    print(f"Calibrating background noise for {duration} seconds...")
-    print("Please remain silent...")
+def query_sample_rate(device_id):
+    """Default sample rate of an input device (48 kHz if it can't be queried)."""
+    import sounddevice as sd  # type: ignore
 
-    max_energy = 0.0
-    start_time = time.time()
+    try:
+        if device_id is not None:
+            device_info = sd.query_devices(device_id, "input")
+            sr = int(device_info["default_samplerate"])
+        else:
+            # If using default device, query it
+            device_info = sd.query_devices(kind="input")
+            sr = int(device_info["default_samplerate"])
+    except Exception as e:
+        print(
+            f"Warning: Could not determine default sample rate: {e}",
+            file=sys.stderr,
+        )
+        sr = 48000
+    return sr
 
-    while time.time() - start_time < duration:
-        chunk, overflow = stream.read(step_frames)
-        if overflow:
-            print("Warning: Audio overflow during calibration", file=sys.stderr)
 
-        # Calculate RMS energy of the chunk
-        # Ensure mono
-        if chunk.ndim > 1:
-            y = np.mean(chunk, axis=1)
-        else:
-            y = chunk
+def query_device_name(device_id):
+    """Name of an input device, used to key its cached calibration."""
+    import sounddevice as sd  # type: ignore
 
-        rms = np.sqrt(np.mean(y**2))
-        if rms > max_energy:
-            max_energy = rms
+    try:
+        if device_id is not None:
+            return sd.query_devices(device_id, "input")["name"]
+        return sd.query_devices(kind="input")["name"]
+    except Exception:
+        return "default" if device_id is None else f"device-{device_id}"
 
-    print(f"Calibration complete. Max noise RMS: {max_energy:.5f}")
-    return max_energy
+
+def calibrate(stream, step_frames, sr, device="", duration=3.0, noise_profile=None):
+    """Measures the background noise and returns a `CalibrationProfile`.
+
+    Also seeds `noise_profile`, if given, with the calibration audio.
+    """
+    from calibration import measure
+
+    print(f"Calibrating background noise for {duration} seconds...")
+    print("Please remain silent...")
+    profile = measure(stream, step_frames, sr, device, duration, noise_profile)
+    print(f"Calibration complete. Max noise RMS: {profile.rms['max']:.5f}")
+    return profile
+
+
+def load_or_calibrate(
+    stream, step_frames, sr, device, detector, noise_profile=None, recalibrate=False
+):
+    """Applies the device's cached calibration, calibrating first if there is
+    none (or if `recalibrate`), and returns the profile."""
+    from calibration import load_profile, profile_path
+
+    profile = None if recalibrate else load_profile(device, sr)
+    if profile is not None:
+        print(f"Using cached calibration for {device} at {sr} Hz")
+    else:
+        profile = calibrate(
+            stream, step_frames, sr, device, noise_profile=noise_profile
+        )
+        profile.save(profile_path(device, sr))
+    profile.apply(detector, noise_profile)
+    print(f"Setting initial noise level to: {detector.noise_level:.5f}")
+    return profile
+
+
+def run_pipeline(
+    args,
+    device_id,
+    sr,
+    window_frames,
+    step_frames,
+    channels,
+    classifier,
+    controller,
+    telemetry,
+    noise_profile=None,
+):
+    """Runs the callback-driven, multi-threaded pipeline until Ctrl+C."""
+    import sounddevice as sd  # type: ignore
+    from calibration import CalibrationMonitor
+    from pipeline import StompPipeline
+    from stomp_detector import StompDetector
+
+    detector = StompDetector(
+        sr=sr,
+        energy_threshold=args.threshold,
+        cooldown_ms=args.cooldown_ms,
+        streaming_resample=args.stream_resample,
+        incremental=True,
+        low_latency=args.low_latency,
+        telemetry=telemetry,
+        noise_profile=noise_profile,
+    )
+    pipeline = StompPipeline(
+        detector,
+        classifier,
+        controller,
+        sr=sr,
+        window_frames=window_frames,
+        step_frames=step_frames,
+        channels=channels,
+        queue_size=args.queue_size,
+        policy=args.drop_policy,
+        telemetry=telemetry,
+    )
+
+    with sd.InputStream(
+        samplerate=sr,
+        blocksize=step_frames,
+        device=device_id,
+        channels=channels,
+        dtype="float32",
+        callback=pipeline.callback,
+    ):
+        profile = load_or_calibrate(
+            pipeline,
+            step_frames,
+            sr,
+            query_device_name(device_id),
+            detector,
+            noise_profile,
+            args.recalibrate,
+        )
+        monitor = CalibrationMonitor(profile, detector, noise_profile)
+
+        pipeline.start()
+        monitor.start()
+        try:
+            while True:
+                time.sleep(1.0)
+        except KeyboardInterrupt:
+            print("\nStopping...")
+        finally:
+            monitor.stop()
+            pipeline.stop()
+            print(f"Pipeline metrics: {pipeline.metrics()}")
+            print(f"Onset-to-detection latency: {detector.latency_stats()}")
 
 
 def main():
@@ -97,53 +300,91 @@ def main():
     if args.select:
         device_id = select_audio_device()
 
-    # Determine sample rate
-    try:
-        if device_id is not None:
-            device_info = sd.query_devices(device_id, "input")
-            sr = int(device_info["default_samplerate"])
-        else:
-            # If using default device, query it
-            device_info = sd.query_devices(kind="input")
-            sr = int(device_info["default_samplerate"])
-    except Exception as e:
-        print(
-            f"Warning: Could not determine default sample rate: {e}",
-            file=sys.stderr,
-        )
-        sr = 48000
+    if args.input_file:
+        from file_stream import FileStream
+
+        # Replay at the file's own sample rate
+        stream_ctx = FileStream(args.input_file)
+        sr = stream_ctx.sr
+    else:
+        sr = query_sample_rate(device_id)
 
     print(f"Device: {device_id if device_id is not None else 'Default'}, SR: {sr}")
 
     # Parameters
     window_ms = 200
-    step_ms = 100
+    step_ms = args.hop_ms or (10 if args.low_latency else 100)
 
     window_frames = int((window_ms / 1000.0) * sr)
     step_frames = int((step_ms / 1000.0) * sr)
     channels = 2  # Assuming stereo
 
+    from classifier import (
+        CascadeClassifier,
+        EnergyRatioStage,
+        FiveDirectionClassifier,
+        MLPStage,
+    )
+    from calibration import CalibrationMonitor
+    from controller import AsyncKeyboardController, DummyController
+    from noise_profile import NoiseProfile
+    from stomp_detector import StompDetector
+
+    telemetry = Telemetry(enabled=args.telemetry is not None)
+    if args.telemetry is not None:
+        telemetry.start_export(args.telemetry, args.telemetry_interval)
+
     # Initialize components
+    controller = None
+    detector = None
+    classifier = None
+    monitor = None
     try:
         # We will set the threshold after calibration
-        classifier = Classifier()
-        controller = Controller()
-
-        # Buffer to hold the rolling window
-        audio_buffer = np.zeros((window_frames, channels), dtype=np.float32)
+        noise_profile = None
+        if args.noise_gate:
+            noise_profile = NoiseProfile(sr=sr, channels=channels)
+        model = FiveDirectionClassifier(
+            backend=args.backend, noise_profile=noise_profile
+        )
+        if args.cascade_threshold is not None:
+            classifier = CascadeClassifier(
+                [EnergyRatioStage(), MLPStage(model)],
+                threshold=args.cascade_threshold,
+            )
+        else:
+            classifier = model
+        if args.input_file:
+            # Replaying a recording shouldn't type into the focused window
+            controller = DummyController(cooldown=0.0)
+        else:
+            controller = AsyncKeyboardController(telemetry=telemetry)
+            telemetry.add_source(lambda: {"key_presses_dropped": controller.dropped})
 
         print("Listening... Press Ctrl+C to stop.")
 
+        if args.pipeline:
+            if args.input_file:
+                print("Error: --pipeline requires a live input device", file=sys.stderr)
+                return
+            run_pipeline(
+                args,
+                device_id,
+                sr,
+                window_frames,
+                step_frames,
+                channels,
+                classifier,
+                controller,
+                telemetry,
+                noise_profile,
+            )
+            return
+
         # Open stream
-        if args.input_file:
-            stream_ctx = FileStream(args.input_file, step_frames)
-            # Update sr to match file if not overridden
-            if args.sr is None:
-                sr = stream_ctx.sr
-                window_frames = int((window_ms / 1000.0) * sr)
-                audio_buffer = np.zeros((window_frames, channels), dtype=np.float32)
+        if not args.input_file:
+            import sounddevice as sd  # type: ignore
 
-        else:
             stream_ctx = sd.InputStream(
                 samplerate=sr,
                 blocksize=step_frames,
@@ -152,7 +393,16 @@ def main():
                 dtype="float32",
             )
 
-        detector = StompDetector(sr=sr, energy_threshold=7.0)
+        detector = StompDetector(
+            sr=sr,
+            energy_threshold=args.threshold,
+            cooldown_ms=args.cooldown_ms,
+            streaming_resample=args.stream_resample,
+            incremental=True,
+            low_latency=args.low_latency,
+            telemetry=telemetry,
+            noise_profile=noise_profile,
+        )
 
         with stream_ctx as stream:
             if args.input_file:
@@ -160,10 +410,19 @@ def main():
                     "Using file input. Skipping calibration and using default/provided threshold."
                 )
             else:
-                noise_level = calibrate(stream, step_frames)
-                # Initialize noise level slightly higher to avoid immediate triggers
-                detector.noise_level = max(noise_level, 0.001)
-                print(f"Setting initial noise level to: {detector.noise_level:.5f}")
+                # The loudest calibration chunk is the initial noise level,
+                # slightly high to avoid immediate triggers
+                profile = load_or_calibrate(
+                    stream,
+                    step_frames,
+                    sr,
+                    query_device_name(device_id),
+                    detector,
+                    noise_profile,
+                    args.recalibrate,
+                )
+                monitor = CalibrationMonitor(profile, detector, noise_profile)
+                monitor.start()
 
             while True:
                 try:
@@ -173,26 +432,39 @@ def main():
                         break
 
                     # Read 'step' frames
+                    trace = telemetry.trace()
                     chunk, overflow = stream.read(step_frames)
+                    captured_at = time.perf_counter()
+                    trace.mark("read")
 
                     if overflow:
                         print("Warning: Audio overflow", file=sys.stderr)
+                        telemetry.count("overflows")
 
-                    # Update rolling buffer
-                    audio_buffer = np.roll(audio_buffer, -step_frames, axis=0)
-                    audio_buffer[-step_frames:] = chunk
-
-                    # Detect on the full window
-                    stomps = detector.detect(audio_buffer)
+                    # Update the rolling window and detect on it
+                    stomps = detector.process(chunk)
+                    trace.mark("detect")
 
                     for stomp in stomps:
-                        direction = classifier.classify(stomp)
-                        controller.press(direction)
+                        direction = classifier.classify(stomp, trace)
+                        controller.press(direction, captured_at)
+
+                    telemetry.finish(trace)
 
                 except KeyboardInterrupt:
                     print("\nStopping...")
                     break
     finally:
+        if monitor is not None:
+            monitor.stop()
+        if isinstance(controller, AsyncKeyboardController):
+            controller.close()
+            print(f"Key output latency: {controller.latency_stats()}")
+        if detector is not None:
+            print(f"Onset-to-detection latency: {detector.latency_stats()}")
+        if isinstance(classifier, CascadeClassifier):
+            print(f"Classifier cascade: {classifier.stats()}")
+        telemetry.stop()
         print("System stopped.")
 
 
@@ -0,0 +1,187 @@
+"""Process-wide registry of ONNX inference sessions for the stomp classifiers.
+
+Models are resolved relative to this package (not the working directory),
+and each session is created on first use and then shared by every classifier
+instance. Sessions run single-threaded and sequentially, which is fastest for
+a single 48-feature row. The graph optimized by onnxruntime is saved to a
+cache file the first time a model is loaded. Later processes load that file
+with optimizations disabled, which skips the optimization pass entirely:
+
+    >>> sess = get_session("five_directions")
+
+`get_numpy_model` serves the same models for the NumPy backend (see
+`numpy_mlp`), caching the extracted weights so that onnxruntime, which is
+only imported for sessions, is never loaded:
+
+    >>> model = get_numpy_model("five_directions")
+"""
+
+from __future__ import annotations
+
+import hashlib
+import os
+import threading
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+import numpy as np
+
+if TYPE_CHECKING:
+    import onnxruntime as ort
+
+    from numpy_mlp import NumpyMLP
+
+MODELS_DIR = Path(__file__).resolve().parent / "models"
+
+# Registry name -> model file in MODELS_DIR
+MODELS = {
+    "left_right": "mlp_left_right.onnx",
+    "five_directions": "mlp_five_directions.onnx",
+    "all_moves": "mlp_all_moves.onnx",
+}
+
+_sessions: dict[str, ort.InferenceSession] = {}
+_numpy_models: dict[str, NumpyMLP] = {}
+_lock = threading.Lock()
+
+
+def model_path(name: str) -> Path:
+    """Path of a registered model."""
+    try:
+        return MODELS_DIR / MODELS[name]
+    except KeyError:
+        raise KeyError(
+            f"Unknown model {name!r}; expected one of {sorted(MODELS)}"
+        ) from None
+
+
+def cache_dir() -> Path:
+    """Directory holding optimized models (`$STOMP_MODEL_CACHE` overrides)."""
+    return Path(os.environ.get("STOMP_MODEL_CACHE", MODELS_DIR / ".cache"))
+
+
+def _digest(path: Path) -> str:
+    return hashlib.sha256(path.read_bytes()).hexdigest()[:16]
+
+
+def optimized_path(path: Path) -> Path:
+    """Cache file for the optimized form of the model at `path`.
+
+    Keyed by the model's content and the onnxruntime version, since the
+    optimized graph may use operators specific to that version.
+    """
+    import onnxruntime as ort
+
+    return cache_dir() / f"{path.stem}-{_digest(path)}-ort{ort.__version__}.onnx"
+
+
+def numpy_path(path: Path) -> Path:
+    """Cache file for the NumPy weights of the model at `path`."""
+    return cache_dir() / f"{path.stem}-{_digest(path)}-numpy.npz"
+
+
+def session_options(intra_op_threads: int = 1) -> ort.SessionOptions:
+    """Options tuned for low-latency inference on one row at a time."""
+    import onnxruntime as ort
+
+    options = ort.SessionOptions()
+    options.intra_op_num_threads = intra_op_threads
+    options.inter_op_num_threads = 1
+    options.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
+    options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+    return options
+
+
+def load_session(path, use_cache: bool = True) -> ort.InferenceSession:
+    """Create a session for the model at `path`, via the optimized-model cache."""
+    import onnxruntime as ort
+
+    path = Path(path)
+    options = session_options()
+    providers = ["CPUExecutionProvider"]
+
+    if not use_cache:
+        return ort.InferenceSession(str(path), options, providers=providers)
+
+    cached = optimized_path(path)
+    if cached.exists():
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_DISABLE_ALL
+        return ort.InferenceSession(str(cached), options, providers=providers)
+
+    # Optimize once and save the result. Write to a temporary file first so a
+    # concurrent process never loads a partial cache entry.
+    try:
+        cached.parent.mkdir(parents=True, exist_ok=True)
+    except OSError:
+        return ort.InferenceSession(str(path), options, providers=providers)
+    tmp = cached.with_suffix(f".{os.getpid()}.tmp")
+    # Extended optimizations leave out hardware-specific layout transforms,
+    # so the cached graph stays portable.
+    options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_EXTENDED
+    options.optimized_model_filepath = str(tmp)
+    sess = ort.InferenceSession(str(path), options, providers=providers)
+    if tmp.exists():
+        os.replace(tmp, cached)
+    return sess
+
+
+def warm_up(sess: ort.InferenceSession) -> None:
+    """Run one inference so the first real call doesn't pay for allocation."""
+    inp = sess.get_inputs()[0]
+    sess.run(None, {inp.name: np.zeros((1, inp.shape[1]), dtype=np.float32)})
+
+
+def get_session(name: str) -> ort.InferenceSession:
+    """The shared session for a registered model, created on first use."""
+    sess = _sessions.get(name)
+    if sess is not None:
+        return sess
+
+    with _lock:
+        if name not in _sessions:
+            sess = load_session(model_path(name))
+            warm_up(sess)
+            _sessions[name] = sess
+        return _sessions[name]
+
+
+def load_numpy_model(path, use_cache: bool = True) -> NumpyMLP:
+    """Extract the model at `path` for NumPy inference, via the cache."""
+    from numpy_mlp import NumpyMLP, from_onnx
+
+    path = Path(path)
+    if not use_cache:
+        return from_onnx(path)
+
+    cached = numpy_path(path)
+    if cached.exists():
+        return NumpyMLP.load(cached)
+
+    model = from_onnx(path)
+    try:
+        cached.parent.mkdir(parents=True, exist_ok=True)
+    except OSError:
+        return model
+    tmp = cached.with_suffix(f".{os.getpid()}.tmp.npz")
+    model.save(tmp)
+    os.replace(tmp, cached)
+    return model
+
+
+def get_numpy_model(name: str) -> NumpyMLP:
+    """The shared NumPy model for a registered model, created on first use."""
+    model = _numpy_models.get(name)
+    if model is not None:
+        return model
+
+    with _lock:
+        if name not in _numpy_models:
+            _numpy_models[name] = load_numpy_model(model_path(name))
+        return _numpy_models[name]
+
+
+def clear() -> None:
+    """Drop all shared sessions and models (they are recreated on next use)."""
+    with _lock:
+        _sessions.clear()
+        _numpy_models.clear()
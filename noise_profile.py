@@ -0,0 +1,111 @@
+"""Streaming noise spectrum for spectral gating of stomp features.
+
+`features.reduce_noise` estimates the noise from the quietest 10% of STFT
+frames of the clip it cleans. For a 200 ms stomp that is a single frame, and
+the clip then pays for an inverse STFT. `NoiseProfile` instead keeps a
+running average of the magnitude spectrum of audio known to be noise: the
+calibration period, and the hops on which `StompDetector` updates its noise
+floor. The fused feature extractors subtract it from the spectrogram they
+already compute, so the spectral features are gated without ever going back
+to the time domain.
+"""
+
+from __future__ import annotations
+
+import numpy as np
+
+from features import N_FFT, _frames, _hann_window
+
+FEATURE_SR = 16000
+
+
+class NoiseProfile:
+    """Running average noise magnitude spectrum, on the feature STFT's bins.
+
+    The profile is learned from audio at the capture rate `sr`, with frames
+    spanning the same time as an `N_FFT` frame at `feature_sr`, and is kept
+    interpolated onto (and scaled like) the bins of the feature STFT.
+    """
+
+    def __init__(
+        self,
+        sr: int = 48000,
+        feature_sr: int = FEATURE_SR,
+        channels: int = 2,
+        alpha: float = 0.05,
+        strength: float = 0.5,
+    ):
+        """
+        Args:
+            sr: Sampling rate of the audio passed to `update`.
+            feature_sr: Sampling rate of the stomps whose features are gated.
+            channels: Number of audio channels; each gets its own profile.
+            alpha: Weight of each new frame in the running average.
+            strength: Fraction of the noise magnitude subtracted by `gate`.
+        """
+        self.sr = sr
+        self.feature_sr = feature_sr
+        self.channels = channels
+        self.alpha = alpha
+        self.strength = strength
+
+        self.frame_len = int(round(N_FFT * sr / feature_sr))
+        self._window = _hann_window(self.frame_len)
+        self._freqs = np.fft.rfftfreq(self.frame_len, 1.0 / sr)
+        self._feature_freqs = np.fft.rfftfreq(N_FFT, 1.0 / feature_sr)
+        # A tone's STFT magnitude grows with the window sum, i.e. the frame length
+        self._scale = N_FFT / self.frame_len
+
+        # (channels, 1 + N_FFT // 2), or None until the first update
+        self.spectrum: np.ndarray | None = None
+        self.updates = 0
+
+    def update(self, audio: np.ndarray) -> bool:
+        """Fold noise-only audio into the profile.
+
+        Args:
+            audio: (T, channels) or (T,) audio at `sr`. Every full frame, at
+                a hop of a quarter frame, counts as one observation.
+
+        Returns:
+            False if `audio` is shorter than one frame and was ignored.
+        """
+        audio = np.asarray(audio, dtype=np.float32)
+        if audio.ndim == 1:
+            audio = audio[:, np.newaxis]
+        if len(audio) < self.frame_len:
+            return False
+
+        frames = _frames(audio.T, self.frame_len, self.frame_len // 4)
+        magnitude = np.abs(np.fft.rfft(frames * self._window, axis=-1)).mean(axis=-2)
+        spectrum = np.stack(
+            [np.interp(self._feature_freqs, self._freqs, m) for m in magnitude]
+        )
+        spectrum = np.broadcast_to(
+            spectrum * self._scale, (self.channels, len(self._feature_freqs))
+        )
+
+        if self.spectrum is not None:
+            weight = 1.0 - (1.0 - self.alpha) ** frames.shape[-2]
+            spectrum = (1.0 - weight) * self.spectrum + weight * spectrum
+        # Replaced, never modified in place, so that the classification
+        # thread sees either the old or the new profile
+        self.spectrum = spectrum.astype(np.float32)
+        self.updates += 1
+        return True
+
+    def gate(self, magnitude: np.ndarray, gain=1.0) -> np.ndarray:
+        """Subtract the profile from a magnitude spectrogram, clamping at 0.
+
+        Args:
+            magnitude: (..., channels, frames, 1 + N_FFT // 2) spectrogram of
+                audio at `feature_sr`.
+            gain: Scalar or (..., channels) gain already applied to that
+                audio, such as peak normalization.
+        """
+        spectrum = self.spectrum
+        if spectrum is None:
+            return magnitude
+        gain = np.asarray(gain, dtype=np.float32)[..., np.newaxis]
+        noise = self.strength * spectrum * gain
+        return np.maximum(magnitude - noise[..., np.newaxis, :], 0)
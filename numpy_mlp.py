@@ -0,0 +1,401 @@
+"""NumPy inference for the scaler + MLP classifier graphs exported by skl2onnx.
+
+The models in `models/` are a `Scaler` followed by MatMul/Add layers with
+ReLU activations and a softmax (or, for two classes, logistic) output. For
+one row, the math costs less than onnxruntime's per-call overhead.
+`from_onnx` reads the scaler, weights and biases out of the graph once, into
+contiguous float32 arrays. `NumpyMLP` then runs the forward pass for any
+batch size.
+
+Parsing needs the `onnx` package. `model_registry.get_numpy_model` caches
+the extracted arrays as `.npz`, so later processes import neither onnx nor
+onnxruntime.
+
+A model records the feature set it was trained on (see
+`features.feature_columns`) in the graph's metadata, as "feature_set".
+Models without it use the 48 `features.DEFAULT_FEATURE_SET` columns.
+`NumpyMLP.from_sklearn` and `to_onnx` turn a trained scikit-learn scaler +
+MLP into such a graph without skl2onnx.
+"""
+
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+
+from features import DEFAULT_FEATURE_SET
+
+ACTIVATIONS = ("identity", "relu", "tanh", "logistic", "softmax")
+
+# ONNX ops that select or reformat outputs and don't change the math
+_PASSTHROUGH = {
+    "Cast",
+    "Sub",
+    "Concat",
+    "ArgMax",
+    "ZipMap",
+    "ArrayFeatureExtractor",
+    "Reshape",
+}
+_ONNX_ACTIVATIONS = {
+    "Relu": "relu",
+    "Tanh": "tanh",
+    "Sigmoid": "logistic",
+    "Softmax": "softmax",
+}
+
+
+class NumpyMLP:
+    """Standardize, then a stack of dense layers."""
+
+    def __init__(
+        self,
+        offset,
+        scale,
+        weights,
+        biases,
+        activations,
+        classes,
+        feature_set: str = DEFAULT_FEATURE_SET,
+    ):
+        """
+        Args:
+            offset, scale: Scaler parameters; inputs become
+                `(x - offset) * scale`.
+            weights: (n_in, n_out) matrix per layer.
+            biases: (n_out,) vector per layer.
+            activations: Activation after each layer, from `ACTIVATIONS`. A
+                final "logistic" on one output unit gives two classes.
+            classes: Class label of each output column.
+            feature_set: Feature set the model was trained on.
+        """
+        if not len(weights) == len(biases) == len(activations):
+            raise ValueError("Need one bias and activation per weight matrix")
+        for activation in activations:
+            if activation not in ACTIVATIONS:
+                raise ValueError(f"Unknown activation {activation!r}")
+
+        self.offset = np.ascontiguousarray(offset, dtype=np.float32).ravel()
+        self.scale = np.ascontiguousarray(scale, dtype=np.float32).ravel()
+        self.weights = [np.ascontiguousarray(w, dtype=np.float32) for w in weights]
+        self.biases = [
+            np.ascontiguousarray(b, dtype=np.float32).ravel() for b in biases
+        ]
+        self.activations = list(activations)
+        self.classes = np.asarray(classes, dtype=np.int64)
+        self.feature_set = feature_set
+
+        # Fold the scaler into the first layer: ((x - o) * s) @ W + b
+        # == x @ (s[:, None] * W) + (b - (o * s) @ W)
+        w = self.weights[0].astype(np.float64)
+        self._layers = [
+            (
+                np.ascontiguousarray(self.scale[:, None] * w, dtype=np.float32),
+                (self.biases[0] - (self.offset * self.scale) @ w).astype(np.float32),
+                self.activations[0],
+            )
+        ]
+        self._layers += list(
+            zip(self.weights[1:], self.biases[1:], self.activations[1:])
+        )
+
+    @property
+    def n_features(self) -> int:
+        return self.weights[0].shape[0]
+
+    def _logits(self, features: np.ndarray) -> np.ndarray:
+        """Output layer before its softmax or logistic activation."""
+        h = np.asarray(features, dtype=np.float32).reshape(-1, self.n_features)
+        *hidden, (w_out, b_out, _) = self._layers
+        for w, b, activation in hidden:
+            h = h @ w
+            h += b
+            if activation == "relu":
+                np.maximum(h, 0, out=h)
+            elif activation == "tanh":
+                np.tanh(h, out=h)
+            elif activation == "logistic":
+                # exp overflows to inf for very negative inputs, giving 0
+                with np.errstate(over="ignore"):
+                    h = 1 / (1 + np.exp(-h))
+            elif activation == "softmax":
+                h = _softmax(h)
+        h = h @ w_out
+        h += b_out
+        return h
+
+    def predict_proba(self, features: np.ndarray) -> np.ndarray:
+        """(n, n_classes) class probabilities for a (n, n_features) batch."""
+        h = self._logits(features)
+        activation = self.activations[-1]
+        if activation == "relu":
+            np.maximum(h, 0, out=h)
+        elif activation == "tanh":
+            np.tanh(h, out=h)
+        elif activation == "logistic":
+            with np.errstate(over="ignore"):
+                h = 1 / (1 + np.exp(-h))
+        elif activation == "softmax":
+            h = _softmax(h)
+
+        if h.shape[1] == 1:
+            # Binary models output P(class 1) only
+            h = np.hstack([1 - h, h])
+        return h
+
+    def predict(self, features: np.ndarray) -> np.ndarray:
+        """Class label of each row of a (n, n_features) batch."""
+        activation = self.activations[-1]
+        if activation not in ("softmax", "logistic", "identity"):
+            return self.classes[np.argmax(self.predict_proba(features), axis=1)]
+        # Softmax and logistic are monotonic, so the largest logit (or, for a
+        # single logistic output, its sign) already picks the class
+        h = self._logits(features)
+        if h.shape[1] == 1:
+            return self.classes[(h[:, 0] > 0).astype(np.intp)]
+        return self.classes[np.argmax(h, axis=1)]
+
+    def save(self, path) -> None:
+        arrays = {"offset": self.offset, "scale": self.scale, "classes": self.classes}
+        for i, (w, b) in enumerate(zip(self.weights, self.biases)):
+            arrays[f"weight{i}"] = w
+            arrays[f"bias{i}"] = b
+        arrays["activations"] = np.array(self.activations)
+        arrays["feature_set"] = np.array(self.feature_set)
+        np.savez(path, allow_pickle=False, **arrays)
+
+    @classmethod
+    def load(cls, path) -> NumpyMLP:
+        with np.load(path) as f:
+            n_layers = len(f["activations"])
+            return cls(
+                f["offset"],
+                f["scale"],
+                [f[f"weight{i}"] for i in range(n_layers)],
+                [f[f"bias{i}"] for i in range(n_layers)],
+                [str(a) for a in f["activations"]],
+                f["classes"],
+                str(f["feature_set"]) if "feature_set" in f else DEFAULT_FEATURE_SET,
+            )
+
+    @classmethod
+    def from_sklearn(cls, model, feature_set: str = DEFAULT_FEATURE_SET) -> NumpyMLP:
+        """Convert a fitted scikit-learn `MLPClassifier`, or a `Pipeline` of
+        a `StandardScaler` and one.
+
+        Args:
+            model: The fitted estimator; class labels must be integers.
+            feature_set: Feature set it was trained on.
+        """
+        steps = [step for _, step in getattr(model, "steps", [("mlp", model)])]
+        *preprocessing, mlp = steps
+        offset = np.zeros(mlp.coefs_[0].shape[0])
+        scale = np.ones_like(offset)
+        for step in preprocessing:
+            if type(step).__name__ != "StandardScaler" or len(preprocessing) > 1:
+                raise ValueError("Only a StandardScaler may precede the MLP")
+            if step.mean_ is not None:
+                offset = step.mean_
+            if step.scale_ is not None:
+                scale = 1.0 / step.scale_
+
+        n_layers = len(mlp.coefs_)
+        activations = [mlp.activation] * (n_layers - 1) + [mlp.out_activation_]
+        return cls(
+            offset,
+            scale,
+            mlp.coefs_,
+            mlp.intercepts_,
+            activations,
+            mlp.classes_,
+            feature_set,
+        )
+
+    def to_onnx(self, path=None, fold_scaler: bool = False):
+        """ONNX graph with the inputs and outputs of the skl2onnx models.
+
+        "input" is a (n, n_features) float tensor; "output_label" holds the
+        class labels and "output_probability" one {label: probability} map
+        per row, so `classifier.MLPClassifier` and `from_onnx` can load it.
+        The feature set is stored in the metadata.
+
+        Args:
+            path: Where to save the model, if given.
+            fold_scaler: Fold the scaler into the first layer's weights, as
+                the forward pass here does, instead of a `Scaler` node. The
+                graph is then only standard ONNX operators.
+
+        Returns:
+            The `onnx.ModelProto`.
+        """
+        import onnx
+        from onnx import TensorProto, helper, numpy_helper
+
+        if fold_scaler:
+            nodes = []
+            h = "input"
+            layers = self._layers
+        else:
+            nodes = [
+                helper.make_node(
+                    "Scaler",
+                    ["input"],
+                    ["variable"],
+                    domain="ai.onnx.ml",
+                    offset=self.offset.tolist(),
+                    scale=self.scale.tolist(),
+                )
+            ]
+            h = "variable"
+            layers = list(zip(self.weights, self.biases, self.activations))
+        initializers = []
+        for i, (w, b, activation) in enumerate(layers):
+            initializers += [
+                numpy_helper.from_array(w, f"coefficient{i}"),
+                numpy_helper.from_array(b, f"intercepts{i}"),
+            ]
+            nodes += [
+                helper.make_node(
+                    "MatMul", [h, f"coefficient{i}"], [f"mul{i}"], name=f"MatMul{i}"
+                ),
+                helper.make_node(
+                    "Add", [f"mul{i}", f"intercepts{i}"], [f"layer{i}"], name=f"Add{i}"
+                ),
+            ]
+            h = f"layer{i}"
+            if activation != "identity":
+                op = {v: k for k, v in _ONNX_ACTIVATIONS.items()}[activation]
+                attributes: dict[str, Any] = {"axis": 1} if op == "Softmax" else {}
+                output = f"{op.lower()}{i}"
+                nodes.append(helper.make_node(op, [h], [output], **attributes))
+                h = output
+
+        if self.weights[-1].shape[1] == 1:
+            # Binary models output P(class 1) only
+            one = np.ones((1, 1), np.float32)
+            initializers.append(numpy_helper.from_array(one, "one"))
+            nodes += [
+                helper.make_node("Sub", ["one", h], ["negative"]),
+                helper.make_node("Concat", ["negative", h], ["probabilities"], axis=1),
+            ]
+            h = "probabilities"
+
+        initializers += [
+            numpy_helper.from_array(self.classes, "classes"),
+            numpy_helper.from_array(np.array([-1], np.int64), "shape_tensor"),
+        ]
+        nodes += [
+            helper.make_node("ArgMax", [h], ["label_index"], axis=1, keepdims=1),
+            helper.make_node(
+                "ArrayFeatureExtractor",
+                ["classes", "label_index"],
+                ["label_array"],
+                domain="ai.onnx.ml",
+            ),
+            helper.make_node(
+                "Reshape", ["label_array", "shape_tensor"], ["output_label"]
+            ),
+            helper.make_node(
+                "ZipMap",
+                [h],
+                ["output_probability"],
+                domain="ai.onnx.ml",
+                classlabels_int64s=self.classes.tolist(),
+            ),
+        ]
+
+        inputs = [
+            helper.make_tensor_value_info(
+                "input", TensorProto.FLOAT, [None, self.n_features]
+            )
+        ]
+        probability_map = helper.make_map_type_proto(
+            TensorProto.INT64, helper.make_tensor_type_proto(TensorProto.FLOAT, [])
+        )
+        outputs = [
+            helper.make_tensor_value_info("output_label", TensorProto.INT64, [None]),
+            helper.make_value_info(
+                "output_probability", helper.make_sequence_type_proto(probability_map)
+            ),
+        ]
+        graph = helper.make_graph(nodes, "numpy_mlp", inputs, outputs, initializers)
+        model = helper.make_model(
+            graph,
+            opset_imports=[
+                helper.make_opsetid("", 13),
+                helper.make_opsetid("ai.onnx.ml", 1),
+            ],
+            producer_name="numpy_mlp",
+        )
+        # Loadable by onnxruntime releases that predate the installed onnx
+        model.ir_version = 8
+        helper.set_model_props(model, {"feature_set": self.feature_set})
+        onnx.checker.check_model(model)
+        if path is not None:
+            onnx.save(model, str(Path(path)))
+        return model
+
+
+def from_onnx(path) -> NumpyMLP:
+    """Extract a `NumpyMLP` from an skl2onnx scaler + MLP classifier graph.
+
+    Raises:
+        ValueError: If the graph has an operator this backend can't run.
+    """
+    import onnx
+    from onnx import numpy_helper
+
+    model = onnx.load(str(Path(path)))
+    graph = model.graph
+    initializers = {t.name: numpy_helper.to_array(t) for t in graph.initializer}
+
+    offset = scale = None
+    weights, biases, activations = [], [], []
+    for node in graph.node:
+        attributes = {
+            a.name: onnx.helper.get_attribute_value(a) for a in node.attribute
+        }
+        if node.op_type == "Scaler":
+            offset = np.array(attributes["offset"], dtype=np.float32)
+            scale = np.array(attributes["scale"], dtype=np.float32)
+        elif node.op_type == "MatMul":
+            weights.append(initializers[node.input[1]])
+            biases.append(np.zeros(weights[-1].shape[1], np.float32))
+            activations.append("identity")
+        elif node.op_type == "Add" and node.input[1] in initializers and weights:
+            biases[-1] = initializers[node.input[1]]
+        elif node.op_type == "Gemm":
+            # MatMul + Add as fused by onnxruntime's basic optimizations
+            if attributes.get("transA", 0):
+                raise ValueError(f"{path}: unsupported transposed Gemm input")
+            w = initializers[node.input[1]] * attributes.get("alpha", 1.0)
+            weights.append(w.T if attributes.get("transB", 0) else w)
+            bias = np.zeros(weights[-1].shape[1], np.float32)
+            if len(node.input) > 2:
+                bias = bias + initializers[node.input[2]] * attributes.get("beta", 1.0)
+            biases.append(bias)
+            activations.append("identity")
+        elif node.op_type in _ONNX_ACTIVATIONS:
+            activations[-1] = _ONNX_ACTIVATIONS[node.op_type]
+        elif node.op_type not in _PASSTHROUGH:
+            raise ValueError(f"{path}: unsupported operator {node.op_type}")
+
+    if not weights:
+        raise ValueError(f"{path}: no dense layers found")
+    if offset is None:
+        offset = np.zeros(weights[0].shape[0], np.float32)
+        scale = np.ones(weights[0].shape[0], np.float32)
+    n_out = weights[-1].shape[1]
+    classes = initializers.get("classes", np.arange(max(n_out, 2)))
+    metadata = {p.key: p.value for p in model.metadata_props}
+    feature_set = metadata.get("feature_set", DEFAULT_FEATURE_SET)
+    return NumpyMLP(offset, scale, weights, biases, activations, classes, feature_set)
+
+
+def _softmax(h: np.ndarray) -> np.ndarray:
+    h -= h.max(axis=1, keepdims=True)
+    np.exp(h, out=h)
+    h /= h.sum(axis=1, keepdims=True)
+    return h
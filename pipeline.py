@@ -0,0 +1,321 @@
+"""Callback-driven capture with a staged, threaded detection pipeline.
+
+The sounddevice callback only copies each block into a preallocated
+`RingBuffer`. Detection, classification and output each run on their own
+thread, connected by bounded `StageQueue`s, so a slow stomp can never stall
+audio capture:
+
+    callback -> capture ring -> [detect] -> queue -> [classify] -> queue -> [output]
+"""
+
+import sys
+import threading
+import time
+from collections import deque
+from typing import Any, Literal
+
+import numpy as np
+
+from ring_buffer import RingBuffer
+from telemetry import Telemetry
+
+DropPolicy = Literal["block", "drop_oldest", "drop_newest"]
+DROP_POLICIES = ("block", "drop_oldest", "drop_newest")
+
+
+class QueueClosed(Exception):
+    """Raised by `StageQueue.get` once the queue is closed and drained."""
+
+
+class StageQueue:
+    """Bounded queue between two pipeline stages with a configurable policy.
+
+    When the queue is full, `put` either blocks until there is room
+    ("block"), evicts the oldest queued item ("drop_oldest"), or discards the
+    new item ("drop_newest").
+    """
+
+    def __init__(self, name: str, maxsize: int = 8, policy: DropPolicy = "drop_oldest"):
+        if maxsize <= 0:
+            raise ValueError("maxsize must be positive")
+        if policy not in DROP_POLICIES:
+            raise ValueError(f"Unknown drop policy {policy!r}")
+
+        self.name = name
+        self.maxsize = maxsize
+        self.policy = policy
+
+        self._items: deque = deque()
+        self._cond = threading.Condition()
+        self._closed = False
+
+        # Metrics
+        self.puts = 0
+        self.dropped = 0
+        self.max_depth = 0
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def put(self, item: Any, timeout: float | None = None) -> bool:
+        """Enqueue `item`. Returns False if the item (or no item) was dropped."""
+        with self._cond:
+            if self._closed:
+                return False
+
+            if len(self._items) >= self.maxsize:
+                if self.policy == "drop_newest":
+                    self.dropped += 1
+                    return False
+                elif self.policy == "drop_oldest":
+                    self._items.popleft()
+                    self.dropped += 1
+                else:
+                    if not self._cond.wait_for(
+                        lambda: len(self._items) < self.maxsize or self._closed,
+                        timeout,
+                    ):
+                        self.dropped += 1
+                        return False
+                    if self._closed:
+                        return False
+
+            self._items.append(item)
+            self.puts += 1
+            self.max_depth = max(self.max_depth, len(self._items))
+            self._cond.notify_all()
+            return True
+
+    def get(self, timeout: float | None = None) -> Any:
+        """Dequeue the oldest item.
+
+        Raises `TimeoutError` if nothing arrives within `timeout` and
+        `QueueClosed` once the queue is closed and empty.
+        """
+        with self._cond:
+            if not self._cond.wait_for(lambda: self._items or self._closed, timeout):
+                raise TimeoutError
+            if not self._items:
+                raise QueueClosed
+            item = self._items.popleft()
+            self._cond.notify_all()
+            return item
+
+    def close(self) -> None:
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    def metrics(self) -> dict:
+        return {
+            "depth": len(self._items),
+            "max_depth": self.max_depth,
+            "puts": self.puts,
+            "dropped": self.dropped,
+        }
+
+
+class StompPipeline:
+    """Runs detection, classification and output on separate threads."""
+
+    def __init__(
+        self,
+        detector,
+        classifier,
+        controller,
+        sr: int,
+        window_frames: int,
+        step_frames: int,
+        channels: int = 2,
+        capture_seconds: float = 2.0,
+        queue_size: int = 8,
+        policy: DropPolicy = "drop_oldest",
+        telemetry: Telemetry | None = None,
+        name: str = "",
+    ):
+        """
+        Args:
+            detector: Object with `process(chunk) -> list[np.ndarray]`, like
+                `StompDetector`.
+            classifier: Object with `classify(stomp) -> str`.
+            controller: Object with `press(direction, captured_at)`.
+            sr: Sampling rate of the capture stream.
+            window_frames: Detection window length (frames), used to size
+                the capture ring.
+            step_frames: Detection hop (frames).
+            channels: Number of captured channels.
+            capture_seconds: Capacity of the capture ring (seconds). If the
+                detection stage falls further behind than this, audio is lost
+                and counted as an overrun.
+            queue_size: Capacity of each inter-stage queue.
+            policy: What to do when a stage queue is full.
+            telemetry: Records a trace per hop (capture -> "detect" ->
+                "stomp_queue" -> "features" -> "inference") and exports the
+                pipeline's overrun and drop counters.
+            name: Prefix for the exported counters, so that several
+                pipelines can share one `Telemetry`.
+        """
+        self.detector = detector
+        self.classifier = classifier
+        self.controller = controller
+        self.sr = sr
+        self.window_frames = window_frames
+        self.step_frames = step_frames
+        self.name = name
+
+        capacity = max(int(capture_seconds * sr), window_frames + step_frames)
+        self.capture = RingBuffer(capacity, channels)
+        # (frames_written after the block, perf_counter() at its callback) of
+        # each captured block still held by the ring, oldest first
+        self._block_times: deque[tuple[int, float]] = deque(maxlen=capacity)
+
+        self.stomp_queue = StageQueue("stomps", queue_size, policy)
+        self.direction_queue = StageQueue("directions", queue_size, policy)
+
+        self.telemetry = telemetry if telemetry is not None else Telemetry(False)
+        self.telemetry.add_source(self._counters)
+
+        # Metrics written by the callback / detection thread
+        self.callback_status = 0
+        self.last_callback_at = 0.0
+        self.overruns = 0
+        self.hops = 0
+
+        self._read_pos = 0
+        self._running = threading.Event()
+        self._threads: list[threading.Thread] = []
+
+    def callback(self, indata, frames, time_info, status):
+        """sounddevice InputStream callback: copy the block and return."""
+        now = time.perf_counter()
+        if status:
+            self.callback_status += 1
+        # Timestamp first, so the frames are never visible without it
+        self._block_times.append((self.capture.frames_written + len(indata), now))
+        self.capture.write(indata)
+        self.last_callback_at = now
+
+    def read(self, frames: int) -> tuple[np.ndarray, bool]:
+        """Blocking `stream.read` look-alike over the capture ring.
+
+        Lets `main.calibrate` run against a callback stream before the
+        pipeline threads are started.
+        """
+        while self.capture.frames_written < self._read_pos + frames:
+            time.sleep(frames / self.sr / 4)
+
+        overflow = self.capture.overwritten(self._read_pos)
+        if overflow:
+            self._read_pos = self.capture.frames_written - frames
+
+        chunk = self.capture.read(self._read_pos, frames).copy()
+        self._read_pos += frames
+        return chunk, overflow
+
+    def start(self) -> None:
+        # Start detection from the newest audio, not from whatever piled up
+        # during calibration.
+        self._read_pos = self.capture.frames_written
+        self._running.set()
+        prefix = f"{self.name}-" if self.name else ""
+        self._threads = [
+            threading.Thread(
+                target=self._detect_loop, name=f"{prefix}detect", daemon=True
+            ),
+            threading.Thread(
+                target=self._classify_loop, name=f"{prefix}classify", daemon=True
+            ),
+            threading.Thread(
+                target=self._output_loop, name=f"{prefix}output", daemon=True
+            ),
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def stop(self, timeout: float = 1.0) -> None:
+        self._running.clear()
+        self.stomp_queue.close()
+        self.direction_queue.close()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def metrics(self) -> dict:
+        return {
+            "hops": self.hops,
+            "overruns": self.overruns,
+            "callback_status": self.callback_status,
+            "backlog_frames": self.capture.frames_written - self._read_pos,
+            self.stomp_queue.name: self.stomp_queue.metrics(),
+            self.direction_queue.name: self.direction_queue.metrics(),
+        }
+
+    def _counters(self) -> dict[str, int]:
+        prefix = f"{self.name}_" if self.name else ""
+        return {
+            f"{prefix}overruns": self.overruns,
+            f"{prefix}callback_status": self.callback_status,
+            f"{prefix}stomps_dropped": self.stomp_queue.dropped,
+            f"{prefix}directions_dropped": self.direction_queue.dropped,
+        }
+
+    def _captured_at(self, frames_read: int) -> float:
+        """Callback time of the block that completed the first `frames_read`.
+
+        Blocks before it are forgotten; the detection thread reads forward.
+        """
+        times = self._block_times
+        while len(times) > 1 and times[0][0] < frames_read:
+            times.popleft()
+        return times[0][1] if times else time.perf_counter()
+
+    def _detect_loop(self) -> None:
+        poll = self.step_frames / self.sr / 4
+        while self._running.is_set():
+            if self.capture.frames_written < self._read_pos + self.step_frames:
+                time.sleep(poll)
+                continue
+
+            chunk = self.capture.read(self._read_pos, self.step_frames).copy()
+            if self.capture.overwritten(self._read_pos):
+                # The callback lapped us; skip to the newest complete hop.
+                self.overruns += 1
+                self._read_pos = self.capture.frames_written - self.step_frames
+                continue
+            self._read_pos += self.step_frames
+            captured_at = self._captured_at(self._read_pos)
+
+            self.hops += 1
+
+            trace = self.telemetry.trace(captured_at)
+            stomps = self.detector.process(chunk)
+            trace.mark("detect")
+            if not stomps:
+                self.telemetry.finish(trace)
+
+            # The detector emits at most one stomp per hop
+            for stomp in stomps:
+                self.stomp_queue.put((stomp, captured_at, trace))
+
+    def _classify_loop(self) -> None:
+        while True:
+            try:
+                stomp, captured_at, trace = self.stomp_queue.get()
+            except QueueClosed:
+                return
+            trace.mark("stomp_queue")
+            try:
+                direction = self.classifier.classify(stomp, trace)
+            except Exception as e:
+                print(f"Warning: classification failed: {e}", file=sys.stderr)
+                continue
+            self.telemetry.finish(trace)
+            self.direction_queue.put((direction, captured_at))
+
+    def _output_loop(self) -> None:
+        while True:
+            try:
+                direction, captured_at = self.direction_queue.get()
+            except QueueClosed:
+                return
+            self.controller.press(direction, captured_at)
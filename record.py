@@ -1,16 +1,30 @@
-"""CLI utility for collecting paired stereo recordings with sounddevice."""
+"""CLI utility for collecting paired stereo recordings with sounddevice.
+
+Takes are streamed to disk as they are recorded: the input callback copies
+each block into a preallocated ring, and a writer thread appends to the WAV
+file and patches its header as it goes. Memory stays constant however long
+the take, and a crash loses at most the last flush interval of audio.
+
+With `--segment`, the writer thread also cuts stomps out of the take as it
+is written, the way `dataset_builder` would from the finished file. They
+are stored as the take's dataset cache entry, and the consolidated
+`features.npz` is rebuilt at the end of the session, so the training set
+is ready without scanning the recordings again.
+"""
 
 from __future__ import annotations
 
 import argparse
 import itertools
+import struct
 import sys
+import threading
 from pathlib import Path
-from typing import Iterable, List
+from typing import Iterable
 
 import numpy as np
-import sounddevice as sd  # type: ignore
-from scipy.io import wavfile
+
+from ring_buffer import RingBuffer
 
 
 BASE_DIRECTIONS = ["up", "down", "left", "right"]
@@ -43,6 +57,18 @@ def parse_args() -> argparse.Namespace:
         default=None,
         help="Optional sounddevice input device identifier.",
     )
+    parser.add_argument(
+        "--buffer-seconds",
+        type=float,
+        default=10.0,
+        help="Audio held in memory while the disk writer catches up (default: 10 s).",
+    )
+    parser.add_argument(
+        "--segment",
+        action="store_true",
+        help="Cut stomps out of each take while recording and build "
+        "<output_dir>/features.npz from them at the end of the session.",
+    )
     return parser.parse_args()
 
 
@@ -54,40 +80,228 @@ def prompt_for_name() -> str:
         print("NAME cannot be empty. Please try again.")
 
 
-def record_until_enter(
-    samplerate: int, blocksize: int, device: str | None, channels: int = 2
-) -> np.ndarray:
-    frames: List[np.ndarray] = []
+class WavWriter:
+    """Appends float32 blocks to a WAV file, keeping its header current.
 
-    def callback(indata, _frames, _time, status):
-        if status:
-            print(f"Recorder warning: {status}", file=sys.stderr)
-        frames.append(indata.copy())
+    The header is written up front with the sizes patched in by `flush`
+    and `close`, so the file on disk is always a valid WAV of everything
+    flushed so far.
+    """
 
-    # Keep the stream open while the user decides when to stop the take.
-    with sd.InputStream(
-        samplerate=samplerate,
-        blocksize=blocksize,
-        device=device,
-        channels=channels,
-        dtype="float32",
-        callback=callback,
+    # RIFF + fmt (IEEE float, 18 bytes) + fact + data chunk headers
+    HEADER_SIZE = 58
+    # RIFF sizes are 32-bit
+    MAX_DATA_SIZE = 0xFFFFFFFF - HEADER_SIZE
+
+    def __init__(self, path: Path, samplerate: int, channels: int = 2):
+        self.path = Path(path)
+        self.samplerate = samplerate
+        self.channels = channels
+        self.frames = 0
+
+        self._file = open(self.path, "wb")
+        block_align = 4 * channels
+        fmt = struct.pack(
+            "<HHIIHHH",
+            3,  # IEEE float
+            channels,
+            samplerate,
+            samplerate * block_align,
+            block_align,
+            32,
+            0,
+        )
+        self._file.write(struct.pack("<4sI4s", b"RIFF", 0, b"WAVE"))
+        self._file.write(struct.pack("<4sI", b"fmt ", len(fmt)) + fmt)
+        # Non-PCM files carry a fact chunk with the frame count
+        self._file.write(struct.pack("<4sII", b"fact", 4, 0))
+        self._file.write(struct.pack("<4sI", b"data", 0))
+
+    @property
+    def data_size(self) -> int:
+        return self.frames * 4 * self.channels
+
+    def write(self, block: np.ndarray) -> np.ndarray:
+        """Append a (frames, channels) block, clipped to [-1, 1].
+
+        Returns the block as written.
+        """
+        block = np.clip(block, -1.0, 1.0).astype("<f4", copy=False)
+        if self.data_size + block.nbytes > self.MAX_DATA_SIZE:
+            raise OSError(f"{self.path}: WAV files are limited to 4 GiB")
+        self._file.write(block.tobytes())
+        self.frames += len(block)
+        return block
+
+    def flush(self) -> None:
+        """Patch the header sizes and flush to the OS."""
+        self._file.seek(4)
+        self._file.write(struct.pack("<I", self.HEADER_SIZE - 8 + self.data_size))
+        self._file.seek(46)
+        self._file.write(struct.pack("<I", self.frames))
+        self._file.seek(54)
+        self._file.write(struct.pack("<I", self.data_size))
+        self._file.seek(0, 2)
+        self._file.flush()
+
+    def close(self) -> None:
+        if not self._file.closed:
+            self.flush()
+            self._file.close()
+
+
+class StreamingRecorder:
+    """Streams input callback blocks to a WAV file with constant memory.
+
+    `callback` only copies each block into a preallocated `RingBuffer`. A
+    writer thread appends whatever has arrived to the file every
+    `flush_seconds`. If the writer falls more than `buffer_seconds` behind,
+    the unwritten audio is overwritten; it is skipped and counted in
+    `stats()` instead of blocking the callback.
+
+    An optional `segmenter` (`dataset_builder.StompSegmenter`) is fed each
+    block after it is written, on the writer thread.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        samplerate: int,
+        channels: int = 2,
+        buffer_seconds: float = 10.0,
+        flush_seconds: float = 0.5,
+        segmenter=None,
     ):
-        input("Recording... press Enter to stop.")
+        self.path = Path(path)
+        self.samplerate = samplerate
+        self.flush_seconds = flush_seconds
+        self.segmenter = segmenter
+        self.capture = RingBuffer(int(buffer_seconds * samplerate), channels)
+        self.writer = WavWriter(self.path, samplerate, channels)
 
-    if not frames:
-        return np.empty((0, channels), dtype="float32")
+        # Metrics written by the callback
+        self.blocks = 0
+        self.status_errors = 0
+        # Metrics written by the writer thread
+        self.overruns = 0
+        self.dropped_frames = 0
+        self.max_lag_frames = 0
+        self.stomps = 0
+        self.error: Exception | None = None
 
-    return np.concatenate(frames, axis=0)
+        self._pos = 0
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
 
+    def callback(self, indata, frames, time_info, status) -> None:
+        """sounddevice InputStream callback: copy the block and return."""
+        if status:
+            self.status_errors += 1
+        self.capture.write(indata)
+        self.blocks += 1
 
-def iterate_directions() -> Iterable[str]:
-    yield from ALL_DIRECTIONS
+    def start(self) -> None:
+        self._thread = threading.Thread(
+            target=self._write_loop, name="recorder-writer", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> dict:
+        """Write out the remaining audio, finalize the file and return `stats()`."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.writer.close()
+        return self.stats()
 
+    def stats(self) -> dict:
+        return {
+            "seconds": self.writer.frames / self.samplerate,
+            "blocks": self.blocks,
+            "status_errors": self.status_errors,
+            "overruns": self.overruns,
+            "dropped_frames": self.dropped_frames,
+            "max_writer_lag_ms": self.max_lag_frames / self.samplerate * 1000,
+            "buffer_seconds": self.capture.capacity / self.samplerate,
+            "stomps": self.stomps,
+        }
 
-def save_wav(path: Path, samplerate: int, data: np.ndarray) -> None:
-    normalized = np.clip(data, -1.0, 1.0)
-    wavfile.write(path, samplerate, normalized.astype(np.float32))
+    def _write_loop(self) -> None:
+        while True:
+            stopping = self._stop.wait(self.flush_seconds)
+            try:
+                self._drain()
+                self.writer.flush()
+            except OSError as e:
+                self.error = e
+                print(f"Recorder error: {e}", file=sys.stderr)
+                return
+            if stopping:
+                return
+
+    def _drain(self) -> None:
+        """Append everything the callback has written since the last drain."""
+        capacity = self.capture.capacity
+        self.max_lag_frames = max(
+            self.max_lag_frames, self.capture.frames_written - self._pos
+        )
+        while self._pos < self.capture.frames_written:
+            n = min(self.capture.frames_written - self._pos, capacity // 4)
+            block = self.capture.read(self._pos, n).copy()
+            if self.capture.overwritten(self._pos):
+                # The callback lapped us; resume halfway into the ring
+                resume = self.capture.frames_written - capacity // 2
+                self.dropped_frames += resume - self._pos
+                self.overruns += 1
+                self._pos = resume
+                continue
+            written = self.writer.write(block)
+            if self.segmenter is not None:
+                self.stomps += self.segmenter.process(written)
+            self._pos += n
+
+
+def record_until_enter(
+    path: Path,
+    samplerate: int,
+    blocksize: int,
+    device: str | None,
+    channels: int = 2,
+    buffer_seconds: float = 10.0,
+    segmenter=None,
+) -> dict:
+    """Record to `path` until Enter is pressed; returns the recorder stats."""
+    import sounddevice as sd  # type: ignore
+
+    recorder = StreamingRecorder(
+        path, samplerate, channels, buffer_seconds, segmenter=segmenter
+    )
+    recorder.start()
+    try:
+        # Keep the stream open while the user decides when to stop the take.
+        with sd.InputStream(
+            samplerate=samplerate,
+            blocksize=blocksize,
+            device=device,
+            channels=channels,
+            dtype="float32",
+            callback=recorder.callback,
+        ):
+            input("Recording... press Enter to stop.")
+    finally:
+        stats = recorder.stop()
+    if recorder.status_errors:
+        print(
+            f"Recorder warning: {recorder.status_errors} blocks reported input "
+            "overflow",
+            file=sys.stderr,
+        )
+    return stats
+
+
+def iterate_directions() -> Iterable[str]:
+    yield from ALL_DIRECTIONS
 
 
 def record_direction(
@@ -97,19 +311,51 @@ def record_direction(
     samplerate: int,
     blocksize: int,
     device: str | None,
+    buffer_seconds: float = 10.0,
+    segment: bool = False,
 ) -> None:
     print(f"\nPreparing to record '{direction}' for NAME '{name}'.")
     input("Press Enter when you're ready to start recording.")
-    take = record_until_enter(samplerate=samplerate, blocksize=blocksize, device=device)
+    filepath = output_dir / f"{name}_{direction}.wav"
+
+    segmenter = None
+    if segment:
+        from dataset_builder import StompSegmenter
+
+        segmenter = StompSegmenter(samplerate)
+    stats = record_until_enter(
+        filepath,
+        samplerate=samplerate,
+        blocksize=blocksize,
+        device=device,
+        buffer_seconds=buffer_seconds,
+        segmenter=segmenter,
+    )
 
-    if take.size == 0:
+    if stats["seconds"] == 0:
         print("No audio captured; skipping file write.")
+        filepath.unlink(missing_ok=True)
         return
 
-    filepath = output_dir / f"{name}_{direction}.wav"
-    save_wav(filepath, samplerate, take)
-    duration = take.shape[0] / samplerate
-    print(f"Saved {filepath} ({duration:.1f}s).")
+    print(f"Saved {filepath} ({stats['seconds']:.1f}s).")
+    if segmenter is not None:
+        store_segments(filepath, segmenter, output_dir / ".stomp_cache")
+    if stats["dropped_frames"]:
+        print(
+            f"Warning: the disk writer fell behind and dropped "
+            f"{stats['dropped_frames'] / samplerate:.2f}s of audio "
+            f"(max lag {stats['max_writer_lag_ms']:.0f} ms)",
+            file=sys.stderr,
+        )
+
+
+def store_segments(path: Path, segmenter, cache_dir: Path) -> None:
+    """Store the stomps cut out of a finished take as its dataset cache entry."""
+    from dataset_builder import cache_path, store_stomps
+
+    stomps, offsets = segmenter.finish()
+    store_stomps(cache_path(path, cache_dir), stomps, offsets)
+    print(f"Segmented {len(stomps)} stomps from {path.name}.")
 
 
 def main() -> None:
@@ -131,10 +377,18 @@ def main() -> None:
                 samplerate=args.samplerate,
                 blocksize=args.blocksize,
                 device=args.device,
+                buffer_seconds=args.buffer_seconds,
+                segment=args.segment,
             )
     except KeyboardInterrupt:
         print("\nSession interrupted by user. Any completed takes have been saved.")
 
+    if args.segment:
+        from dataset_builder import build_dataset
+
+        # Every take has a cache entry by now, so this only consolidates
+        build_dataset(output_dir, workers=1)
+
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,284 @@
+"""Replay recordings through the full stomp pipeline faster than realtime.
+
+Drives `FileStream` -> `StompDetector` -> classifier -> `DummyController`
+as fast as the CPU allows and reports the realtime factor, per-stage
+latency (via `telemetry.Telemetry`), and, when the true stomp onsets are
+known, detection precision/recall and onset timing error.
+
+`make_stomp_track` synthesizes a track with known onsets, so the harness
+needs no recordings:
+
+    python replay.py --synthetic 60
+    python replay.py take.wav --onsets take.onsets.json --low-latency
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import tempfile
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+
+import numpy as np
+
+from controller import DummyController
+from file_stream import FileStream
+from stomp_detector import StompDetector
+from telemetry import Telemetry
+
+
+def make_stomp_track(
+    sr: int = 48000,
+    duration: float = 30.0,
+    min_gap: float = 0.4,
+    max_gap: float = 0.9,
+    noise: float = 1e-3,
+    seed: int = 0,
+) -> tuple[np.ndarray, np.ndarray]:
+    """Background noise with decaying noise-burst "stomps" at known onsets.
+
+    Gaps between onsets are drawn from [min_gap, max_gap] seconds; each
+    stomp has a random loudness and left/right balance.
+
+    Returns:
+        (frames, 2) float32 audio and the onset times in seconds.
+    """
+    rng = np.random.default_rng(seed)
+    audio = rng.standard_normal((int(duration * sr), 2)).astype(np.float32) * noise
+
+    onsets = []
+    t = 0.5
+    while t < duration - 0.5:
+        onsets.append(t)
+        t += rng.uniform(min_gap, max_gap)
+
+    length = int(0.08 * sr)
+    envelope = np.exp(-np.arange(length) / (0.015 * sr))[:, np.newaxis]
+    for onset in onsets:
+        start = int(onset * sr)
+        balance = rng.uniform(0.2, 1.0, 2)
+        burst = rng.standard_normal((length, 2)) * envelope * balance
+        audio[start : start + length] += rng.uniform(0.1, 0.5) * burst
+
+    return audio, np.array(onsets)
+
+
+def write_track(path, audio: np.ndarray, sr: int, onsets: np.ndarray) -> Path:
+    """Write a track and its onsets (`<path>.onsets.json`); returns that path."""
+    from scipy.io import wavfile
+
+    path = Path(path)
+    wavfile.write(path, sr, audio)
+    onsets_path = path.with_suffix(".onsets.json")
+    onsets_path.write_text(json.dumps([float(t) for t in onsets]))
+    return onsets_path
+
+
+@dataclass
+class ReplayResult:
+    duration: float
+    """Seconds of audio replayed."""
+    wall_time: float
+    """Seconds it took."""
+    onsets: list[float] = field(default_factory=list)
+    """Detected onset times (seconds)."""
+    directions: list[str] = field(default_factory=list)
+    """Classified direction of each detection."""
+    telemetry: dict = field(default_factory=dict)
+    """`Telemetry.snapshot()` of the run."""
+    detection_latency: dict = field(default_factory=dict)
+    """`StompDetector.latency_stats()` of the run."""
+
+    @property
+    def realtime_factor(self) -> float:
+        return self.duration / self.wall_time if self.wall_time > 0 else float("inf")
+
+
+def replay(
+    path,
+    classifier=None,
+    hop_ms: float | None = None,
+    threshold: float = 7.0,
+    low_latency: bool = False,
+    noise_level: float | None = None,
+) -> ReplayResult:
+    """Replay one file through detection, classification and output.
+
+    Args:
+        path: Audio file to replay.
+        classifier: Stomp classifier; defaults to the five-direction MLP
+            that `main.py` uses.
+        hop_ms: Detection hop (ms); defaults to 10 in low-latency mode,
+            else 100, as in `main.py`.
+        threshold: Detector energy threshold (multiple of the noise floor).
+        low_latency: Use the detector's low-latency mode.
+        noise_level: Initial noise floor; defaults to the detector's.
+    """
+    if classifier is None:
+        from classifier import FiveDirectionClassifier
+
+        classifier = FiveDirectionClassifier()
+
+    telemetry = Telemetry()
+    # The detector enforces its own sample-clock cooldown
+    controller = DummyController(cooldown=0.0, verbose=False)
+    result = ReplayResult(duration=0.0, wall_time=0.0)
+
+    with FileStream(str(path)) as stream:
+        sr = stream.sr
+        hop_ms = hop_ms or (10 if low_latency else 100)
+        step_frames = int((hop_ms / 1000.0) * sr)
+        detector = StompDetector(
+            sr=sr,
+            energy_threshold=threshold,
+            incremental=True,
+            low_latency=low_latency,
+            telemetry=telemetry,
+        )
+        if noise_level is not None:
+            detector.noise_level = noise_level
+
+        start = time.perf_counter()
+        while not stream.finished:
+            trace = telemetry.trace()
+            chunk, _overflow = stream.read(step_frames)
+            captured_at = time.perf_counter()
+            trace.mark("read")
+
+            stomps = detector.process(chunk)
+            trace.mark("detect")
+
+            for stomp in stomps:
+                result.onsets.append(detector.events[-1][0] / sr)
+                direction = classifier.classify(stomp, trace)
+                controller.press(direction, captured_at)
+                result.directions.append(direction)
+
+            telemetry.finish(trace)
+        result.wall_time = time.perf_counter() - start
+        result.duration = detector.frames_seen / sr
+
+    result.telemetry = telemetry.snapshot()
+    result.detection_latency = detector.latency_stats()
+    return result
+
+
+def score(detected, expected, tolerance: float = 0.05) -> dict:
+    """Match detected to true onsets (seconds) within `tolerance`.
+
+    Each true onset is matched to the nearest unmatched detection. Returns
+    precision, recall and the timing error (detected - true) of matches.
+    """
+    detected = sorted(detected)
+    matched = [False] * len(detected)
+    errors = []
+    for t in sorted(expected):
+        best = None
+        for i, d in enumerate(detected):
+            if not matched[i] and abs(d - t) <= tolerance:
+                if best is None or abs(d - t) < abs(detected[best] - t):
+                    best = i
+        if best is not None:
+            matched[best] = True
+            errors.append(detected[best] - t)
+
+    errors_ms = np.array(errors) * 1000
+    return {
+        "precision": len(errors) / len(detected) if detected else 1.0,
+        "recall": len(errors) / len(expected) if len(expected) else 1.0,
+        "timing_error_ms": {
+            "mean": float(np.mean(errors_ms)) if len(errors) else 0.0,
+            "p95_abs": float(np.percentile(np.abs(errors_ms), 95))
+            if len(errors)
+            else 0.0,
+            "max_abs": float(np.max(np.abs(errors_ms))) if len(errors) else 0.0,
+        },
+    }
+
+
+def print_report(result: ReplayResult, scores: dict | None = None) -> None:
+    print(
+        f"Replayed {result.duration:.1f}s in {result.wall_time:.2f}s "
+        f"({result.realtime_factor:.0f}x realtime), "
+        f"{len(result.onsets)} stomps detected"
+    )
+    print(
+        f"{'stage':>12} {'count':>7} {'mean':>8} {'p50':>8} {'p95':>8} {'p99':>8}  (ms)"
+    )
+    for stage, stats in result.telemetry["stages"].items():
+        print(
+            f"{stage:>12} {stats['count']:>7} {stats['mean_ms']:>8.3f} "
+            f"{stats.get('p50_ms', 0):>8.3f} {stats.get('p95_ms', 0):>8.3f} "
+            f"{stats.get('p99_ms', 0):>8.3f}"
+        )
+    if result.detection_latency:
+        print(
+            "Onset-to-detection latency (audio time, ms): "
+            f"{result.detection_latency['onset_to_detect_ms']}"
+        )
+    if scores is not None:
+        timing = scores["timing_error_ms"]
+        print(
+            f"Precision {scores['precision']:.3f}, recall {scores['recall']:.3f}, "
+            f"onset error mean {timing['mean']:+.2f} ms, "
+            f"p95 |{timing['p95_abs']:.2f}| ms, max |{timing['max_abs']:.2f}| ms"
+        )
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Replay audio through the stomp pipeline faster than realtime."
+    )
+    parser.add_argument("file", nargs="?", type=Path, help="Audio file to replay.")
+    parser.add_argument(
+        "--onsets",
+        type=Path,
+        default=None,
+        help="JSON list of true onset times (s), for precision/recall.",
+    )
+    parser.add_argument(
+        "--synthetic",
+        type=float,
+        default=None,
+        metavar="SECONDS",
+        help="Replay a synthetic track of this length instead of a file.",
+    )
+    parser.add_argument(
+        "--sr", type=int, default=48000, help="Sample rate of the synthetic track."
+    )
+    parser.add_argument("--hop-ms", type=float, default=None)
+    parser.add_argument("--threshold", type=float, default=7.0)
+    parser.add_argument("--low-latency", action="store_true")
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path, onsets_path = args.file, args.onsets
+        if args.synthetic is not None:
+            audio, onsets = make_stomp_track(sr=args.sr, duration=args.synthetic)
+            path = Path(tmp) / "synthetic.wav"
+            onsets_path = write_track(path, audio, args.sr, onsets)
+        elif path is None:
+            raise SystemExit("Give an audio file or --synthetic SECONDS")
+
+        result = replay(
+            path,
+            hop_ms=args.hop_ms,
+            threshold=args.threshold,
+            low_latency=args.low_latency,
+        )
+        scores = None
+        if onsets_path is not None:
+            expected = json.loads(Path(onsets_path).read_text())
+            scores = score(result.onsets, expected)
+
+    print_report(result, scores)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,218 @@
+"""Polyphase resampling with filters designed once per rate pair.
+
+`PolyphaseResampler` replaces the per-detection `librosa.resample` call. The
+anti-aliasing filter for a device rate -> 16 kHz pair is designed and split
+into polyphase components once, so a call only pays for the filtering
+itself. Its output matches `scipy.signal.resample_poly` with the default
+Kaiser window. Integer decimation (48k, 96k -> 16k) and rational ratios
+(44.1k -> 16k, 160/441) share the same code path.
+
+`StreamingResampler` applies the same filter to a continuous stream, one
+chunk at a time, so that a resampled window is already available when a
+stomp is detected.
+
+Everything here is plain NumPy: importing scipy.signal alone takes about a
+second, which is most of the application's startup time.
+"""
+
+from functools import lru_cache
+from math import ceil, gcd
+
+import numpy as np
+
+
+def design_filter(up: int, down: int) -> tuple[np.ndarray, int]:
+    """Anti-aliasing FIR filter used by `scipy.signal.resample_poly`.
+
+    Returns the (2 * half_len + 1)-tap filter, scaled by `up`, and half_len.
+    """
+    max_rate = max(up, down)
+    half_len = 10 * max_rate
+    # Kaiser-windowed sinc lowpass with unit DC gain, as scipy.signal.firwin
+    # designs it for window=("kaiser", 5.0)
+    n = np.arange(2 * half_len + 1) - half_len
+    taps = np.sinc(n / max_rate) / max_rate * np.kaiser(2 * half_len + 1, 5.0)
+    taps /= np.sum(taps)
+    return taps * up, half_len
+
+
+class UpFirDn:
+    """Upsample, FIR filter and downsample (`scipy.signal.upfirdn`).
+
+    The filter is split into its `up` polyphase components once, so each
+    output sample is a single dot product over about len(h) / up inputs.
+    """
+
+    def __init__(self, h: np.ndarray, up: int, down: int):
+        self.up = up
+        self.down = down
+        self.n_taps = len(h)
+        self.n_phase_taps = -(-len(h) // up)
+
+        padded = np.zeros(self.n_phase_taps * up, dtype=h.dtype)
+        padded[: len(h)] = h
+        # phases[p, l] = h[p + (n_phase_taps - 1 - l) * up], i.e. each phase's
+        # taps reversed so they line up with a window of consecutive inputs
+        self.phases = np.ascontiguousarray(padded.reshape(-1, up).T[:, ::-1])
+
+    def output_length(self, n: int) -> int:
+        """Number of output frames for `n` input frames."""
+        return -(-((n - 1) * self.up + self.n_taps) // self.down)
+
+    def __call__(self, x: np.ndarray, axis: int = -1) -> np.ndarray:
+        x = np.moveaxis(x, axis, -1)
+        n_out = self.output_length(x.shape[-1])
+        L = self.n_phase_taps
+
+        # Output m reads inputs q - L + 1 .. q through phase p
+        t = np.arange(n_out) * self.down
+        p, q = t % self.up, t // self.up
+
+        # Zero-padded copy with time as the contiguous axis
+        n = x.shape[-1]
+        pad_after = max(0, int(q[-1]) + 1 - n) if n_out else 0
+        padded = np.zeros(x.shape[:-1] + (L - 1 + n + pad_after,), dtype=x.dtype)
+        padded[..., L - 1 : L - 1 + n] = x
+        windows = np.lib.stride_tricks.sliding_window_view(padded, L, axis=-1)
+
+        # einsum reads the strided windows without copying them first, which
+        # makes it faster than matmul here
+        if self.up == 1:
+            # Integer decimation: one phase, windows at a fixed stride
+            windows = windows[..., : n_out * self.down : self.down, :]
+            y = np.einsum("...ml,l->...m", windows, self.phases[0])
+        else:
+            y = np.einsum("...ml,ml->...m", windows[..., q, :], self.phases[p])
+        return np.moveaxis(y, -1, axis)
+
+
+class PolyphaseResampler:
+    """Resamples audio from `orig_sr` to `target_sr` with a cached filter."""
+
+    def __init__(self, orig_sr: int, target_sr: int = 16000):
+        g = gcd(orig_sr, target_sr)
+        self.orig_sr = orig_sr
+        self.target_sr = target_sr
+        self.up = target_sr // g
+        self.down = orig_sr // g
+
+        if self.up == self.down:
+            taps, self.half_len = np.ones(1), 0
+        else:
+            taps, self.half_len = design_filter(self.up, self.down)
+        self.taps = taps
+
+        # Per-dtype copies of the taps, so float32 audio stays float32
+        self._taps: dict[np.dtype, np.ndarray] = {
+            np.dtype(np.float32): taps.astype(np.float32),
+            np.dtype(np.float64): taps,
+        }
+        self._kernel = lru_cache(maxsize=8)(self._make_kernel)
+
+    def output_length(self, n: int) -> int:
+        """Number of output frames for `n` input frames."""
+        return ceil(n * self.up / self.down)
+
+    def _make_kernel(self, n: int, dtype) -> tuple[UpFirDn, int]:
+        """Polyphase kernel over the taps zero-padded as resample_poly does
+        for `n` input frames, and the number of leading outputs to discard."""
+        up, down, half_len = self.up, self.down, self.half_len
+        n_out = self.output_length(n)
+
+        n_pre_pad = down - half_len % down
+        n_pre_remove = (half_len + n_pre_pad) // down
+        n_post_pad = 0
+        while (
+            (n - 1) * up + len(self.taps) + n_pre_pad + n_post_pad
+        ) // down + 1 < n_out + n_pre_remove:
+            n_post_pad += 1
+
+        taps = np.concatenate(
+            [np.zeros(n_pre_pad), self.taps, np.zeros(n_post_pad)]
+        ).astype(dtype)
+        return UpFirDn(taps, up, down), n_pre_remove
+
+    def __call__(self, audio: np.ndarray, axis: int = 0) -> np.ndarray:
+        """Resample `audio` along `axis` (equivalent to resample_poly)."""
+        audio = np.asarray(audio)
+        if self.up == self.down:
+            return audio.copy()
+
+        dtype = audio.dtype if audio.dtype in self._taps else np.dtype(np.float64)
+        n = audio.shape[axis]
+        kernel, n_pre_remove = self._kernel(n, dtype)
+
+        y = kernel(audio, axis=axis)
+        keep = slice(n_pre_remove, n_pre_remove + self.output_length(n))
+        return y[(slice(None),) * (axis % audio.ndim) + (keep,)]
+
+    def segment_start(self, n: int) -> int:
+        """Largest input index <= n at which an `UpFirDn` call lines up with
+        the global output grid, i.e. (start * up - half_len) % down == 0."""
+        s0 = self.half_len * pow(self.up, -1, self.down) % self.down
+        return n - (n - s0) % self.down
+
+
+class StreamingResampler:
+    """Resamples a (frames, channels) stream chunk by chunk.
+
+    `process` returns the output frames that depend only on input seen so
+    far; `pending` returns the remaining output frames up to the end of the
+    input, computed as if the stream ended there (which is what a one-shot
+    resample of a window does at its right edge).
+    """
+
+    def __init__(self, orig_sr: int, target_sr: int = 16000, channels: int = 2):
+        self.resampler = PolyphaseResampler(orig_sr, target_sr)
+        self.channels = channels
+        self._taps = self.resampler._taps[np.dtype(np.float32)]
+        r = self.resampler
+        self._kernel = UpFirDn(self._taps, r.up, r.down) if r.up != r.down else None
+        self.reset()
+
+    def reset(self) -> None:
+        r = self.resampler
+        self.frames_in = 0
+        self.frames_out = 0
+        # Input history with zeros before the start of the stream, beginning
+        # on a frame that lines up with the output grid.
+        self._history_start = r.segment_start(-(len(self._taps) // r.up + 1))
+        self._history = np.zeros((-self._history_start, self.channels), np.float32)
+
+    def _filter(self, end: int) -> np.ndarray:
+        """Outputs from `frames_out` to `end`, zero-extending the input."""
+        r = self.resampler
+        if self._kernel is None:
+            y = self._history
+        else:
+            y = self._kernel(self._history, axis=0)
+        first = (self._history_start * r.up - r.half_len) // r.down
+        return y[self.frames_out - first : end - first]
+
+    def process(self, chunk: np.ndarray) -> np.ndarray:
+        """Push a chunk of input; returns the newly settled output frames."""
+        r = self.resampler
+        if chunk.ndim == 1:
+            chunk = chunk[:, np.newaxis]
+
+        self._history = np.concatenate([self._history, chunk.astype(np.float32)])
+        self.frames_in += len(chunk)
+
+        # Outputs whose filter support lies entirely inside the input so far
+        end = max(self.frames_out, ceil((self.frames_in * r.up - r.half_len) / r.down))
+        out = self._filter(end)
+        self.frames_out = end
+
+        # Drop input that no future output depends on
+        earliest = (self.frames_out * r.down - r.half_len) // r.up
+        drop = r.segment_start(earliest) - self._history_start
+        if drop > 0:
+            self._history = self._history[drop:]
+            self._history_start += drop
+
+        return out
+
+    def pending(self) -> np.ndarray:
+        """Provisional output frames between the settled output and the end
+        of the input, assuming zeros after the last input frame."""
+        return self._filter(self.resampler.output_length(self.frames_in))
@@ -0,0 +1,96 @@
+import numpy as np
+
+
+class RingBuffer:
+    """Fixed-size multichannel circular buffer for streaming audio windows.
+
+    Samples are stored twice (a "mirrored" layout), so any span of up to
+    ``capacity`` frames is always contiguous in memory and can be returned as
+    a view without copying. Writes cost O(frames written).
+    """
+
+    def __init__(self, capacity: int, channels: int = 2, dtype=np.float32):
+        """
+        Args:
+            capacity: Maximum number of frames held by the buffer.
+            channels: Number of audio channels.
+            dtype: Sample dtype of the buffer.
+        """
+        if capacity <= 0:
+            raise ValueError("capacity must be positive")
+
+        self.capacity = capacity
+        self.channels = channels
+        self.dtype = np.dtype(dtype)
+
+        # Two copies back to back: buffer[i] == buffer[i + capacity]
+        self._buffer = np.zeros((2 * capacity, channels), dtype=self.dtype)
+
+        # Total number of frames ever written (monotonic sample clock)
+        self.frames_written = 0
+
+    def __len__(self) -> int:
+        return min(self.frames_written, self.capacity)
+
+    def write(self, chunk: np.ndarray) -> None:
+        """Append a (frames, channels) chunk, overwriting the oldest frames."""
+        if chunk.ndim == 1:
+            chunk = chunk[:, np.newaxis]
+
+        n = len(chunk)
+        if n > self.capacity:
+            # Only the newest `capacity` frames survive anyway
+            self.frames_written += n - self.capacity
+            chunk = chunk[-self.capacity :]
+            n = self.capacity
+
+        start = self.frames_written % self.capacity
+        first = min(n, self.capacity - start)
+
+        self._buffer[start : start + first] = chunk[:first]
+        self._buffer[start + self.capacity : start + self.capacity + first] = chunk[
+            :first
+        ]
+        if first < n:
+            rest = n - first
+            self._buffer[:rest] = chunk[first:]
+            self._buffer[self.capacity : self.capacity + rest] = chunk[first:]
+
+        # Publish the frames only once both copies are written, so a reader on
+        # another thread never sees a half-written span.
+        self.frames_written += n
+
+    def latest(self, frames: int) -> np.ndarray:
+        """Return a contiguous read-only view of the newest `frames` frames.
+
+        Frames that have not been written yet read as zeros. The view aliases
+        the buffer, so it is only valid until the next `write`.
+        """
+        return self.read(self.frames_written - frames, frames)
+
+    def read(self, start: int, frames: int) -> np.ndarray:
+        """Return a view of `frames` frames starting at absolute frame `start`.
+
+        `start` is measured on the `frames_written` clock. Callers reading
+        from another thread should check `overwritten(start)` after copying
+        the data out.
+        """
+        if frames > self.capacity:
+            raise ValueError(
+                f"Cannot read {frames} frames from a buffer of {self.capacity}"
+            )
+        if start + frames > self.frames_written:
+            raise ValueError("Cannot read frames that have not been written yet")
+
+        offset = start % self.capacity
+        view = self._buffer[offset : offset + frames]
+        view.flags.writeable = False
+        return view
+
+    def overwritten(self, start: int) -> bool:
+        """Whether the frame at absolute index `start` has been overwritten."""
+        return start < self.frames_written - self.capacity
+
+    def clear(self) -> None:
+        self._buffer.fill(0)
+        self.frames_written = 0
@@ -0,0 +1,356 @@
+"""Memory-mapped stomp dataset for training.
+
+All stomps of a recording archive are stored in one (N, T, 2) array file,
+quantized to int16 (or float16), next to a small table of labels and
+metadata: speaker NAME, move index in `MOVES`, source file, and the window's
+offset in that file. Opening a dataset maps the array instead of reading
+it, so it takes milliseconds and costs no memory until stomps are touched;
+batches over contiguous index ranges are views of the file.
+
+    python stomp_dataset.py ./dataset --output ./dataset/stomps
+
+    >>> dataset = StompDataset("./dataset/stomps")
+    >>> train, test = dataset.split(test_size=0.2)
+    >>> for audio, y in dataset.batches(train, batch_size=256):
+    ...     ...
+
+The stomps come from the `dataset_builder` cache, which is refreshed first,
+so only new or changed recordings are segmented.
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Iterator
+
+import numpy as np
+
+from dataset_builder import (
+    MOVES,
+    SAMPLE_RATE,
+    WINDOW_MS,
+    cache_path,
+    list_audio_files,
+    move_from_filename,
+    segment_file,
+    store_stomps,
+)
+
+FORMAT_VERSION = 1
+DTYPES = ("int16", "float16")
+# int16 full scale; samples are clipped to [-1, 1]
+INT16_SCALE = 32767
+
+
+def name_from_filename(path) -> str:
+    """The speaker NAME of a `NAME_move.wav` file."""
+    return Path(path).stem.rsplit("_", 1)[0]
+
+
+def quantize(stomps: np.ndarray, dtype: str = "int16") -> np.ndarray:
+    """Convert float stomps to the storage dtype."""
+    if dtype == "int16":
+        return np.round(np.clip(stomps, -1.0, 1.0) * INT16_SCALE).astype(np.int16)
+    if dtype == "float16":
+        return stomps.astype(np.float16)
+    raise ValueError(f"dtype must be one of {DTYPES}, got {dtype!r}")
+
+
+def dequantize(stomps: np.ndarray) -> np.ndarray:
+    """float32 copy of stored stomps."""
+    if stomps.dtype == np.int16:
+        return stomps.astype(np.float32) * np.float32(1 / INT16_SCALE)
+    return stomps.astype(np.float32)
+
+
+class StompDataset:
+    """A memory-mapped stomp dataset written by `write_stomp_dataset`.
+
+    Attributes:
+        stomps: (N, T, 2) read-only memmap of the stored samples.
+        X: (N, 48) float32 features of each stomp.
+        y: Move index of each stomp in `MOVES`.
+        name, filename, move: Speaker, source file and move name per stomp.
+        offset: Frame (at `sample_rate`) where each window starts in its
+            source file.
+        stomp_idx: Index of the stomp within its source file.
+    """
+
+    def __init__(self, path):
+        path = Path(path)
+        with np.load(path / "metadata.npz") as metadata:
+            version = int(metadata["format_version"])
+            if version != FORMAT_VERSION:
+                raise ValueError(
+                    f"{path}: format version {version}, expected {FORMAT_VERSION}"
+                )
+            self.sample_rate = int(metadata["sample_rate"])
+            self.X = metadata["X"]
+            self.y = metadata["y"]
+            self.name = metadata["name"]
+            self.filename = metadata["filename"]
+            self.move = metadata["move"]
+            self.offset = metadata["offset"]
+            self.stomp_idx = metadata["stomp_idx"]
+        self.stomps = np.load(path / "stomps.npy", mmap_mode="r")
+        if len(self.stomps) != len(self.y):
+            raise ValueError(f"{path}: stomps and metadata have different lengths")
+
+    def __len__(self) -> int:
+        return len(self.y)
+
+    @property
+    def metadata(self):
+        """The label/metadata table as a DataFrame."""
+        import pandas as pd
+
+        return pd.DataFrame(
+            {
+                "name": self.name,
+                "file": self.filename,
+                "move": self.move,
+                "y": self.y,
+                "offset": self.offset,
+                "stomp_idx": self.stomp_idx,
+            }
+        )
+
+    def audio(self, indices) -> np.ndarray:
+        """float32 stomps at `indices` (an index, slice or index array)."""
+        return dequantize(self.stomps[indices])
+
+    def select(self, moves=None, names=None) -> np.ndarray:
+        """Indices of the stomps with one of `moves` and from one of `names`."""
+        mask = np.ones(len(self), dtype=bool)
+        if moves is not None:
+            mask &= np.isin(self.move, list(moves))
+        if names is not None:
+            mask &= np.isin(self.name, list(names))
+        return np.flatnonzero(mask)
+
+    def labels(self, moves) -> np.ndarray:
+        """Index of each stomp's move in `moves`, or -1 for other moves."""
+        labels = np.full(len(self), -1)
+        for label, move in enumerate(moves):
+            labels[self.move == move] = label
+        return labels
+
+    def split(
+        self, indices=None, test_size: float = 0.2, seed: int = 42, by=None
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """Stratified train/test split of `indices` (default: all stomps).
+
+        Each class of `by` (default: the move label) is split in the same
+        proportion, keeping at least one stomp of it in the training set.
+        Both index arrays are sorted, so batches read the file in order.
+        """
+        indices = np.arange(len(self)) if indices is None else np.asarray(indices)
+        labels = (self.y if by is None else np.asarray(by))[indices]
+        rng = np.random.default_rng(seed)
+
+        parts = []
+        for label in np.unique(labels):
+            members = rng.permutation(indices[labels == label])
+            n_test = min(round(test_size * len(members)), len(members) - 1)
+            parts.append(members[:n_test])
+        test = np.sort(np.concatenate(parts)) if parts else indices[:0]
+        train = np.setdiff1d(indices, test)
+        return train, test
+
+    def batches(
+        self,
+        indices=None,
+        batch_size: int = 256,
+        shuffle: bool = False,
+        seed: int | None = None,
+        dtype=np.float32,
+    ) -> Iterator[tuple[np.ndarray, np.ndarray]]:
+        """Yield (audio, y) batches of the stomps at `indices`.
+
+        A batch of consecutive stomps is a view of the memmap; others are
+        gathered with one fancy-indexing read. With `dtype=None` the stored
+        samples are returned as-is, so those views involve no copy at all.
+        """
+        indices = np.arange(len(self)) if indices is None else np.asarray(indices)
+        if shuffle:
+            indices = np.random.default_rng(seed).permutation(indices)
+
+        for start in range(0, len(indices), batch_size):
+            batch = indices[start : start + batch_size]
+            if np.all(np.diff(batch) == 1):
+                audio = self.stomps[batch[0] : batch[-1] + 1]
+            else:
+                audio = self.stomps[batch]
+            if dtype is not None:
+                audio = dequantize(audio).astype(dtype, copy=False)
+            yield audio, self.y[batch]
+
+
+def write_stomp_dataset(output, entries, dtype: str = "int16") -> StompDataset:
+    """Write cache entries to a dataset directory.
+
+    Args:
+        output: Dataset directory (created if needed).
+        entries: List of (recording path, cache entry path) pairs. Entries
+            are read one at a time, so memory stays at one recording's worth.
+        dtype: Storage dtype, "int16" or "float16".
+    """
+    if dtype not in DTYPES:
+        raise ValueError(f"dtype must be one of {DTYPES}, got {dtype!r}")
+    output = Path(output)
+    output.mkdir(parents=True, exist_ok=True)
+
+    lengths = []
+    for _path, entry_path in entries:
+        with np.load(entry_path) as entry:
+            lengths.append(len(entry["offsets"]))
+    n = sum(lengths)
+    window_frames = int((WINDOW_MS / 1000.0) * SAMPLE_RATE)
+
+    suffix = f".{os.getpid()}.tmp"
+    stomps_tmp = output / f"stomps.npy{suffix}"
+    stomps = np.lib.format.open_memmap(
+        stomps_tmp, mode="w+", dtype=dtype, shape=(n, window_frames, 2)
+    )
+    X, y, names, files, moves, offsets = [], [], [], [], [], []
+    stomp_idx: list[int] = []
+    position = 0
+    for (path, entry_path), count in zip(entries, lengths):
+        if not count:
+            continue
+        with np.load(entry_path) as entry:
+            stomps[position : position + count] = quantize(entry["stomps"], dtype)
+            X.append(entry["features"])
+            offsets.append(entry["offsets"])
+        position += count
+
+        move = move_from_filename(path)
+        y.extend([MOVES.index(move)] * count)
+        names.extend([name_from_filename(path)] * count)
+        files.extend([Path(path).name] * count)
+        moves.extend([move] * count)
+        stomp_idx.extend(range(count))
+    stomps.flush()
+    del stomps
+
+    metadata_tmp = output / f"metadata{suffix}.npz"
+    np.savez(
+        metadata_tmp,
+        format_version=FORMAT_VERSION,
+        sample_rate=SAMPLE_RATE,
+        X=np.concatenate(X) if X else np.empty((0, 48), dtype=np.float32),
+        y=np.array(y, dtype=np.int64),
+        name=np.array(names, dtype=str),
+        filename=np.array(files, dtype=str),
+        move=np.array(moves, dtype=str),
+        offset=np.concatenate(offsets) if offsets else np.empty(0, np.int64),
+        stomp_idx=np.array(stomp_idx, dtype=np.int64),
+    )
+    # Metadata last: a reader never sees it with a stale or partial array
+    os.replace(stomps_tmp, output / "stomps.npy")
+    os.replace(metadata_tmp, output / "metadata.npz")
+    return StompDataset(output)
+
+
+def _cache_entry(args):
+    """Cache entry path of a recording, segmenting it first if needed."""
+    path, cache_dir = args
+    try:
+        entry_path = cache_path(path, cache_dir)
+        if not entry_path.exists():
+            store_stomps(entry_path, *segment_file(path))
+        return entry_path
+    except Exception as e:
+        return e
+
+
+def build_stomp_dataset(
+    base_path, output=None, cache_dir=None, workers=None, dtype: str = "int16"
+) -> StompDataset:
+    """Build (or rebuild) the memory-mapped dataset of a recording archive.
+
+    Args:
+        base_path: Directory searched recursively for `NAME_move.wav` files.
+        output: Dataset directory. Defaults to `<base_path>/stomps`.
+        cache_dir: Per-file cache directory shared with `dataset_builder`.
+            Defaults to `<base_path>/.stomp_cache`.
+        workers: Processes segmenting uncached recordings (default: CPU
+            count). With 1, files are processed in this process.
+        dtype: Storage dtype, "int16" or "float16".
+    """
+    base_path = Path(base_path)
+    output = Path(output) if output else base_path / "stomps"
+    cache_dir = Path(cache_dir) if cache_dir else base_path / ".stomp_cache"
+    cache_dir.mkdir(parents=True, exist_ok=True)
+
+    audio_files = list_audio_files(base_path)
+    jobs = [(path, cache_dir) for path in audio_files]
+    if workers == 1:
+        results = list(map(_cache_entry, jobs))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(_cache_entry, jobs))
+
+    entries = []
+    for path, result in zip(audio_files, results):
+        if isinstance(result, Exception):
+            print(f"Skipping {path} due to error: {result}", file=sys.stderr)
+        else:
+            entries.append((path, result))
+
+    dataset = write_stomp_dataset(output, entries, dtype)
+    size = (output / "stomps.npy").stat().st_size / 2**20
+    print(
+        f"{len(entries)} files -> {len(dataset)} stomps ({size:.1f} MiB, "
+        f"{dtype}); wrote {output}"
+    )
+    return dataset
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Build the memory-mapped stomp dataset from labelled recordings."
+    )
+    parser.add_argument(
+        "base_path", type=Path, help="Directory containing NAME_move.wav files."
+    )
+    parser.add_argument(
+        "--output",
+        type=Path,
+        default=None,
+        help="Dataset directory to write (default: <base_path>/stomps).",
+    )
+    parser.add_argument(
+        "--cache-dir",
+        type=Path,
+        default=None,
+        help="Per-file cache directory (default: <base_path>/.stomp_cache).",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="Number of worker processes (default: CPU count).",
+    )
+    parser.add_argument(
+        "--dtype",
+        choices=DTYPES,
+        default="int16",
+        help="Sample storage type (default: int16).",
+    )
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    build_stomp_dataset(
+        args.base_path, args.output, args.cache_dir, args.workers, args.dtype
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,12 @@
+import time
+from collections import deque
+
 import numpy as np
-import librosa
+
+from resample import PolyphaseResampler, StreamingResampler
+from ring_buffer import RingBuffer
+
+TARGET_SR = 16000
 
 
 class StompDetector:
@@ -13,6 +20,13 @@ class StompDetector:
         hop_ms: int = 10,
         energy_threshold: float = 5.0,
         alpha: float = 0.05,
+        cooldown_ms: float = 300,
+        streaming_resample: bool = False,
+        incremental: bool = False,
+        low_latency: bool = False,
+        lookahead_ms: float = 50,
+        telemetry=None,
+        noise_profile=None,
     ):
         """
         Args:
@@ -22,7 +36,25 @@ class StompDetector:
             hop_ms: Analysis hop length (ms).
             energy_threshold: Multiplier for noise floor to trigger detection.
             alpha: Smoothing factor for noise floor update (0 < alpha < 1).
-            cooldown_ms: Minimum time between stomps (ms).
+            cooldown_ms: Minimum time between stomps (ms), measured on the
+                sample clock.
+            streaming_resample: Resample every chunk passed to `feed` as it
+                arrives, so a 16 kHz window is ready when a stomp fires.
+            incremental: In `process`, track frame energies with a running
+                sum of squares, so each chunk costs O(chunk) instead of
+                re-analyzing the window.
+            low_latency: In `process`, trigger on the newest audio instead of
+                the middle of the window, locate the onset to the sample and
+                emit the window as soon as `lookahead_ms` of audio after the
+                onset is available. Meant for hops of 5-20 ms; implies
+                `incremental`.
+            lookahead_ms: Audio after the onset included in the emitted
+                window in low-latency mode (ms).
+            telemetry: Optional `telemetry.Telemetry`; resampling time is
+                recorded as the "resample" stage.
+            noise_profile: Optional `noise_profile.NoiseProfile`, updated
+                from the newest audio on hops that update the noise floor
+                (at most once per profile frame).
         """
         self.sr = sr
         self.win_ms = win_ms
@@ -30,20 +62,275 @@ class StompDetector:
         self.hop_ms = hop_ms
         self.energy_threshold = energy_threshold
         self.alpha = alpha
+        self.telemetry = telemetry
+        self.noise_profile = noise_profile
 
-        # State
-        self.noise_level = 0.001  # Initial small value
-        self.cooldown = 0
+        if not 0 < lookahead_ms <= win_ms:
+            raise ValueError("lookahead_ms must be in (0, win_ms]")
 
         # Derived parameters
         self.frame_len = int((frame_ms / 1000.0) * sr)
         self.hop_len = int((hop_ms / 1000.0) * sr)
         self.half_win = int((win_ms / 1000.0) * sr // 2)
+        self.window_len = int((win_ms / 1000.0) * sr)
+        self.cooldown_frames = int((cooldown_ms / 1000.0) * sr)
+        self.lookahead_frames = int((lookahead_ms / 1000.0) * sr)
+
+        # State
+        self.noise_level = 0.001  # Initial small value
+        self.frames_seen = 0  # Sample clock
+        self.last_stomp_frame: int | None = None
+        self.pending_onset: int | None = None
+        self._profile_frame = 0
+
+        # (onset frame, detection frame) of recent stomps, on the sample clock
+        self.events: deque[tuple[int, int]] = deque(maxlen=1000)
+
+        # Rolling window for `process`. Low-latency mode emits windows that
+        # may end up to a hop before the newest frame, so it keeps extra room.
+        self.low_latency = low_latency
+        self.window = RingBuffer(
+            2 * self.window_len if low_latency else self.window_len, 2
+        )
+
+        # Incremental energy tracking: prefix sums of the squared mono signal
+        # over the window, and the (window-relative) sample ranges of the
+        # analysis frames over the middle segment, clipped like the
+        # zero-padded centered frames in `detect`.
+        self.incremental = incremental or low_latency
+        if self.incremental:
+            self.prefix = RingBuffer(self.window_len, 1, dtype=np.float64)
+            self._energy_total = 0.0
+
+            mid_start = self.half_win // 2
+            n_frames = (
+                1
+                + (self.half_win + 2 * (self.frame_len // 2) - self.frame_len)
+                // self.hop_len
+            )
+            starts = np.arange(n_frames) * self.hop_len - self.frame_len // 2
+            self._frame_lo = mid_start + np.clip(starts, 0, self.half_win)
+            self._frame_hi = mid_start + np.clip(
+                starts + self.frame_len, 0, self.half_win
+            )
+
+        # Resampling to the classifier rate, with filters designed once
+        self.resampler = PolyphaseResampler(sr, TARGET_SR)
+        self.streaming_resample = streaming_resample
+        if streaming_resample:
+            self.stream_resampler = StreamingResampler(sr, TARGET_SR)
+            self.resampled = RingBuffer(
+                2 * self.resampler.output_length(int((win_ms / 1000.0) * sr))
+            )
+
+    def feed(self, chunk: np.ndarray) -> None:
+        """Pass each new chunk of the stream here before calling `detect`.
+
+        Only needed with `streaming_resample`; otherwise a no-op. `detect`
+        then assumes its window ends with the last chunk fed.
+        """
+        if self.streaming_resample:
+            self.resampled.write(self.stream_resampler.process(chunk))
+
+    def resample(self, audio: np.ndarray) -> np.ndarray:
+        """Resample a detection window to 16 kHz."""
+        if not self.streaming_resample:
+            return self.resampler(audio, axis=0)
+
+        # Settled output from the stream plus the not-yet-settled tail,
+        # computed as a one-shot resample would at the window's right edge.
+        n_out = self.resampler.output_length(len(audio))
+        tail = self.stream_resampler.pending()
+        return np.concatenate([self.resampled.latest(n_out - len(tail)), tail])
+
+    def in_cooldown(self) -> bool:
+        return (
+            self.last_stomp_frame is not None
+            and self.frames_seen - self.last_stomp_frame < self.cooldown_frames
+        )
+
+    def latency_stats(self) -> dict:
+        """Percentiles (ms) of the delay from stomp onset to detection."""
+        if not self.events:
+            return {}
+
+        values = sorted(detected - onset for onset, detected in self.events)
+        return {
+            "count": len(values),
+            "onset_to_detect_ms": {
+                f"p{p}": values[min(len(values) - 1, int(p / 100 * len(values)))]
+                / self.sr
+                * 1000
+                for p in (50, 95, 99)
+            },
+        }
+
+    def process(self, chunk: np.ndarray) -> list[np.ndarray]:
+        """Push the next chunk of the stream and detect on the updated window.
+
+        Equivalent to keeping a rolling window, calling `feed(chunk)` and
+        then `detect(window)`, except that the sample clock advances by the
+        chunk length.
+        """
+        self.window.write(chunk)
+        self.feed(chunk)
+        self.frames_seen += len(chunk)
+
+        if not self.incremental:
+            return self._detect(self.window.latest(self.window_len))
+
+        self._track_energy(chunk)
+
+        if self.low_latency:
+            return self._process_low_latency(len(chunk))
+
+        if self.in_cooldown():
+            return []
+
+        if self.half_win < self.frame_len or self._frame_lo[0] < 1:
+            return []
+
+        # P[i] (window-relative) is prefix[i - 1]
+        prefix = self.prefix.latest(self.window_len)[:, 0]
+        sums = prefix[self._frame_hi - 1] - prefix[self._frame_lo - 1]
+        energy = np.sqrt(np.maximum(sums, 0.0) / self.frame_len)
+
+        return self._update(energy, self.window.latest(self.window_len))
+
+    def _track_energy(self, chunk: np.ndarray) -> None:
+        """Append the chunk's running sum of squares to the prefix ring."""
+        mono = np.mean(chunk, axis=1) if chunk.ndim > 1 else chunk
+        prefix = np.cumsum(np.square(mono, dtype=np.float64)) + self._energy_total
+        self._energy_total = prefix[-1] if len(prefix) else self._energy_total
+        self.prefix.write(prefix)
+
+        if self._energy_total > 1e6:
+            # Rebase so differences of large sums don't lose precision
+            window = self.window.latest(self.window_len)
+            mono = np.mean(window, axis=1)
+            prefix = np.cumsum(np.square(mono, dtype=np.float64))
+            self._energy_total = prefix[-1]
+            self.prefix.write(prefix)
+
+    def _process_low_latency(self, n: int) -> list[np.ndarray]:
+        """Trigger on the frames ending in the newest `n` samples."""
+        if self.pending_onset is not None:
+            return self._emit_pending()
+        if self.in_cooldown():
+            return []
+
+        # Energy of the frame ending at each new sample
+        n = min(n, self.window_len - self.frame_len)
+        prefix = self.prefix.latest(n + self.frame_len)[:, 0]
+        sums = prefix[self.frame_len :] - prefix[:n]
+        energy = np.sqrt(np.maximum(sums, 0.0) / self.frame_len)
+
+        level = self.noise_level * self.energy_threshold
+        above = energy > level
+        if not above.any():
+            # Scale the smoothing so the noise floor adapts at the same rate
+            # per second as with half-window hops.
+            alpha = 1 - (1 - self.alpha) ** (n / self.half_win)
+            self.noise_level = (1 - alpha) * self.noise_level + alpha * np.mean(energy)
+            self._update_noise_profile(self.window)
+            return []
+
+        # The first frame over the threshold must contain a sample over it
+        first = int(np.argmax(above))
+        audio = self.window.latest(n + self.frame_len)
+        mono = np.mean(audio, axis=1)[first + 1 : first + 1 + self.frame_len]
+        onset = self.frames_seen - n + first + 1 - self.frame_len
+        onset += _first_above(mono, level)
+
+        self.last_stomp_frame = self.frames_seen
+        self.pending_onset = onset
+        return self._emit_pending()
+
+    def _emit_pending(self) -> list[np.ndarray]:
+        """Emit the pending stomp once `lookahead_frames` follow its onset."""
+        onset = self.pending_onset
+        assert onset is not None
+        end = onset + self.lookahead_frames
+        if self.frames_seen < end:
+            return []
+
+        start = end - self.window_len
+        if self.window.overwritten(start):
+            start = self.frames_seen - self.window_len
+        audio = self.window.read(start, self.window_len)
+
+        self.events.append((onset, self.frames_seen))
+        self.pending_onset = None
+        # The window rarely ends on the newest frame, so resample it directly
+        return [self._timed(self.resampler, audio)]
+
+    def _timed(self, resample, audio: np.ndarray) -> np.ndarray:
+        """Run `resample(audio)`, recording its duration if telemetry is on."""
+        if self.telemetry is None:
+            return resample(audio)
+        start = time.perf_counter()
+        stomp = resample(audio)
+        self.telemetry.record("resample", time.perf_counter() - start)
+        return stomp
+
+    def _update(self, energy: np.ndarray, audio: np.ndarray) -> list[np.ndarray]:
+        """Threshold the frame energies and update the noise floor."""
+        # Use max energy in the segment for detection
+        segment_energy = np.max(energy)
+        # Use mean energy for noise floor update
+        avg_energy = np.mean(energy)
+
+        # Check for detection
+        level = self.noise_level * self.energy_threshold
+        is_stomp = False
+        if segment_energy > level:
+            is_stomp = True
+            self.last_stomp_frame = self.frames_seen
+
+        if is_stomp:
+            # Locate the onset in the middle segment for latency reporting
+            mono = np.mean(audio, axis=1) if audio.ndim > 1 else audio
+            mid_start = self.half_win // 2
+            onset = self.frames_seen - len(audio) + mid_start
+            onset += _first_above(mono[mid_start : mid_start + self.half_win], level)
+            self.events.append((onset, self.frames_seen))
+
+            # Resample only on detection
+            return [self._timed(self.resample, audio)]
+        else:
+            self.noise_level = (
+                1 - self.alpha
+            ) * self.noise_level + self.alpha * avg_energy
+            # Only the middle segment was checked; newer audio may hold an onset
+            self._update_noise_profile(audio[: self.half_win // 2 + self.half_win])
+            return []
+
+    def _update_noise_profile(self, audio) -> None:
+        """Feed the newest frame of `audio` (an array, or the window ring)
+        to the noise profile, once a full new profile frame has arrived."""
+        profile = self.noise_profile
+        if (
+            profile is None
+            or self.frames_seen < profile.frame_len
+            or self.frames_seen - self._profile_frame < profile.frame_len
+        ):
+            return
+        if isinstance(audio, RingBuffer):
+            audio = audio.latest(min(profile.frame_len, audio.capacity))
+        if profile.update(audio[-profile.frame_len :]):
+            self._profile_frame = self.frames_seen
 
     def detect(self, audio: np.ndarray) -> list[np.ndarray]:
-        """Detect stomps in the provided audio chunk."""
-        if self.cooldown > 0:
-            self.cooldown -= 1
+        """Detect stomps in the provided audio chunk.
+
+        Consecutive calls are assumed to be half a window apart (the hop the
+        window was designed for), which is how far the sample clock advances.
+        """
+        self.frames_seen += self.half_win
+        return self._detect(audio)
+
+    def _detect(self, audio: np.ndarray) -> list[np.ndarray]:
+        if self.in_cooldown():
             return []
 
         # print(self.noise_level)
@@ -68,27 +355,16 @@ class StompDetector:
         if len(y_mid) < self.frame_len:
             return []
 
-        energy = librosa.feature.rms(
-            y=y_mid, frame_length=self.frame_len, hop_length=self.hop_len, center=True
-        )[0]
+        # Centered, zero-padded frames (librosa.feature.rms with center=True)
+        pad = self.frame_len // 2
+        frames = np.lib.stride_tricks.sliding_window_view(
+            np.pad(y_mid, pad), self.frame_len
+        )[:: self.hop_len]
+        energy = np.sqrt(np.mean(np.square(frames), axis=-1))
 
-        # Use max energy in the segment for detection
-        segment_energy = np.max(energy)
-        # Use mean energy for noise floor update
-        avg_energy = np.mean(energy)
+        return self._update(energy, audio)
 
-        # Check for detection
-        is_stomp = False
-        if segment_energy > self.noise_level * self.energy_threshold:
-            is_stomp = True
-            self.cooldown = 2
 
-        if is_stomp:
-            # Resample only on detection
-            resampled_audio = librosa.resample(
-                audio, orig_sr=self.sr, target_sr=16000, axis=0
-            )
-            return [resampled_audio]
-        else:
-            self.noise_level = (1 - self.alpha) * self.noise_level + self.alpha * avg_energy
-            return []
+def _first_above(y: np.ndarray, level: float) -> int:
+    """Index of the first sample with magnitude above `level` (0 if none)."""
+    return int(np.argmax(np.abs(y) > level))
@@ -0,0 +1,264 @@
+"""Per-stage latency telemetry for the stomp pipeline.
+
+Every hop gets a `StompTrace` that collects a `time.perf_counter()` mark at
+the end of each stage (read, detect, features, inference). `Telemetry`
+turns the gaps between marks into per-stage durations and keeps, per stage,
+a fixed-bucket histogram (for Prometheus) plus a window of recent values
+(for rolling p50/p95/p99). Stages measured elsewhere, such as resampling
+inside the detector or key output on the controller's worker thread, are
+recorded directly with `Telemetry.record`.
+
+Recording costs one deque append and one bisect per value, under a lock:
+several threads may record the same stage, e.g. when `engine.py` shares one
+`Telemetry` between the pipelines of every input. Percentiles are only
+computed when a snapshot is exported, on a background thread:
+
+    telemetry = Telemetry()
+    telemetry.start_export("stomps.prom", interval=10.0)  # or a .jsonl file
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from collections import deque
+from pathlib import Path
+from typing import Callable
+
+# Histogram bucket upper bounds (seconds), plus an implicit +Inf bucket
+BUCKETS = (
+    0.0001,
+    0.00025,
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+)
+
+PERCENTILES = (50, 95, 99)
+
+
+class LatencyHistogram:
+    """Cumulative bucket counts plus a rolling window of recent values.
+
+    Safe to record from several threads at once.
+    """
+
+    def __init__(self, window: int = 1024):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.recent: deque[float] = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float) -> None:
+        bucket = bisect_left(BUCKETS, seconds)
+        with self._lock:
+            self.counts[bucket] += 1
+            self.count += 1
+            self.sum += seconds
+            self.recent.append(seconds)
+
+    def percentiles(self) -> dict[str, float]:
+        """Rolling percentiles (ms) over the recent window."""
+        with self._lock:
+            values = sorted(self.recent)
+        if not values:
+            return {}
+        return {
+            f"p{p}_ms": values[min(len(values) - 1, int(p / 100 * len(values)))] * 1000
+            for p in PERCENTILES
+        }
+
+
+class StompTrace:
+    """Monotonic timestamps of one hop through the pipeline's stages."""
+
+    __slots__ = ("start", "marks")
+
+    def __init__(self, start: float | None = None):
+        self.start = time.perf_counter() if start is None else start
+        self.marks: list[tuple[str, float]] = []
+
+    def mark(self, stage: str) -> None:
+        """Record that `stage` ended now."""
+        self.marks.append((stage, time.perf_counter()))
+
+    def durations(self) -> list[tuple[str, float]]:
+        """(stage, seconds) for each mark, measured from the previous mark."""
+        out = []
+        last = self.start
+        for stage, t in self.marks:
+            out.append((stage, t - last))
+            last = t
+        return out
+
+
+class _NullTrace(StompTrace):
+    """Trace handed out while telemetry is disabled; marks are dropped."""
+
+    def mark(self, stage: str) -> None:
+        pass
+
+
+NULL_TRACE = _NullTrace(0.0)
+
+
+class Telemetry:
+    """Per-stage latency histograms, counters and periodic export."""
+
+    def __init__(self, enabled: bool = True, window: int = 1024):
+        """
+        Args:
+            enabled: When False, `trace` returns a no-op trace and nothing
+                is recorded.
+            window: Number of recent values per stage used for percentiles.
+        """
+        self.enabled = enabled
+        self.window = window
+        self.stages: dict[str, LatencyHistogram] = {}
+        self.counters: dict[str, int] = {}
+        self.sources: list[Callable[[], dict[str, int]]] = []
+        # Guards creating stages and updating counters
+        self._lock = threading.Lock()
+
+        self._stop = threading.Event()
+        self._exporter: threading.Thread | None = None
+        self._export_path: Path | None = None
+
+    def trace(self, start: float | None = None) -> StompTrace:
+        """Start tracing a hop. `start` defaults to now."""
+        return StompTrace(start) if self.enabled else NULL_TRACE
+
+    def record(self, stage: str, seconds: float) -> None:
+        """Add one duration to a stage's histogram."""
+        if not self.enabled:
+            return
+        histogram = self.stages.get(stage)
+        if histogram is None:
+            with self._lock:
+                histogram = self.stages.get(stage)
+                if histogram is None:
+                    histogram = self.stages[stage] = LatencyHistogram(self.window)
+        histogram.record(seconds)
+
+    def finish(self, trace: StompTrace) -> None:
+        """Record all stage durations of a finished trace."""
+        if not self.enabled:
+            return
+        for stage, seconds in trace.durations():
+            self.record(stage, seconds)
+
+    def count(self, name: str, n: int = 1) -> None:
+        """Increment a counter (e.g. "overflows")."""
+        if self.enabled:
+            with self._lock:
+                self.counters[name] = self.counters.get(name, 0) + n
+
+    def add_source(self, source: Callable[[], dict[str, int]]) -> None:
+        """Register a callable whose counters are merged into each snapshot."""
+        self.sources.append(source)
+
+    def snapshot(self) -> dict:
+        """Current counters and per-stage statistics, as plain data."""
+        with self._lock:
+            counters = dict(self.counters)
+        for source in self.sources:
+            counters.update(source())
+        return {
+            "time": time.time(),
+            "stages": {
+                stage: {
+                    "count": histogram.count,
+                    "mean_ms": histogram.sum / histogram.count * 1000
+                    if histogram.count
+                    else 0.0,
+                    **histogram.percentiles(),
+                }
+                for stage, histogram in list(self.stages.items())
+            },
+            "counters": counters,
+        }
+
+    def export(self, path) -> None:
+        """Write a snapshot: one JSON line appended, or for a `.prom` path a
+        Prometheus textfile replaced atomically."""
+        path = Path(path)
+        if path.suffix == ".prom":
+            tmp = path.with_suffix(f".{os.getpid()}.tmp")
+            tmp.write_text(self.prometheus())
+            os.replace(tmp, path)
+        else:
+            with open(path, "a") as f:
+                f.write(json.dumps(self.snapshot()) + "\n")
+
+    def prometheus(self) -> str:
+        """Snapshot in the Prometheus text exposition format."""
+        lines = [
+            "# HELP stomp_stage_latency_seconds Time spent in each pipeline stage.",
+            "# TYPE stomp_stage_latency_seconds histogram",
+        ]
+        stages = list(self.stages.items())
+        for stage, histogram in stages:
+            cumulative = 0
+            for bound, n in zip(BUCKETS + (float("inf"),), list(histogram.counts)):
+                cumulative += n
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(
+                    f'stomp_stage_latency_seconds_bucket{{stage="{stage}",le="{le}"}} '
+                    f"{cumulative}"
+                )
+            lines.append(
+                f'stomp_stage_latency_seconds_sum{{stage="{stage}"}} {histogram.sum}'
+            )
+            lines.append(
+                f'stomp_stage_latency_seconds_count{{stage="{stage}"}} {cumulative}'
+            )
+
+        lines += [
+            "# HELP stomp_stage_latency_recent_seconds Rolling stage latency percentiles.",
+            "# TYPE stomp_stage_latency_recent_seconds gauge",
+        ]
+        for stage, histogram in stages:
+            for name, ms in histogram.percentiles().items():
+                quantile = int(name[1:].split("_")[0]) / 100
+                lines.append(
+                    f'stomp_stage_latency_recent_seconds{{stage="{stage}",'
+                    f'quantile="{quantile}"}} {ms / 1000}'
+                )
+
+        for name, value in self.snapshot()["counters"].items():
+            lines.append(f"# TYPE stomp_{name}_total counter")
+            lines.append(f"stomp_{name}_total {value}")
+        return "\n".join(lines) + "\n"
+
+    def start_export(self, path, interval: float = 10.0) -> None:
+        """Export a snapshot to `path` every `interval` seconds until `stop`."""
+        self._export_path = Path(path)
+        self._stop.clear()
+
+        def run():
+            while not self._stop.wait(interval):
+                self.export(self._export_path)
+
+        self._exporter = threading.Thread(target=run, name="telemetry", daemon=True)
+        self._exporter.start()
+
+    def stop(self) -> None:
+        """Stop periodic export, writing one final snapshot."""
+        if self._exporter is None:
+            return
+        self._stop.set()
+        self._exporter.join()
+        self._exporter = None
+        self.export(self._export_path)
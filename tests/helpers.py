@@ -0,0 +1,22 @@
+"""Synthetic recordings shared by the dataset, model and export tests."""
+
+import numpy as np
+import scipy.io.wavfile as wavfile
+
+
+def write_take(path, n_stomps, gains=None, sr=16000, seed=0):
+    """Silence with `n_stomps` well-separated noise bursts, one per second.
+
+    Args:
+        gains: Per-channel gains of a burst shared by both channels; by
+            default each channel gets its own noise.
+    """
+    rng = np.random.default_rng(seed)
+    audio = rng.standard_normal((sr * (n_stomps + 1), 2)).astype(np.float32) * 1e-4
+    for i in range(n_stomps):
+        start = sr // 2 + i * sr
+        if gains is None:
+            audio[start : start + 800] = rng.uniform(-0.5, 0.5, (800, 2))
+        else:
+            audio[start : start + 800] = rng.uniform(-0.5, 0.5, (800, 1)) * gains
+    wavfile.write(path, sr, audio)
@@ -0,0 +1,57 @@
+import json
+
+import pytest
+import scipy.io.wavfile as wavfile
+from batch import find_files, run_batch, write_events
+from replay import make_stomp_track
+
+
+@pytest.fixture
+def sessions(tmp_path):
+    for i, name in enumerate(["alice_left.wav", "alice_right.wav", "bob_up.wav"]):
+        audio, _onsets = make_stomp_track(sr=16000, duration=4.0, seed=i)
+        wavfile.write(tmp_path / name, 16000, audio)
+    (tmp_path / "nested").mkdir()
+    audio, _onsets = make_stomp_track(sr=48000, duration=3.0, seed=9)
+    wavfile.write(tmp_path / "nested" / "warmup.wav", 48000, audio)
+    return tmp_path
+
+
+def test_find_files(sessions):
+    names = [path.name for path in find_files(sessions)]
+    assert names == ["alice_left.wav", "alice_right.wav", "bob_up.wav", "warmup.wav"]
+    names = [path.name for path in find_files(f"{sessions}/alice_*.wav")]
+    assert names == ["alice_left.wav", "alice_right.wav"]
+
+
+def test_output_is_independent_of_worker_count(sessions, tmp_path):
+    files = find_files(sessions)
+    serial, summary = run_batch(files, model="left_right", workers=1)
+    parallel, _ = run_batch(files, model="left_right", workers=3)
+
+    assert serial == parallel
+    assert summary["files"] == 4 and not summary["failed"]
+    assert summary["stomps"] == len(serial) > 0
+
+    # Events come in file order, numbered per file, with labels from the name
+    assert [e["file"] for e in serial] == sorted(e["file"] for e in serial)
+    by_file = {}
+    for event in serial:
+        by_file.setdefault(event["file"], []).append(event)
+    for events in by_file.values():
+        assert [e["stomp_idx"] for e in events] == list(range(len(events)))
+        assert all(0 <= e["onset_s"] <= e["detected_s"] for e in events)
+    assert {e["label"] for e in serial} == {"left", "right", "up", None}
+    assert summary["labelled"] == sum(e["label"] is not None for e in serial)
+    assert set(summary["per_label"]) == {"left", "right", "up"}
+
+    output = tmp_path / "events.jsonl"
+    write_events(serial, output)
+    assert [json.loads(line) for line in output.read_text().splitlines()] == serial
+
+
+def test_unreadable_files_are_reported(tmp_path):
+    (tmp_path / "broken_left.wav").write_bytes(b"not audio")
+    events, summary = run_batch([tmp_path / "broken_left.wav"], workers=1)
+    assert events == []
+    assert summary["failed"] == [str(tmp_path / "broken_left.wav")]
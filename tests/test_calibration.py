@@ -0,0 +1,135 @@
+import numpy as np
+import pytest
+import model_registry
+from calibration import (
+    CalibrationMonitor,
+    CalibrationProfile,
+    load_profile,
+    measure,
+    profile_path,
+)
+from main import load_or_calibrate
+from noise_profile import NoiseProfile
+from stomp_detector import StompDetector
+
+
+class NoiseStream:
+    """`read` returns Gaussian noise of a fixed RMS; counts reads."""
+
+    def __init__(self, rms, seed=0):
+        self.rms = rms
+        self.rng = np.random.default_rng(seed)
+        self.reads = 0
+
+    def read(self, frames):
+        self.reads += 1
+        chunk = self.rng.standard_normal((frames, 2)) * self.rms
+        return chunk.astype(np.float32), False
+
+
+class FakeDetector:
+    noise_level = 0.001
+
+
+@pytest.fixture(autouse=True)
+def calibrations(tmp_path, monkeypatch):
+    monkeypatch.setenv("STOMP_CALIBRATION_DIR", str(tmp_path / "calibrations"))
+    monkeypatch.setenv("STOMP_MODEL_CACHE", str(tmp_path / "cache"))
+
+
+def test_measure_summarizes_noise():
+    stream = NoiseStream(0.01)
+    noise_profile = NoiseProfile(sr=16000)
+    profile = measure(
+        stream, 160, 16000, "mic", duration=1.0, noise_profile=noise_profile
+    )
+
+    assert stream.reads == 100
+    # Mono RMS of two independent channels
+    assert profile.rms["p50"] == pytest.approx(0.01 / np.sqrt(2), rel=0.05)
+    rms = profile.rms
+    assert rms["p10"] <= rms["p50"] <= rms["p90"] <= rms["p99"] <= rms["max"]
+    assert profile.noise_level == profile.rms["max"]
+    np.testing.assert_allclose(profile.spectrum, noise_profile.spectrum)
+
+
+def test_profiles_are_cached_per_device_and_rate():
+    profile = CalibrationProfile.from_rms("USB Mic (2)", 48000, [0.002, 0.004])
+    profile.save(profile_path("USB Mic (2)", 48000))
+
+    assert load_profile("USB Mic (2)", 48000) == profile
+    assert load_profile("USB Mic (2)", 44100) is None
+    assert load_profile("Other", 48000) is None
+
+    profile_path("Broken", 48000).write_text("{")
+    assert load_profile("Broken", 48000) is None
+
+
+def test_profiles_are_kept_apart_from_the_model_cache(monkeypatch):
+    assert model_registry.cache_dir() not in profile_path("mic", 48000).parents
+    # Also by default, so clearing the model cache keeps calibrations
+    monkeypatch.delenv("STOMP_CALIBRATION_DIR")
+    monkeypatch.delenv("STOMP_MODEL_CACHE")
+    assert model_registry.cache_dir() not in profile_path("mic", 48000).parents
+
+
+def test_apply_seeds_detector_and_noise_profile():
+    noise_profile = NoiseProfile(sr=16000)
+    profile = measure(NoiseStream(0.01), 1600, 16000, noise_profile=noise_profile)
+    quiet = CalibrationProfile.from_rms("mic", 16000, [1e-5], profile.spectrum)
+
+    detector = FakeDetector()
+    fresh = NoiseProfile(sr=16000)
+    quiet.apply(detector, fresh)
+    assert detector.noise_level == 0.001  # never below the minimum
+    np.testing.assert_array_equal(fresh.spectrum, noise_profile.spectrum)
+
+
+def test_load_or_calibrate_only_measures_once():
+    detector = StompDetector(sr=16000)
+    stream = NoiseStream(0.02)
+    first = load_or_calibrate(stream, 1600, 16000, "mic", detector)
+    reads = stream.reads
+    assert reads > 0
+
+    detector.noise_level = 0.0
+    second = load_or_calibrate(stream, 1600, 16000, "mic", detector)
+    assert stream.reads == reads
+    assert second.rms == first.rms
+    assert detector.noise_level == first.noise_level
+
+    load_or_calibrate(stream, 1600, 16000, "mic", detector, recalibrate=True)
+    assert stream.reads == 2 * reads
+
+
+def test_monitor_recalibrates_only_on_sustained_drift():
+    profile = CalibrationProfile.from_rms("mic", 16000, [0.01] * 10)
+    detector = FakeDetector()
+    monitor = CalibrationMonitor(profile, detector, drift=2.0, hold=3, interval=1)
+
+    # Within the bound, and a brief excursion outside it
+    for level in [0.012, 0.008, 0.03, 0.011, 0.03, 0.03]:
+        detector.noise_level = level
+        assert not monitor.check()
+
+    detector.noise_level = 0.03
+    assert monitor.check()
+    assert monitor.recalibrations == 1
+    assert monitor.profile.rms["p50"] == pytest.approx(0.03)
+    assert load_profile("mic", 16000).rms == monitor.profile.rms
+
+    # The new profile is the reference from now on
+    for _ in range(5):
+        assert not monitor.check()
+
+
+def test_monitor_saves_refined_spectrum_on_stop():
+    profile = CalibrationProfile.from_rms("mic", 16000, [0.01])
+    noise_profile = NoiseProfile(sr=16000)
+    monitor = CalibrationMonitor(profile, FakeDetector(), noise_profile, interval=0.01)
+    monitor.start()
+    noise_profile.update(np.random.default_rng(0).standard_normal((4096, 2)) * 0.01)
+    monitor.stop()
+
+    saved = load_profile("mic", 16000)
+    np.testing.assert_allclose(saved.spectrum, noise_profile.spectrum)
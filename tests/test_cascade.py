@@ -0,0 +1,99 @@
+import numpy as np
+import pytest
+from classifier import (
+    CascadeClassifier,
+    EnergyRatioStage,
+    FiveDirectionClassifier,
+    LeftRightClassifier,
+    MLPStage,
+)
+from telemetry import StompTrace
+
+
+class FixedStage:
+    def __init__(self, name, direction, confidence):
+        self.name = name
+        self.direction = direction
+        self.confidence = confidence
+        self.calls = 0
+
+    def predict(self, stomp, cache):
+        self.calls += 1
+        return self.direction, self.confidence
+
+
+def stomp(left_gain, right_gain, seed=0):
+    noise = np.random.default_rng(seed).standard_normal((3200, 2)).astype(np.float32)
+    return noise * np.array([left_gain, right_gain], dtype=np.float32)
+
+
+@pytest.mark.parametrize(
+    "cls, n_classes", [(LeftRightClassifier, 2), (FiveDirectionClassifier, 5)]
+)
+def test_predict_proba_matches_predict(cls, n_classes):
+    classifier = cls()
+    stomps = [stomp(1.0, gain, seed) for seed, gain in enumerate([0.1, 1.0, 3.0])]
+    features = classifier.features_batch(stomps)
+    probabilities = classifier.predict_proba(features)
+    assert probabilities.shape == (3, n_classes)
+    np.testing.assert_allclose(probabilities.sum(axis=1), 1.0, atol=1e-5)
+    predicted = [classifier.moves(i) for i in probabilities.argmax(axis=1)]
+    assert predicted == classifier.predict(features)
+
+
+def test_energy_ratio_stage():
+    stage = EnergyRatioStage()
+    direction, confidence = stage.predict(stomp(1.0, 0.2), {})
+    assert direction == "left"
+    assert confidence == pytest.approx(1 - 0.04, abs=0.01)
+    direction, confidence = stage.predict(stomp(1.0, 1.0), {})
+    assert confidence < 0.1
+
+
+def test_cascade_escalates_only_when_unsure():
+    cheap = FixedStage("cheap", "left", 0.5)
+    full = FixedStage("full", "up", 0.9)
+    cascade = CascadeClassifier([cheap, full], threshold=0.8)
+
+    assert cascade.classify(stomp(1, 1)) == "up"
+    cascade.threshold = 0.4
+    assert cascade.classify(stomp(1, 1)) == "left"
+    assert (cheap.calls, full.calls) == (2, 1)
+
+    stats = cascade.stats()
+    assert stats["stomps"] == 2
+    assert stats["decided_by"] == {"full": 1, "cheap": 1}
+    assert stats["escalation_rate"] == 0.5
+    assert stats["mean_ms"] > 0
+
+
+def test_last_stage_always_decides():
+    cascade = CascadeClassifier(
+        [FixedStage("cheap", "left", 0.1), FixedStage("full", "down", 0.2)]
+    )
+    assert cascade.classify(stomp(1, 1)) == "down"
+
+
+def test_default_cascade_skips_features_for_decisive_stomps():
+    cascade = CascadeClassifier(threshold=0.8)
+
+    trace = StompTrace()
+    assert cascade.classify(stomp(1.0, 0.1), trace) == "left"
+    assert [stage for stage, _ in trace.marks] == []
+
+    trace = StompTrace()
+    cascade.classify(stomp(1.0, 1.0), trace)
+    assert [stage for stage, _ in trace.marks] == ["features", "inference"]
+    assert cascade.stats()["decided_by"] == {"energy_ratio": 1, "five_directions": 1}
+
+
+def test_mlp_stages_share_features():
+    calls = []
+    left_right = LeftRightClassifier()
+    features = left_right.features
+    left_right.features = lambda s: calls.append(1) or features(s)
+    cascade = CascadeClassifier(
+        [MLPStage(left_right), MLPStage(FiveDirectionClassifier())], threshold=1.1
+    )
+    cascade.classify(stomp(1.0, 1.0))
+    assert len(calls) == 1
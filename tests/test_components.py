@@ -83,3 +83,53 @@ def test_controller(mocker):
     mock_press.reset_mock()
     controller.press("invalid")
     mock_press.assert_not_called()
+
+
+def test_async_controller(mocker):
+    from controller import AsyncKeyboardController
+
+    mock_hotkey = mocker.patch("controller.pyautogui.hotkey")
+    mock_time = mocker.patch("time.time", return_value=1000.0)
+
+    controller = AsyncKeyboardController(verbose=False)
+
+    # Chords go out as a single batch
+    controller.press("upleft", captured_at=0.0)
+    mock_time.return_value = 1001.0
+    controller.press("right")
+    # Within cooldown: dropped before reaching the queue
+    controller.press("down")
+    controller.close()
+
+    assert mock_hotkey.call_args_list == [
+        mocker.call("up", "left", _pause=False),
+        mocker.call("right", _pause=False),
+    ]
+
+    events = list(controller.emitted)
+    assert [e.direction for e in events] == ["upleft", "right"]
+    assert all(e.emitted_at >= e.enqueued_at >= e.captured_at for e in events)
+
+    stats = controller.latency_stats()
+    assert stats["count"] == 2
+    assert stats["dropped"] == 0
+
+
+def test_async_controller_survives_failed_presses(mocker, capsys):
+    from controller import AsyncKeyboardController
+
+    mock_hotkey = mocker.patch(
+        "controller.pyautogui.hotkey", side_effect=[RuntimeError("fail-safe"), None]
+    )
+    mock_time = mocker.patch("time.time", return_value=1000.0)
+
+    controller = AsyncKeyboardController(verbose=False)
+    controller.press("left")
+    mock_time.return_value = 1001.0
+    controller.press("right")
+    controller.close()
+
+    assert mock_hotkey.call_count == 2
+    assert [e.direction for e in controller.emitted] == ["right"]
+    assert controller.latency_stats()["failed"] == 1
+    assert "fail-safe" in capsys.readouterr().err
@@ -0,0 +1,76 @@
+import numpy as np
+import pytest
+import scipy.io.wavfile as wavfile
+from dataset_builder import (
+    StompSegmenter,
+    build_dataset,
+    list_audio_files,
+    load_dataset,
+    segment_file,
+)
+from helpers import write_take
+
+
+@pytest.fixture
+def dataset_dir(tmp_path):
+    write_take(tmp_path / "alice_left.wav", 2, seed=1)
+    write_take(tmp_path / "alice_up.wav", 3, seed=2)
+    write_take(tmp_path / "notes_unknown.wav", 1, seed=3)
+    return tmp_path
+
+
+def test_list_audio_files(dataset_dir):
+    names = [path.name for path in list_audio_files(dataset_dir)]
+    assert names == ["alice_left.wav", "alice_up.wav"]
+
+
+def test_build_and_reload(dataset_dir, capsys):
+    output = dataset_dir / "features.npz"
+    store = build_dataset(dataset_dir, output=output, workers=1)
+
+    assert store["X"].shape == (5, 48)
+    assert list(store["y"]) == [1, 1, 3, 3, 3]
+    assert "0 cached, 2 processed" in capsys.readouterr().out
+
+    X, y, metadata = load_dataset(output)
+    np.testing.assert_array_equal(X, store["X"])
+    np.testing.assert_array_equal(y, store["y"])
+    assert list(metadata["file"]) == ["alice_left.wav"] * 2 + ["alice_up.wav"] * 3
+    assert list(metadata["stomp_idx"]) == [0, 1, 0, 1, 2]
+
+
+def test_cache_only_reprocesses_changed_files(dataset_dir, capsys):
+    first = build_dataset(dataset_dir, workers=1)
+    capsys.readouterr()
+
+    write_take(dataset_dir / "alice_up.wav", 1, seed=4)
+    second = build_dataset(dataset_dir, workers=2)
+
+    assert "1 cached, 1 processed" in capsys.readouterr().out
+    np.testing.assert_array_equal(second["X"][:2], first["X"][:2])
+    assert len(second["y"]) == 3
+
+
+@pytest.mark.parametrize("sr", [16000, 44100])
+def test_live_segmentation_matches_segment_file(tmp_path, sr):
+    rng = np.random.default_rng(5)
+    audio = rng.standard_normal((sr * 4 + 77, 2)).astype(np.float32) * 1e-4
+    for i in range(3):
+        start = sr // 2 + i * sr
+        audio[start : start + sr // 20] = rng.uniform(-0.5, 0.5, (sr // 20, 2))
+    path = tmp_path / "alice_up.wav"
+    wavfile.write(path, sr, audio)
+
+    segmenter = StompSegmenter(sr)
+    found = 0
+    for i in range(0, len(audio), 441):  # blocks unrelated to the step size
+        found += segmenter.process(audio[i : i + 441])
+    stomps, offsets = segmenter.finish()
+
+    assert found == 3
+    expected, expected_offsets = segment_file(path)
+    np.testing.assert_array_equal(stomps, expected)
+    np.testing.assert_array_equal(offsets, expected_offsets)
+    # Each window contains its burst
+    bursts = (np.arange(3) * sr + sr // 2) * 16000 // sr
+    assert np.all((offsets <= bursts) & (bursts < offsets + 3200))
@@ -0,0 +1,128 @@
+import threading
+import time
+
+import numpy as np
+import pytest
+from engine import MicroBatcher, MultiInputEngine, parse_input
+from replay import make_stomp_track
+
+
+class RecordingClassifier:
+    """Labels a stomp by its first sample and records every batch."""
+
+    def __init__(self):
+        self.batches = []
+
+    def features_batch(self, stomps):
+        return np.array([[stomp[0, 0]] for stomp in stomps], dtype=np.float32)
+
+    def predict(self, features):
+        self.batches.append(len(features))
+        return [f"d{int(f[0])}" for f in features]
+
+
+class RecordingController:
+    def __init__(self):
+        self.pressed = []
+
+    def press(self, direction, captured_at=None):
+        self.pressed.append(direction)
+
+
+def classify_concurrently(batcher, values):
+    results = {}
+
+    def run(value):
+        results[value] = batcher.classify(np.full((10, 2), value, np.float32))
+
+    threads = [threading.Thread(target=run, args=(v,)) for v in values]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+def test_batcher_groups_concurrent_stomps():
+    classifier = RecordingClassifier()
+    batcher = MicroBatcher(classifier, max_batch=4, max_wait_ms=1000)
+    start = time.perf_counter()
+    results = classify_concurrently(batcher, [1, 2, 3, 4])
+    elapsed = time.perf_counter() - start
+    batcher.close()
+
+    assert results == {1: "d1", 2: "d2", 3: "d3", 4: "d4"}
+    assert classifier.batches == [4]
+    # A full batch runs without waiting out max_wait_ms
+    assert elapsed < 0.5
+    assert batcher.metrics()["mean_batch"] == 4
+
+
+def test_batcher_runs_partial_batch_after_max_wait():
+    classifier = RecordingClassifier()
+    batcher = MicroBatcher(classifier, max_batch=4, max_wait_ms=20)
+    start = time.perf_counter()
+    assert batcher.classify(np.full((10, 2), 7, np.float32)) == "d7"
+    elapsed = time.perf_counter() - start
+    batcher.close()
+
+    assert classifier.batches == [1]
+    assert 0.015 < elapsed < 0.5
+
+
+def test_batcher_propagates_errors():
+    class Failing(RecordingClassifier):
+        def predict(self, features):
+            raise ValueError("bad model")
+
+    batcher = MicroBatcher(Failing(), max_batch=1)
+    with pytest.raises(ValueError, match="bad model"):
+        batcher.classify(np.zeros((10, 2), np.float32))
+    batcher.close()
+
+
+def test_parse_input():
+    assert parse_input("3:wasd") == (3, "wasd")
+    assert parse_input("1") == (1, "arrows")
+    assert parse_input(":wasd") == (None, "wasd")
+
+
+def test_engine_classifies_every_input_through_one_batcher():
+    sr = 16000
+    classifier = RecordingClassifier()
+    engine = MultiInputEngine(classifier, max_wait_ms=50, hop_ms=10, low_latency=True)
+    controllers = [RecordingController() for _ in range(3)]
+    pipelines = [
+        engine.add_input(f"p{i}", controller, sr)
+        for i, controller in enumerate(controllers)
+    ]
+    assert engine.batcher.max_batch == 3
+
+    # Every player stomps on the same beat
+    audio, onsets = make_stomp_track(sr=sr, duration=3.0, seed=0)
+    engine.start()
+    step = pipelines[0].step_frames
+    for i in range(0, len(audio) - step, step):
+        for pipeline in pipelines:
+            pipeline.callback(audio[i : i + step], step, None, None)
+        time.sleep(0.001)
+    time.sleep(0.3)
+    engine.stop()
+
+    for controller in controllers:
+        assert len(controller.pressed) == len(onsets)
+    metrics = engine.metrics()
+    assert metrics["batching"]["stomps"] == 3 * len(onsets)
+    assert metrics["batching"]["largest_batch"] > 1
+    assert sum(classifier.batches) == 3 * len(onsets)
+
+
+def test_classifier_features_batch_matches_single():
+    from classifier import FiveDirectionClassifier
+
+    classifier = FiveDirectionClassifier()
+    stomps = list(np.random.default_rng(0).standard_normal((3, 3200, 2)) * 0.1)
+    batch = classifier.features_batch(stomps)
+    single = np.stack([classifier.features(stomp) for stomp in stomps])
+    np.testing.assert_allclose(batch, single, rtol=1e-4, atol=1e-5)
+    assert classifier.predict(batch) == classifier.predict(single)
@@ -0,0 +1,80 @@
+import numpy as np
+import onnx
+import onnxruntime as ort
+import pytest
+import model_registry
+from export_models import export_and_compare, held_out
+from helpers import write_take
+from numpy_mlp import from_onnx
+from stomp_dataset import build_stomp_dataset
+
+pytest.importorskip("onnxruntime.quantization")
+
+
+def run(path, X):
+    sess = ort.InferenceSession(str(path), providers=["CPUExecutionProvider"])
+    labels, maps = sess.run(None, {"input": X})
+    return labels, np.array([[m[c] for c in sorted(m)] for m in maps])
+
+
+def test_float_export_folds_the_scaler(registry, tmp_path):
+    reports = export_and_compare("five_directions", tmp_path, int8=True)
+    assert [r["variant"] for r in reports] == ["source", "float", "int8"]
+
+    source = from_onnx(model_registry.model_path("five_directions"))
+    X, y = held_out(source)
+    assert y is None
+    exported = tmp_path / "mlp_five_directions.onnx"
+    ops = {node.op_type for node in onnx.load(str(exported)).graph.node}
+    assert "Scaler" not in ops
+
+    # Same outputs, on onnxruntime and when parsed for the NumPy backend
+    labels, probabilities = run(exported, X)
+    expected_labels, expected = run(model_registry.model_path("five_directions"), X)
+    np.testing.assert_array_equal(labels, expected_labels)
+    np.testing.assert_allclose(probabilities, expected, atol=1e-5)
+    parsed = from_onnx(exported)
+    assert parsed.feature_set == "xcorr48"
+    np.testing.assert_array_equal(parsed.predict(X), expected_labels)
+
+    float_report, int8_report = reports[1:]
+    assert float_report["agreement"] == 1.0
+    assert int8_report["agreement"] >= 0.98
+    assert int8_report["size_kib"] < 0.6 * float_report["size_kib"]
+    for report in reports:
+        assert report["load_ms"] > 0 and report["latency_us"] > 0
+        assert "accuracy" not in report
+
+
+def test_int8_export_keeps_the_feature_set(registry, tmp_path):
+    export_and_compare("left_right", tmp_path, int8=True)
+    sess = ort.InferenceSession(
+        str(tmp_path / "mlp_left_right.int8.onnx"), providers=["CPUExecutionProvider"]
+    )
+    assert sess.get_modelmeta().custom_metadata_map["feature_set"] == "xcorr48"
+
+
+# A few iterations on a tiny training set
+@pytest.mark.filterwarnings("ignore::sklearn.exceptions.ConvergenceWarning")
+@pytest.mark.filterwarnings("ignore:Got `batch_size`")
+def test_pipeline_export_reports_accuracy_on_the_dataset(registry, tmp_path):
+    joblib = pytest.importorskip("joblib")
+    from feature_search import make_classifier
+
+    write_take(tmp_path / "alice_left.wav", 12, [1.0, 0.2], seed=1)
+    write_take(tmp_path / "alice_right.wav", 12, [0.2, 1.0], seed=2)
+    dataset = build_stomp_dataset(tmp_path, workers=1)
+
+    X, y = held_out(from_onnx(model_registry.model_path("left_right")), dataset)
+    labels = dataset.labels(["left", "right"])
+    pipeline = make_classifier((8,), seed=0)
+    pipeline.fit(dataset.X, labels)
+    joblib.dump(pipeline, tmp_path / "lr.joblib")
+
+    reports = export_and_compare(
+        str(tmp_path / "lr.joblib"), tmp_path / "out", dataset=dataset
+    )
+    (report,) = reports
+    assert report["variant"] == "float"
+    assert report["accuracy_delta"] == 0.0
+    assert report["accuracy"] == pytest.approx(np.mean(pipeline.predict(X) == y))
@@ -0,0 +1,60 @@
+import numpy as np
+import pytest
+from feature_search import candidate_sets, search
+from features import FEATURE_GROUPS, extract_features_batch
+from helpers import write_take
+from numpy_mlp import NumpyMLP, from_onnx
+from stomp_dataset import build_stomp_dataset
+
+pytest.importorskip("sklearn")
+
+
+@pytest.fixture
+def dataset(tmp_path):
+    write_take(tmp_path / "alice_left.wav", 12, [1.0, 0.2], seed=1)
+    write_take(tmp_path / "alice_right.wav", 12, [0.2, 1.0], seed=2)
+    write_take(tmp_path / "alice_up.wav", 4, [1.0, 1.0], seed=3)
+    return build_stomp_dataset(tmp_path, workers=1)
+
+
+def test_candidate_sets():
+    sets = candidate_sets()
+    assert sets[0] == "xcorr48"
+    assert len(sets) == 1 + 2 ** len(FEATURE_GROUPS) - 1
+    assert "+".join(FEATURE_GROUPS) in sets
+
+
+# The tiny training split is smaller than the notebook's batch size
+@pytest.mark.filterwarnings("ignore:Got `batch_size`")
+def test_search_reports_accuracy_and_cost(dataset, tmp_path):
+    results, models = search(
+        dataset,
+        ["left", "right"],
+        ["xcorr48", "rms_zcr", "mfcc+xcorr"],
+        test_size=0.25,
+        hidden=(8,),
+        timing_stomps=4,
+    )
+
+    assert [r["ms"] for r in results] == sorted(r["ms"] for r in results)
+    assert results[0]["frontier"]
+    by_set = {r["feature_set"]: r for r in results}
+    assert by_set["mfcc+xcorr"]["n_features"] == 32
+    assert set(by_set["rms_zcr"]["timings"]) == {"rms_zcr"}
+    assert set(by_set["xcorr48"]["timings"]) == {"stft", *FEATURE_GROUPS}
+    # The gain difference makes left and right easy to tell apart
+    assert by_set["rms_zcr"]["accuracy"] >= 0.8
+
+    # Exported models take the features of their own set
+    NumpyMLP.from_sklearn(models["mfcc+xcorr"], "mfcc+xcorr").to_onnx(
+        tmp_path / "model.onnx"
+    )
+    model = from_onnx(tmp_path / "model.onnx")
+    assert model.feature_set == "mfcc+xcorr"
+    X = extract_features_batch(dataset.audio(slice(0, 6)), feature_set="mfcc+xcorr")
+    np.testing.assert_array_equal(model.predict(X), models["mfcc+xcorr"].predict(X))
+
+
+def test_search_requires_every_move(dataset):
+    with pytest.raises(ValueError, match="down"):
+        search(dataset, ["left", "down"], ["xcorr"])
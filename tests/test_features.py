@@ -0,0 +1,120 @@
+import numpy as np
+import pytest
+from features import (
+    DEFAULT_FEATURE_SET,
+    FEATURE_GROUPS,
+    extract_all_features_fused,
+    extract_all_features_with_xcorr,
+    extract_feature_set,
+    extract_features_batch,
+    feature_columns,
+    register_feature_group,
+)
+
+
+def make_stomps():
+    rng = np.random.default_rng(0)
+
+    noise = rng.standard_normal((3200, 2)) * 0.01
+
+    burst = np.zeros((3200, 2))
+    burst[1500:1700] = rng.standard_normal((200, 2)) * np.array([1.0, 0.3])
+
+    ramp = rng.standard_normal((3000, 2)) * np.linspace(0, 1, 3000)[:, np.newaxis]
+
+    return [noise, burst, ramp, np.zeros((3200, 2))]
+
+
+@pytest.mark.parametrize("dtype", [np.float32, np.float64])
+@pytest.mark.parametrize("index", range(4))
+def test_fused_matches_reference(dtype, index):
+    stomp = make_stomps()[index].astype(dtype)
+
+    expected = extract_all_features_with_xcorr(stomp)
+    actual = extract_all_features_fused(stomp)
+
+    assert actual.shape == (48,)
+    np.testing.assert_allclose(actual, expected, rtol=1e-4, atol=1e-3)
+
+
+def test_batch_matches_per_stomp():
+    rng = np.random.default_rng(1)
+    stomps = rng.standard_normal((5, 3200, 2)).astype(np.float32)
+    stomps *= np.linspace(0.01, 1.0, 5)[:, np.newaxis, np.newaxis]
+    stomps[2] = 0.0
+
+    features = extract_features_batch(stomps, batch_size=2)
+
+    assert features.shape == (5, 48)
+    assert features.dtype == np.float32
+    for stomp, row in zip(stomps, features):
+        np.testing.assert_allclose(
+            row, extract_all_features_with_xcorr(stomp), rtol=1e-4, atol=1e-3
+        )
+
+
+def test_batch_rejects_mono():
+    with pytest.raises(ValueError):
+        extract_features_batch(np.zeros((2, 3200)))
+
+
+@pytest.mark.parametrize("sr", [16000, 22050, 44100])
+def test_mel_basis_matches_librosa(sr):
+    import librosa
+    from features import _mel_basis
+
+    np.testing.assert_allclose(
+        _mel_basis(sr, 2048, 128),
+        librosa.filters.mel(sr=sr, n_fft=2048, n_mels=128),
+        rtol=1e-5,
+        atol=1e-8,
+    )
+
+
+@pytest.mark.parametrize(
+    "feature_set",
+    ["mfcc", "spectral", "rms_zcr", "xcorr", "rms_zcr+xcorr", "xcorr+mfcc"],
+)
+def test_feature_set_is_a_column_subset(feature_set):
+    stomps = np.stack(make_stomps()[:2])
+    full = extract_features_batch(stomps)
+    columns = feature_columns(DEFAULT_FEATURE_SET)
+    index = [columns.index(c) for c in feature_columns(feature_set)]
+
+    subset = extract_features_batch(stomps, feature_set=feature_set)
+    np.testing.assert_allclose(subset, full[:, index], rtol=1e-5, atol=1e-6)
+
+
+def test_default_feature_set_layout():
+    columns = feature_columns(DEFAULT_FEATURE_SET)
+    assert len(columns) == 48
+    # The xcorr block follows each channel's features
+    assert columns[20:24] == columns[44:48] == FEATURE_GROUPS["xcorr"].columns
+    assert columns[:2] == ("left.mfcc_mean0", "left.mfcc_mean1")
+    assert columns[24] == "right.mfcc_mean0"
+
+
+def test_timings_cover_only_the_computed_groups():
+    timings = {}
+    stomp = make_stomps()[1]
+    extract_feature_set(stomp, "rms_zcr+xcorr", timings=timings)
+    assert set(timings) == {"rms_zcr", "xcorr"}
+
+    extract_feature_set(stomp, DEFAULT_FEATURE_SET, timings=timings)
+    assert set(timings) == {"stft", *FEATURE_GROUPS}
+    assert all(t > 0 for t in timings.values())
+
+
+def test_unknown_feature_set():
+    with pytest.raises(KeyError, match="bogus"):
+        feature_columns("xcorr+bogus")
+
+
+def test_group_columns_must_be_unique():
+    with pytest.raises(ValueError, match="column"):
+
+        @register_feature_group("xcorr_copy", ["xcorr.peak"])
+        def _copy(stomps):
+            return stomps.y[..., 0, :1]
+
+    assert "xcorr_copy" not in FEATURE_GROUPS
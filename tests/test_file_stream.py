@@ -0,0 +1,130 @@
+import numpy as np
+import pytest
+import scipy.io.wavfile as wavfile
+from file_stream import FileStream
+from resample import PolyphaseResampler
+
+
+def read_all(stream, blocksize):
+    blocks = []
+    while not stream.finished:
+        chunk, overflow = stream.read(blocksize)
+        assert not overflow
+        assert chunk.shape == (blocksize, stream.channels)
+        assert chunk.dtype == np.float32
+        blocks.append(chunk)
+    return np.concatenate(blocks)
+
+
+@pytest.mark.parametrize(
+    "dtype, scale",
+    [(np.int16, 2**15), (np.int32, 2**31), (np.float32, 1.0), (np.uint8, None)],
+)
+def test_reads_wav_blocks_at_native_rate(tmp_path, dtype, scale):
+    rng = np.random.default_rng(0)
+    audio = rng.uniform(-0.9, 0.9, (10_000, 2))
+    if dtype is np.uint8:
+        data = (audio * 128 + 128).astype(np.uint8)
+        expected = (data.astype(np.float32) - 128) / 128
+    else:
+        data = (audio * scale).astype(dtype)
+        expected = data.astype(np.float32) / scale
+    path = tmp_path / "take.wav"
+    wavfile.write(path, 44100, data)
+
+    with FileStream(path, blocksize=4096) as stream:
+        assert stream.sr == 44100
+        assert stream.frames == 10_000
+        out = read_all(stream, 4096)
+
+    assert len(out) == 3 * 4096
+    np.testing.assert_allclose(out[:10_000], expected, atol=1e-6)
+    assert not out[10_000:].any()
+
+
+def test_reads_24_bit_wav(tmp_path):
+    samples = np.array([[0, -1], [2**23 - 1, -(2**23)], [12345, -54321]], np.int32)
+    raw = (samples[..., np.newaxis] >> np.array([0, 8, 16])).astype(np.uint8)
+    data = raw.tobytes()
+    header = (
+        b"RIFF"
+        + (36 + len(data)).to_bytes(4, "little")
+        + b"WAVEfmt "
+        + (16).to_bytes(4, "little")
+        + np.array([1, 2], "<u2").tobytes()
+        + np.array([48000, 48000 * 6], "<u4").tobytes()
+        + np.array([6, 24], "<u2").tobytes()
+        + b"data"
+        + len(data).to_bytes(4, "little")
+    )
+    path = tmp_path / "take24.wav"
+    path.write_bytes(header + data)
+
+    with FileStream(path) as stream:
+        chunk, _ = stream.read(3)
+    np.testing.assert_allclose(chunk, samples / 2**23)
+
+
+def test_mono_is_served_as_stereo(tmp_path):
+    path = tmp_path / "mono.wav"
+    mono = np.linspace(-1, 1, 1000, dtype=np.float32)
+    wavfile.write(path, 16000, mono)
+
+    with FileStream(path) as stream:
+        chunk, _ = stream.read(1000)
+    np.testing.assert_array_equal(chunk, np.stack([mono, mono], axis=1))
+
+
+def test_file_ending_on_a_block_boundary_serves_a_padded_block(tmp_path):
+    path = tmp_path / "take.wav"
+    wavfile.write(path, 16000, np.ones((3200, 2), np.float32))
+
+    with FileStream(path, blocksize=1600) as stream:
+        for _ in range(2):
+            chunk, _ = stream.read()
+            assert chunk.all()
+            assert not stream.finished
+        chunk, _ = stream.read()
+    assert not chunk.any()
+    assert stream.finished
+
+
+def test_stale_data_size_is_clamped_to_file(tmp_path):
+    # A recording that was cut off before its header was finalized
+    path = tmp_path / "cut.wav"
+    wavfile.write(path, 16000, np.ones((1000, 2), np.int16))
+    raw = bytearray(path.read_bytes())
+    raw[40:44] = (0xFFFFFFFF).to_bytes(4, "little")
+    path.write_bytes(bytes(raw))
+
+    with FileStream(path) as stream:
+        assert stream.frames == 1000
+
+
+def test_streaming_resample_matches_one_shot(tmp_path):
+    rng = np.random.default_rng(1)
+    audio = rng.standard_normal((48000, 2)).astype(np.float32) * 0.1
+    path = tmp_path / "take.wav"
+    wavfile.write(path, 48000, audio)
+
+    with FileStream(path, target_sr=16000) as stream:
+        assert (stream.file_sr, stream.sr) == (48000, 16000)
+        out = read_all(stream, 1600)
+
+    expected = PolyphaseResampler(48000, 16000)(audio, axis=0)
+    # 16000 frames, then the all-zero block that ends the stream
+    assert len(out) == 16000 + 1600
+    np.testing.assert_allclose(out[:16000], expected, atol=1e-5)
+    assert not out[16000:].any()
+
+
+def test_other_formats_use_soundfile(tmp_path):
+    sf = pytest.importorskip("soundfile")
+    path = tmp_path / "take.flac"
+    audio = np.random.default_rng(2).uniform(-0.5, 0.5, (5000, 2))
+    sf.write(path, audio, 22050)
+
+    with FileStream(path) as stream:
+        assert stream.sr == 22050
+        out = read_all(stream, 2048)
+    np.testing.assert_allclose(out[:5000], audio, atol=1e-4)
@@ -0,0 +1,61 @@
+import numpy as np
+import pytest
+from ring_buffer import RingBuffer
+from stomp_detector import StompDetector
+
+
+def make_stream(sr, seconds, seed=0):
+    rng = np.random.default_rng(seed)
+    audio = rng.standard_normal((int(sr * seconds), 2)).astype(np.float32) * 1e-3
+    # A few stomps of varying loudness
+    for t, gain in [(0.55, 0.5), (1.23, 0.05), (2.02, 0.008)]:
+        start = int(t * sr)
+        audio[start : start + sr // 25] += rng.uniform(-gain, gain, (sr // 25, 2))
+    return audio
+
+
+@pytest.mark.parametrize("sr", [1000, 16000, 44100])
+def test_incremental_matches_window_detection(sr):
+    audio = make_stream(sr, 3.0)
+    step = int(0.1 * sr)
+
+    reference = StompDetector(sr=sr, energy_threshold=7.0)
+    incremental = StompDetector(sr=sr, energy_threshold=7.0, incremental=True)
+    window = RingBuffer(reference.window_len, 2)
+
+    detections = 0
+    for start in range(0, len(audio), step):
+        chunk = audio[start : start + step]
+        window.write(chunk)
+
+        expected = reference.detect(window.latest(reference.window_len))
+        actual = incremental.process(chunk)
+
+        assert len(actual) == len(expected)
+        for a, b in zip(actual, expected):
+            np.testing.assert_array_equal(a, b)
+        assert incremental.noise_level == pytest.approx(reference.noise_level, rel=1e-4)
+        detections += len(actual)
+
+    assert detections >= 2
+
+
+def test_incremental_rebases_long_streams():
+    sr = 16000
+    step = int(0.1 * sr)
+    reference = StompDetector(sr=sr, energy_threshold=1e9, alpha=0.5)
+    incremental = StompDetector(
+        sr=sr, energy_threshold=1e9, alpha=0.5, incremental=True
+    )
+    window = RingBuffer(reference.window_len, 2)
+
+    # Over 1e6 of accumulated energy, then near-silence that must still be
+    # measured precisely.
+    loud = np.ones((step, 2), dtype=np.float32)
+    quiet = np.full((step, 2), 1e-4, dtype=np.float32)
+    for chunk in [loud] * 700 + [quiet] * 5:
+        window.write(chunk)
+        reference.detect(window.latest(reference.window_len))
+        incremental.process(chunk)
+
+    assert incremental.noise_level == pytest.approx(reference.noise_level, rel=1e-4)
@@ -0,0 +1,73 @@
+import numpy as np
+import pytest
+from stomp_detector import StompDetector
+
+ONSETS = [0.5, 1.25, 2.0]
+
+
+def make_stream(sr, seconds, onsets=ONSETS, seed=0):
+    rng = np.random.default_rng(seed)
+    audio = rng.standard_normal((int(sr * seconds), 2)).astype(np.float32) * 1e-3
+    for t in onsets:
+        start = int(t * sr)
+        audio[start : start + sr // 25] += rng.uniform(0.2, 0.5, (sr // 25, 2))
+    return audio
+
+
+def run(detector, audio, hop):
+    stomps = []
+    for start in range(0, len(audio), hop):
+        stomps.extend(detector.process(audio[start : start + hop]))
+    return stomps
+
+
+@pytest.mark.parametrize("hop_ms", [5, 10, 20])
+def test_low_latency_locates_onset(hop_ms):
+    sr = 16000
+    hop = sr * hop_ms // 1000
+    detector = StompDetector(
+        sr=sr, energy_threshold=7.0, low_latency=True, lookahead_ms=50
+    )
+    stomps = run(detector, make_stream(sr, 3.0), hop)
+
+    assert len(stomps) == len(ONSETS)
+    assert all(len(stomp) == int(16000 * 0.2) for stomp in stomps)
+
+    for (onset, detected), t in zip(detector.events, ONSETS):
+        assert abs(onset - int(t * sr)) <= 2
+        # Emitted once the lookahead is in, quantized to the hop
+        assert detector.lookahead_frames <= detected - onset
+        assert detected - onset < detector.lookahead_frames + hop
+
+    stats = detector.latency_stats()
+    assert stats["count"] == len(ONSETS)
+    assert 50 <= stats["onset_to_detect_ms"]["p99"] < 50 + hop_ms
+
+
+def test_low_latency_window_is_aligned_to_onset():
+    sr = 16000
+    detector = StompDetector(sr=sr, energy_threshold=7.0, low_latency=True)
+    audio = make_stream(sr, 1.0, onsets=[0.5])
+    stomps = run(detector, audio, 160)
+
+    # Same rate in and out, so the window is the raw audio ending
+    # `lookahead_frames` after the onset
+    onset, _ = detector.events[0]
+    end = onset + detector.lookahead_frames
+    np.testing.assert_allclose(
+        stomps[0], audio[end - detector.window_len : end], atol=1e-6
+    )
+
+
+@pytest.mark.parametrize("hop_ms", [5, 20, 100])
+def test_cooldown_is_independent_of_hop(hop_ms):
+    sr = 16000
+    hop = sr * hop_ms // 1000
+    # Second burst 200 ms after the first: inside a 300 ms cooldown only
+    audio = make_stream(sr, 2.0, onsets=[0.5, 0.7])
+
+    for cooldown_ms, expected in [(300, 1), (100, 2)]:
+        detector = StompDetector(
+            sr=sr, energy_threshold=7.0, cooldown_ms=cooldown_ms, low_latency=True
+        )
+        assert len(run(detector, audio, hop)) == expected
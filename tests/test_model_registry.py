@@ -0,0 +1,41 @@
+import numpy as np
+import onnxruntime as ort
+import pytest
+import model_registry
+from classifier import ElevenDirectionClassifier, FiveDirectionClassifier
+
+
+def test_models_resolve_outside_repo_root(registry, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    for name in registry.MODELS:
+        assert registry.model_path(name).exists()
+
+    with pytest.raises(KeyError):
+        registry.model_path("missing")
+
+
+def test_sessions_are_shared(registry):
+    a = FiveDirectionClassifier()
+    b = FiveDirectionClassifier()
+    assert a.sess is b.sess
+    assert ElevenDirectionClassifier().sess is not a.sess
+
+
+@pytest.mark.parametrize("name", list(model_registry.MODELS))
+def test_optimized_cache_matches_original(registry, name):
+    path = registry.model_path(name)
+    cached = registry.optimized_path(path)
+    assert not cached.exists()
+
+    first = registry.load_session(path)
+    assert cached.exists()
+    reloaded = registry.load_session(path)
+    reference = ort.InferenceSession(str(path), providers=["CPUExecutionProvider"])
+
+    x = np.random.default_rng(0).standard_normal((8, 48)).astype(np.float32)
+    expected = reference.run(None, {"input": x})
+    for sess in (first, reloaded):
+        label, proba = sess.run(None, {"input": x})
+        np.testing.assert_array_equal(label, expected[0])
+        for row, expected_row in zip(proba, expected[1]):
+            assert row == pytest.approx(expected_row, rel=1e-5, abs=1e-7)
@@ -0,0 +1,123 @@
+import numpy as np
+import pytest
+from features import (
+    HOP_LENGTH,
+    N_FFT,
+    _frames,
+    _hann_window,
+    extract_all_features_fused,
+    reduce_noise,
+)
+from noise_profile import NoiseProfile
+from replay import make_stomp_track
+from resample import PolyphaseResampler
+from stomp_detector import StompDetector
+
+# Per-channel feature block: 14 MFCC stats, RMS, ZCR, then spectral centroid
+CENTROID_MEAN = 18
+
+
+def feature_spectrum(audio):
+    """Mean magnitude spectrum of (T, channels) 16 kHz audio, per channel."""
+    frames = _frames(audio.T, N_FFT, HOP_LENGTH)
+    return np.abs(np.fft.rfft(frames * _hann_window(N_FFT), axis=-1)).mean(axis=-2)
+
+
+@pytest.mark.parametrize("sr", [48000, 44100, 16000])
+def test_profile_matches_feature_stft_of_resampled_noise(sr):
+    noise = np.random.default_rng(0).standard_normal((4 * sr, 2)).astype(np.float32)
+    noise *= np.array([0.01, 0.03], dtype=np.float32)
+
+    profile = NoiseProfile(sr=sr)
+    assert profile.update(noise)
+    resampled = PolyphaseResampler(sr, 16000)(noise, axis=0) if sr != 16000 else noise
+
+    expected = feature_spectrum(resampled)
+    band = slice(10, 800)  # below the resampler's transition band
+    np.testing.assert_allclose(profile.spectrum[:, band], expected[:, band], rtol=0.1)
+
+
+def test_update_is_a_running_average():
+    profile = NoiseProfile(sr=16000, alpha=0.5)
+    assert not profile.update(np.ones((100, 2), np.float32))
+    assert profile.spectrum is None
+
+    quiet = np.random.default_rng(0).standard_normal((N_FFT, 2)).astype(np.float32)
+    profile.update(quiet * 0.01)
+    first = profile.spectrum
+    profile.update(quiet * 0.03)
+    # One frame with alpha 0.5: halfway between the 0.01 and 0.03 spectra
+    np.testing.assert_allclose(profile.spectrum, 2 * first, rtol=1e-4)
+    assert profile.updates == 2
+
+
+def test_gate_recovers_spectral_features_of_clean_stomp():
+    sr = 16000
+    rng = np.random.default_rng(0)
+    t = np.arange(3200) / sr
+    tone = (np.sin(2 * np.pi * 500 * t) * np.exp(-t * 10))[:, None] * [1.0, 0.8]
+    noise = rng.standard_normal((10 * sr, 2)) * 0.05
+
+    profile = NoiseProfile(sr=sr, strength=1.0)
+    profile.update(noise[3200:])
+    stomp = (tone + noise[:3200]).astype(np.float32)
+
+    clean = extract_all_features_fused(tone.astype(np.float32))
+    noisy = extract_all_features_fused(stomp)
+    gated = extract_all_features_fused(stomp, noise_profile=profile)
+
+    def error(f):
+        return abs(f[CENTROID_MEAN] - clean[CENTROID_MEAN])
+
+    assert error(gated) < error(noisy) / 2
+    # Time-domain features are left alone
+    np.testing.assert_allclose(gated[14:18], noisy[14:18], rtol=1e-5)
+    np.testing.assert_allclose(gated[20:24], noisy[20:24], rtol=1e-5)
+
+
+def test_empty_profile_changes_nothing():
+    stomp = np.random.default_rng(0).standard_normal((3200, 2)).astype(np.float32)
+    np.testing.assert_array_equal(
+        extract_all_features_fused(stomp, noise_profile=NoiseProfile()),
+        extract_all_features_fused(stomp),
+    )
+
+
+def test_profile_rate_must_match_features():
+    profile = NoiseProfile(feature_sr=22050)
+    with pytest.raises(ValueError, match="22050"):
+        extract_all_features_fused(
+            np.zeros((3200, 2), np.float32), noise_profile=profile
+        )
+
+
+@pytest.mark.parametrize("low_latency", [False, True])
+def test_detector_learns_profile_between_stomps(low_latency):
+    sr = 16000
+    audio, onsets = make_stomp_track(sr=sr, duration=10, noise=1e-3, seed=1)
+    reference = NoiseProfile(sr=sr)
+    reference.update(np.random.default_rng(2).standard_normal((sr, 2)) * 1e-3)
+
+    profile = NoiseProfile(sr=sr)
+    detector = StompDetector(
+        sr=sr, energy_threshold=7.0, low_latency=low_latency, noise_profile=profile
+    )
+    step = sr // 100
+    stomps = [
+        stomp
+        for i in range(0, len(audio), step)
+        for stomp in detector.process(audio[i : i + step])
+    ]
+
+    assert len(stomps) == len(onsets)
+    assert profile.updates > 0
+    # Stomps are 100x louder than the noise; the profile stays near the noise
+    ratio = np.median(profile.spectrum / reference.spectrum)
+    assert 0.7 < ratio < 1.5
+
+
+def test_reduce_noise_uses_given_profile():
+    pytest.importorskip("librosa")
+    audio = np.random.default_rng(0).standard_normal(3200).astype(np.float32)
+    untouched = reduce_noise(audio, noise_profile=np.zeros(1 + N_FFT // 2))
+    np.testing.assert_allclose(untouched, audio[: len(untouched)], atol=1e-4)
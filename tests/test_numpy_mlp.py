@@ -0,0 +1,191 @@
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import numpy as np
+import onnxruntime as ort
+import pytest
+import model_registry
+from classifier import (
+    ElevenDirectionClassifier,
+    FiveDirectionClassifier,
+    LeftRightClassifier,
+)
+from features import extract_features_batch
+from numpy_mlp import NumpyMLP, from_onnx
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+@pytest.mark.parametrize("name", list(model_registry.MODELS))
+@pytest.mark.parametrize("n", [1, 64])
+def test_matches_inference_session(name, n):
+    path = model_registry.model_path(name)
+    sess = ort.InferenceSession(str(path), providers=["CPUExecutionProvider"])
+    model = from_onnx(path)
+
+    x = np.random.default_rng(n).standard_normal((n, 48)).astype(np.float32) * 3
+    labels, probabilities = sess.run(None, {"input": x})
+    expected = np.array([[row[c] for c in model.classes] for row in probabilities])
+
+    np.testing.assert_array_equal(model.predict(x), labels)
+    np.testing.assert_allclose(model.predict_proba(x), expected, atol=1e-5)
+
+
+def test_save_load_roundtrip(tmp_path):
+    model = from_onnx(model_registry.model_path("all_moves"))
+    model.save(tmp_path / "model.npz")
+    loaded = NumpyMLP.load(tmp_path / "model.npz")
+
+    assert loaded.activations == model.activations
+    x = np.random.default_rng(0).standard_normal((5, 48)).astype(np.float32)
+    np.testing.assert_array_equal(loaded.predict_proba(x), model.predict_proba(x))
+
+
+def test_classifier_backends_agree(registry):
+    stomps = list(np.random.default_rng(0).standard_normal((6, 3200, 2)) * 0.1)
+    for cls in (FiveDirectionClassifier, ElevenDirectionClassifier):
+        ort_classifier = cls()
+        numpy_classifier = cls(backend="numpy")
+        features = ort_classifier.features_batch(stomps)
+        assert numpy_classifier.predict(features) == ort_classifier.predict(features)
+        np.testing.assert_allclose(
+            numpy_classifier.predict_proba(features),
+            ort_classifier.predict_proba(features),
+            atol=1e-5,
+        )
+        assert numpy_classifier.classify(stomps[0]) == ort_classifier.classify(
+            stomps[0]
+        )
+
+    assert cls(backend="numpy").model is numpy_classifier.model
+    with pytest.raises(ValueError, match="backend"):
+        FiveDirectionClassifier(backend="tflite")
+
+
+def test_cached_model_needs_neither_onnx_nor_onnxruntime(registry, tmp_path):
+    registry.get_numpy_model("five_directions")
+    cached = registry.numpy_path(registry.model_path("five_directions"))
+    assert cached.exists()
+
+    code = """
+import sys
+import numpy as np
+from classifier import FiveDirectionClassifier
+classifier = FiveDirectionClassifier(backend="numpy")
+classifier.predict(np.zeros((1, 48), np.float32))
+print(' '.join({m.split('.')[0] for m in sys.modules}))
+"""
+    out = subprocess.run(
+        [sys.executable, "-c", code],
+        cwd=ROOT,
+        env={**os.environ, "STOMP_MODEL_CACHE": str(tmp_path / "cache")},
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout
+    modules = set(out.split())
+    assert "onnx" not in modules
+    assert "onnxruntime" not in modules
+
+
+def test_unsupported_operator_is_rejected(tmp_path):
+    onnx = pytest.importorskip("onnx")
+    model = onnx.load(str(model_registry.model_path("five_directions")))
+    relu = next(node for node in model.graph.node if node.op_type == "Relu")
+    relu.op_type = "LeakyRelu"
+    path = tmp_path / "leaky.onnx"
+    onnx.save(model, str(path))
+
+    with pytest.raises(ValueError, match="LeakyRelu"):
+        from_onnx(path)
+
+
+def fit_pipeline(n_features, n_classes, seed=0):
+    sklearn = pytest.importorskip("sklearn")
+    from sklearn.neural_network import MLPClassifier
+    from sklearn.pipeline import make_pipeline
+    from sklearn.preprocessing import StandardScaler
+
+    rng = np.random.default_rng(seed)
+    X = rng.standard_normal((120, n_features)) * 3 + 1
+    y = np.arange(120) % n_classes
+    pipeline = make_pipeline(
+        StandardScaler(), MLPClassifier((16, 8), max_iter=20, random_state=seed)
+    )
+    with pytest.warns(sklearn.exceptions.ConvergenceWarning):
+        pipeline.fit(X, y)
+    return pipeline, X.astype(np.float32)
+
+
+@pytest.mark.parametrize("n_classes", [2, 5])
+def test_sklearn_to_onnx_roundtrip(tmp_path, n_classes):
+    pipeline, X = fit_pipeline(12, n_classes)
+    model = NumpyMLP.from_sklearn(pipeline, "rms_zcr+xcorr")
+    np.testing.assert_array_equal(model.predict(X), pipeline.predict(X))
+    np.testing.assert_allclose(
+        model.predict_proba(X), pipeline.predict_proba(X), atol=1e-5
+    )
+
+    path = tmp_path / "model.onnx"
+    model.to_onnx(path)
+    sess = ort.InferenceSession(str(path), providers=["CPUExecutionProvider"])
+    labels, probabilities = sess.run(None, {"input": X})
+    np.testing.assert_array_equal(labels, pipeline.predict(X))
+    np.testing.assert_allclose(
+        [[row[c] for c in range(n_classes)] for row in probabilities],
+        pipeline.predict_proba(X),
+        atol=1e-5,
+    )
+    metadata = sess.get_modelmeta().custom_metadata_map
+    assert metadata == {"feature_set": "rms_zcr+xcorr"}
+
+    parsed = from_onnx(path)
+    assert parsed.feature_set == "rms_zcr+xcorr"
+    parsed.save(tmp_path / "model.npz")
+    assert NumpyMLP.load(tmp_path / "model.npz").feature_set == "rms_zcr+xcorr"
+
+
+def test_shipped_models_use_the_default_feature_set(tmp_path):
+    model = from_onnx(model_registry.model_path("left_right"))
+    assert model.feature_set == "xcorr48"
+
+    # .npz files cached before models recorded their feature set
+    model.save(tmp_path / "model.npz")
+    with np.load(tmp_path / "model.npz") as f:
+        arrays = {k: f[k] for k in f.files if k != "feature_set"}
+    np.savez(tmp_path / "old.npz", **arrays)
+    assert NumpyMLP.load(tmp_path / "old.npz").feature_set == "xcorr48"
+
+
+@pytest.mark.parametrize("backend", ["onnxruntime", "numpy"])
+def test_classifier_computes_the_declared_feature_set(
+    registry, tmp_path, monkeypatch, backend
+):
+    pipeline, _ = fit_pipeline(4, 2)
+    path = tmp_path / "xcorr_only.onnx"
+    NumpyMLP.from_sklearn(pipeline, "xcorr").to_onnx(path)
+    monkeypatch.setitem(model_registry.MODELS, "left_right", str(path))
+
+    classifier = LeftRightClassifier(backend=backend)
+    assert classifier.feature_set == "xcorr"
+    stomps = list(np.random.default_rng(0).standard_normal((3, 3200, 2)) * 0.1)
+    features = classifier.features_batch(stomps)
+    np.testing.assert_array_equal(
+        features, extract_features_batch(np.stack(stomps), feature_set="xcorr")
+    )
+    assert classifier.predict(features) == [
+        LeftRightClassifier.SUPER_BASIC_MOVES[i] for i in pipeline.predict(features)
+    ]
+    assert classifier.classify(stomps[0]) == classifier.predict(features[:1])[0]
+
+
+def test_classifier_rejects_mismatched_feature_set(registry, tmp_path, monkeypatch):
+    pipeline, _ = fit_pipeline(12, 2)
+    path = tmp_path / "mismatched.onnx"
+    NumpyMLP.from_sklearn(pipeline, "xcorr").to_onnx(path)
+    monkeypatch.setitem(model_registry.MODELS, "left_right", str(path))
+
+    with pytest.raises(ValueError, match="12 features"):
+        LeftRightClassifier()
@@ -0,0 +1,174 @@
+import threading
+import time
+
+import numpy as np
+import pytest
+from pipeline import QueueClosed, StageQueue, StompPipeline
+from ring_buffer import RingBuffer
+from telemetry import NULL_TRACE
+
+
+def test_drop_oldest_policy():
+    queue = StageQueue("q", maxsize=2, policy="drop_oldest")
+    for i in range(4):
+        assert queue.put(i)
+
+    assert queue.metrics() == {"depth": 2, "max_depth": 2, "puts": 4, "dropped": 2}
+    assert queue.get() == 2
+    assert queue.get() == 3
+
+
+def test_drop_newest_policy():
+    queue = StageQueue("q", maxsize=2, policy="drop_newest")
+    results = [queue.put(i) for i in range(4)]
+
+    assert results == [True, True, False, False]
+    assert queue.metrics()["dropped"] == 2
+    assert queue.get() == 0
+
+
+def test_block_policy_waits_for_room():
+    queue = StageQueue("q", maxsize=1, policy="block")
+    queue.put("a")
+    assert not queue.put("b", timeout=0.01)
+
+    threading.Timer(0.05, queue.get).start()
+    assert queue.put("c", timeout=1.0)
+    assert queue.get() == "c"
+
+
+def test_close_unblocks_get():
+    queue = StageQueue("q")
+    queue.put(1)
+    queue.close()
+    assert queue.get() == 1
+    with pytest.raises(QueueClosed):
+        queue.get()
+    with pytest.raises(TimeoutError):
+        StageQueue("empty").get(timeout=0.01)
+
+
+class FixedDetector:
+    def __init__(self, threshold):
+        self.threshold = threshold
+        self.window = RingBuffer(200, 2)
+
+    def process(self, chunk):
+        self.window.write(chunk)
+        audio = self.window.latest(200)
+        if np.max(np.abs(audio)) > self.threshold:
+            return [audio.copy()]
+        return []
+
+
+class SlowClassifier:
+    def classify(self, stomp, trace=NULL_TRACE):
+        time.sleep(0.05)
+        return "left"
+
+
+class RecordingController:
+    def __init__(self):
+        self.pressed = []
+        self.captured_at = []
+
+    def press(self, direction, captured_at=None):
+        self.pressed.append(direction)
+        self.captured_at.append(captured_at)
+
+
+def test_pipeline_runs_stages_off_the_callback():
+    sr = 1000
+    controller = RecordingController()
+    pipeline = StompPipeline(
+        FixedDetector(0.5),
+        SlowClassifier(),
+        controller,
+        sr=sr,
+        window_frames=200,
+        step_frames=100,
+    )
+    pipeline.start()
+
+    silence = np.zeros((100, 2), dtype=np.float32)
+    pulse = np.zeros((100, 2), dtype=np.float32)
+    pulse[50] = 1.0
+
+    # A slow classifier must not slow down the callback.
+    start = time.perf_counter()
+    for chunk in [silence, pulse, silence, silence, silence]:
+        pipeline.callback(chunk, len(chunk), None, None)
+    assert time.perf_counter() - start < 0.05
+
+    deadline = time.time() + 2.0
+    while len(controller.pressed) < 2 and time.time() < deadline:
+        time.sleep(0.01)
+    pipeline.stop()
+
+    # The pulse is seen by the two windows that contain it.
+    assert controller.pressed == ["left", "left"]
+    metrics = pipeline.metrics()
+    assert metrics["hops"] == 5
+    assert metrics["overruns"] == 0
+    assert metrics["stomps"]["puts"] == 2
+
+
+class GatedDetector(FixedDetector):
+    """Holds back detection until `gate` is set, as if it fell behind."""
+
+    def __init__(self, threshold):
+        super().__init__(threshold)
+        self.gate = threading.Event()
+
+    def process(self, chunk):
+        self.gate.wait(2.0)
+        return super().process(chunk)
+
+
+def test_capture_time_is_that_of_the_detected_block():
+    detector = GatedDetector(0.5)
+    controller = RecordingController()
+    pipeline = StompPipeline(
+        detector,
+        SlowClassifier(),
+        controller,
+        sr=1000,
+        window_frames=200,
+        step_frames=100,
+    )
+    pipeline.start()
+
+    silence = np.zeros((100, 2), dtype=np.float32)
+    pulse = silence.copy()
+    pulse[50] = 1.0
+    # Detection is stuck on the first hop while the pulse and more audio arrive
+    pipeline.callback(silence, len(silence), None, None)
+    time.sleep(0.02)
+    pipeline.callback(pulse, len(pulse), None, None)
+    time.sleep(0.05)
+    later = time.perf_counter()
+    pipeline.callback(silence, len(silence), None, None)
+    detector.gate.set()
+
+    deadline = time.time() + 2.0
+    while len(controller.pressed) < 2 and time.time() < deadline:
+        time.sleep(0.01)
+    pipeline.stop()
+
+    # The first press is timed from the pulse's block, not the newest one
+    first, second = controller.captured_at
+    assert first < later <= second
+
+
+def test_pipeline_read_for_calibration():
+    pipeline = StompPipeline(
+        None, None, None, sr=1000, window_frames=200, step_frames=100
+    )
+    data = np.arange(300, dtype=np.float32).reshape(-1, 1).repeat(2, axis=1)
+    pipeline.callback(data, len(data), None, None)
+
+    chunk, overflow = pipeline.read(100)
+    assert not overflow
+    np.testing.assert_array_equal(chunk, data[:100])
+    chunk, _ = pipeline.read(100)
+    np.testing.assert_array_equal(chunk, data[100:200])
@@ -0,0 +1,137 @@
+import threading
+import time
+
+import numpy as np
+import pytest
+from dataset_builder import StompSegmenter, build_dataset
+from file_stream import FileStream
+from record import StreamingRecorder, WavWriter, store_segments
+
+
+def read_all(path):
+    with FileStream(str(path)) as stream:
+        return stream.sr, stream.read(stream.frames)[0]
+
+
+def blocks(n, frames=512, seed=0):
+    rng = np.random.default_rng(seed)
+    return [rng.uniform(-1.2, 1.2, (frames, 2)).astype(np.float32) for _ in range(n)]
+
+
+def test_wav_writer_header_is_valid_after_each_flush(tmp_path):
+    path = tmp_path / "take.wav"
+    first, second = blocks(2)
+    writer = WavWriter(path, 44100)
+    writer.write(first)
+    writer.flush()
+
+    # Readable mid-take, as if the process had crashed here
+    sr, audio = read_all(path)
+    assert sr == 44100
+    np.testing.assert_array_equal(audio, np.clip(first, -1, 1))
+
+    writer.write(second)
+    writer.close()
+    _, audio = read_all(path)
+    np.testing.assert_array_equal(
+        audio, np.clip(np.concatenate([first, second]), -1, 1)
+    )
+
+
+def test_wav_writer_matches_scipy(tmp_path):
+    wavfile = pytest.importorskip("scipy.io.wavfile")
+    path = tmp_path / "take.wav"
+    data = blocks(1)[0]
+    writer = WavWriter(path, 48000)
+    writer.write(data)
+    writer.close()
+
+    sr, audio = wavfile.read(path)
+    assert sr == 48000
+    np.testing.assert_array_equal(audio, np.clip(data, -1, 1))
+
+
+def test_recorder_streams_every_block(tmp_path):
+    path = tmp_path / "take.wav"
+    recorder = StreamingRecorder(path, 16000, buffer_seconds=1.0, flush_seconds=0.01)
+    recorder.start()
+    takes = blocks(200)
+    for block in takes:
+        recorder.callback(block, len(block), None, None)
+        time.sleep(0.0005)
+    stats = recorder.stop()
+
+    _, audio = read_all(path)
+    np.testing.assert_array_equal(audio, np.clip(np.concatenate(takes), -1, 1))
+    assert stats["blocks"] == 200
+    assert stats["seconds"] == pytest.approx(200 * 512 / 16000)
+    assert stats["dropped_frames"] == 0
+    # Memory is the preallocated ring, whatever the take length
+    assert recorder.capture.capacity == 16000
+
+
+def test_recorder_counts_audio_lost_to_a_stalled_writer(tmp_path):
+    path = tmp_path / "take.wav"
+    recorder = StreamingRecorder(path, 16000, buffer_seconds=0.5, flush_seconds=0.05)
+
+    # The writer blocks on its first write while we hold the lock
+    stall = threading.Lock()
+    write = recorder.writer.write
+
+    def slow_write(block):
+        with stall:
+            write(block)
+
+    recorder.writer.write = slow_write
+    with stall:
+        recorder.start()
+        for block in blocks(100):  # 3.2 s into a 0.5 s buffer
+            recorder.callback(block, len(block), None, None)
+        time.sleep(0.1)
+    stats = recorder.stop()
+
+    assert stats["overruns"] >= 1
+    assert stats["dropped_frames"] > 0
+    assert stats["seconds"] * 16000 + stats["dropped_frames"] == 100 * 512
+    assert stats["max_writer_lag_ms"] >= 500
+
+
+def test_recorder_reports_writer_errors(tmp_path):
+    recorder = StreamingRecorder(tmp_path / "take.wav", 16000, flush_seconds=0.01)
+
+    def fail(block):
+        raise OSError("disk full")
+
+    recorder.writer.write = fail
+    recorder.start()
+    recorder.callback(blocks(1)[0], 512, None, None)
+    recorder.stop()
+    assert str(recorder.error) == "disk full"
+
+
+def test_segmented_take_is_a_dataset_cache_hit(tmp_path, capsys):
+    sr = 48000
+    rng = np.random.default_rng(1)
+    audio = rng.standard_normal((sr * 3, 2)).astype(np.float32) * 1e-4
+    for i in range(2):
+        start = sr // 2 + i * sr
+        audio[start : start + 2400] = rng.uniform(-0.5, 0.5, (2400, 2))
+
+    path = tmp_path / "alice_left.wav"
+    recorder = StreamingRecorder(
+        path, sr, flush_seconds=0.01, segmenter=StompSegmenter(sr)
+    )
+    recorder.start()
+    for i in range(0, len(audio), 480):
+        recorder.callback(audio[i : i + 480], 480, None, None)
+    stats = recorder.stop()
+    store_segments(path, recorder.segmenter, tmp_path / ".stomp_cache")
+
+    assert stats["stomps"] == 2
+    store = build_dataset(tmp_path, workers=1)
+    assert "1 cached, 0 processed" in capsys.readouterr().out
+    assert list(store["move"]) == ["left", "left"]
+
+    # Same features as segmenting the finished file
+    rebuilt = build_dataset(tmp_path, cache_dir=tmp_path / "fresh", workers=1)
+    np.testing.assert_array_equal(store["X"], rebuilt["X"])
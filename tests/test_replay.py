@@ -0,0 +1,60 @@
+import pytest
+from replay import make_stomp_track, replay, score, write_track
+
+# Regression thresholds for replaying the synthetic track. Realtime factors
+# are far above these on a laptop (~200x, ~100x in low-latency mode) and
+# are kept loose so slow CI machines don't flake.
+MIN_PRECISION = 0.95
+MIN_RECALL = 0.95
+MAX_ONSET_ERROR_P95_MS = 10.0
+MIN_REALTIME_FACTOR = {False: 20.0, True: 10.0}
+
+
+@pytest.fixture(scope="module")
+def track(tmp_path_factory):
+    sr = 48000
+    audio, onsets = make_stomp_track(sr=sr, duration=20.0, seed=1)
+    path = tmp_path_factory.mktemp("replay") / "track.wav"
+    write_track(path, audio, sr, onsets)
+    return path, onsets
+
+
+def test_score_matches_within_tolerance():
+    scores = score([1.002, 2.5, 3.01], [1.0, 2.0, 3.0], tolerance=0.05)
+    assert scores["precision"] == pytest.approx(2 / 3)
+    assert scores["recall"] == pytest.approx(2 / 3)
+    assert scores["timing_error_ms"]["mean"] == pytest.approx(6.0)
+    assert scores["timing_error_ms"]["max_abs"] == pytest.approx(10.0)
+
+
+def test_score_matches_each_detection_once():
+    scores = score([1.0], [0.99, 1.01], tolerance=0.05)
+    assert scores["precision"] == 1.0
+    assert scores["recall"] == 0.5
+
+
+def test_make_stomp_track_places_onsets():
+    audio, onsets = make_stomp_track(sr=16000, duration=5.0, seed=0)
+    assert audio.shape == (80000, 2)
+    assert onsets[0] == 0.5
+    assert (onsets < 4.5).all()
+    for onset in onsets:
+        i = int(onset * 16000)
+        assert abs(audio[i : i + 800]).max() > 10 * abs(audio[i - 800 : i]).max()
+
+
+@pytest.mark.parametrize("low_latency", [False, True])
+def test_replay_regression(track, low_latency):
+    path, onsets = track
+    result = replay(path, low_latency=low_latency)
+    scores = score(result.onsets, onsets)
+
+    assert scores["precision"] >= MIN_PRECISION
+    assert scores["recall"] >= MIN_RECALL
+    assert scores["timing_error_ms"]["p95_abs"] <= MAX_ONSET_ERROR_P95_MS
+    assert result.realtime_factor >= MIN_REALTIME_FACTOR[low_latency]
+
+    assert len(result.directions) == len(result.onsets)
+    stages = result.telemetry["stages"]
+    assert stages["detect"]["count"] > 0
+    assert stages["inference"]["count"] == len(result.onsets)
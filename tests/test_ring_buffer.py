@@ -0,0 +1,76 @@
+import numpy as np
+import pytest
+from ring_buffer import RingBuffer
+
+
+def rolled_window(chunks, window_frames):
+    """Reference implementation: the np.roll window from main.py."""
+    audio_buffer = np.zeros((window_frames, 2), dtype=np.float32)
+    for chunk in chunks:
+        audio_buffer = np.roll(audio_buffer, -len(chunk), axis=0)
+        audio_buffer[-len(chunk) :] = chunk
+    return audio_buffer
+
+
+def test_matches_np_roll():
+    rng = np.random.default_rng(0)
+    window_frames = 200
+    ring = RingBuffer(window_frames, 2)
+    chunks = []
+
+    for _ in range(13):
+        chunk = rng.standard_normal((70, 2)).astype(np.float32)
+        chunks.append(chunk)
+        ring.write(chunk)
+        np.testing.assert_array_equal(
+            ring.latest(window_frames), rolled_window(chunks, window_frames)
+        )
+
+
+def test_latest_is_contiguous_view():
+    ring = RingBuffer(100, 2)
+    for i in range(7):
+        ring.write(np.full((30, 2), i, dtype=np.float32))
+
+    window = ring.latest(100)
+    assert window.flags.c_contiguous
+    assert not window.flags.owndata
+    assert not window.flags.writeable
+
+
+def test_multiple_window_lengths():
+    ring = RingBuffer(100, 2)
+    data = np.arange(250, dtype=np.float32).reshape(-1, 1).repeat(2, axis=1)
+    for start in range(0, 250, 25):
+        ring.write(data[start : start + 25])
+
+    np.testing.assert_array_equal(ring.latest(100), data[-100:])
+    np.testing.assert_array_equal(ring.latest(40), data[-40:])
+    np.testing.assert_array_equal(ring.read(160, 50), data[160:210])
+
+
+def test_unwritten_frames_are_zero():
+    ring = RingBuffer(10, 2)
+    ring.write(np.ones((3, 2), dtype=np.float32))
+    window = ring.latest(10)
+    assert np.all(window[:7] == 0)
+    assert np.all(window[7:] == 1)
+
+
+def test_oversized_write_keeps_newest():
+    ring = RingBuffer(10, 1)
+    ring.write(np.arange(25, dtype=np.float32))
+    assert ring.frames_written == 25
+    np.testing.assert_array_equal(ring.latest(10)[:, 0], np.arange(15, 25))
+
+
+def test_overwritten_and_invalid_reads():
+    ring = RingBuffer(10, 1)
+    ring.write(np.zeros(15, dtype=np.float32))
+    assert ring.overwritten(4)
+    assert not ring.overwritten(5)
+
+    with pytest.raises(ValueError):
+        ring.read(10, 10)
+    with pytest.raises(ValueError):
+        ring.latest(11)
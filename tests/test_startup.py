@@ -0,0 +1,45 @@
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+def modules_after(code):
+    """Top-level packages imported by `code`, run in a fresh interpreter."""
+    code += "\nimport sys\nprint(' '.join({m.split('.')[0] for m in sys.modules}))"
+    out = subprocess.run(
+        [sys.executable, "-c", code],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout
+    return set(out.split())
+
+
+def test_runtime_path_does_not_import_librosa():
+    modules = modules_after(
+        """
+import numpy as np
+from stomp_detector import StompDetector
+from classifier import FiveDirectionClassifier
+
+rng = np.random.default_rng(0)
+audio = rng.standard_normal((48000, 2)).astype(np.float32) * 1e-3
+audio[24000:25000] += 0.5
+detector = StompDetector(sr=48000, incremental=True)
+classifier = FiveDirectionClassifier()
+stomps = [s for i in range(0, 48000, 4800) for s in detector.process(audio[i : i + 4800])]
+assert stomps
+classifier.classify(stomps[0])
+"""
+    )
+    for heavy in ("librosa", "numba", "scipy"):
+        assert heavy not in modules
+
+
+def test_main_imports_are_lazy():
+    modules = modules_after("import main")
+    for heavy in ("sounddevice", "onnxruntime", "pyautogui", "librosa", "scipy"):
+        assert heavy not in modules
@@ -0,0 +1,115 @@
+import numpy as np
+import pytest
+from dataset_builder import MOVES, build_dataset, segment_file
+from helpers import write_take
+from stomp_dataset import (
+    INT16_SCALE,
+    StompDataset,
+    build_stomp_dataset,
+    dequantize,
+    quantize,
+)
+
+
+@pytest.fixture
+def dataset_dir(tmp_path):
+    write_take(tmp_path / "alice_left.wav", 4, seed=1)
+    write_take(tmp_path / "alice_up.wav", 5, seed=2)
+    write_take(tmp_path / "bob_up.wav", 6, seed=3)
+    return tmp_path
+
+
+def test_build_and_open(dataset_dir, capsys):
+    dataset = build_stomp_dataset(dataset_dir, workers=1)
+    assert "3 files -> 15 stomps" in capsys.readouterr().out
+
+    reopened = StompDataset(dataset_dir / "stomps")
+    assert isinstance(reopened.stomps, np.memmap)
+    assert reopened.stomps.shape == (15, 3200, 2)
+    assert reopened.stomps.dtype == np.int16
+    assert list(reopened.name) == ["alice"] * 9 + ["bob"] * 6
+    assert list(reopened.y[:4]) == [MOVES.index("left")] * 4
+    assert list(reopened.stomp_idx[4:9]) == [0, 1, 2, 3, 4]
+    np.testing.assert_array_equal(reopened.offset, dataset.offset)
+
+    # Features and labels are those of the consolidated feature store
+    store = build_dataset(dataset_dir, workers=1)
+    np.testing.assert_array_equal(reopened.X, store["X"])
+    np.testing.assert_array_equal(reopened.y, store["y"])
+
+    metadata = reopened.metadata
+    assert list(metadata.columns) == [
+        "name",
+        "file",
+        "move",
+        "y",
+        "offset",
+        "stomp_idx",
+    ]
+
+
+@pytest.mark.parametrize(
+    "dtype, tolerance", [("int16", 0.5 / INT16_SCALE), ("float16", 3e-4)]
+)
+def test_stored_audio_matches_segmented_stomps(dataset_dir, dtype, tolerance):
+    dataset = build_stomp_dataset(dataset_dir, workers=1, dtype=dtype)
+    stomps, offsets = segment_file(dataset_dir / "bob_up.wav")
+    bob = dataset.select(names=["bob"])
+
+    np.testing.assert_allclose(dataset.audio(bob), stomps, atol=tolerance)
+    np.testing.assert_array_equal(dataset.offset[bob], offsets)
+
+
+def test_quantize_clips_to_full_scale():
+    x = np.array([-2.0, -1.0, 0.0, 0.5, 1.0, 2.0], dtype=np.float32)
+    q = quantize(x)
+    assert list(q) == [-INT16_SCALE, -INT16_SCALE, 0, 16384, INT16_SCALE, INT16_SCALE]
+    np.testing.assert_allclose(dequantize(q), np.clip(x, -1, 1), atol=1e-4)
+
+
+def test_split_is_stratified_and_disjoint(dataset_dir):
+    dataset = build_stomp_dataset(dataset_dir, workers=1)
+    train, test = dataset.split(test_size=0.25, seed=0)
+
+    assert len(np.intersect1d(train, test)) == 0
+    assert len(train) + len(test) == len(dataset)
+    assert np.all(np.diff(train) > 0) and np.all(np.diff(test) > 0)
+    # left: 4 -> 1 test, up: 11 -> 3 test (rounded)
+    assert np.bincount(dataset.y[test]).tolist()[1:4] == [1, 0, 3]
+
+    again, _ = dataset.split(test_size=0.25, seed=0)
+    np.testing.assert_array_equal(train, again)
+
+    ups = dataset.select(moves=["up"])
+    train, test = dataset.split(ups, test_size=0.5, by=dataset.name)
+    assert set(train) | set(test) == set(ups)
+    assert set(dataset.name[test]) == {"alice", "bob"}
+
+
+def test_labels_follow_the_given_moves(dataset_dir):
+    dataset = build_stomp_dataset(dataset_dir, workers=1)
+    labels = dataset.labels(["up", "left"])
+    assert list(labels[:4]) == [1] * 4
+    assert list(labels[4:]) == [0] * 11
+    assert set(dataset.labels(["down"])) == {-1}
+
+
+def test_contiguous_batches_are_views(dataset_dir):
+    dataset = build_stomp_dataset(dataset_dir, workers=1)
+    batches = list(dataset.batches(batch_size=4, dtype=None))
+
+    assert [len(audio) for audio, _ in batches] == [4, 4, 4, 3]
+    for audio, _ in batches:
+        assert np.shares_memory(audio, dataset.stomps)
+
+    shuffled = list(dataset.batches(batch_size=4, shuffle=True, seed=1))
+    order = np.random.default_rng(1).permutation(len(dataset))
+    audio, y = shuffled[0]
+    assert audio.dtype == np.float32
+    np.testing.assert_array_equal(y, dataset.y[order[:4]])
+    np.testing.assert_array_equal(audio, dataset.audio(order[:4]))
+
+
+def test_rejects_unknown_dtype(dataset_dir):
+    with pytest.raises(ValueError, match="dtype"):
+        build_stomp_dataset(dataset_dir, workers=1, dtype="int8")
@@ -0,0 +1,132 @@
+import json
+import sys
+import threading
+
+import numpy as np
+import pytest
+from stomp_detector import StompDetector
+from telemetry import NULL_TRACE, LatencyHistogram, StompTrace, Telemetry
+
+
+def test_histogram_buckets_and_percentiles():
+    histogram = LatencyHistogram(window=100)
+    for ms in range(1, 201):
+        histogram.record(ms / 1000)
+
+    assert histogram.count == 200
+    assert histogram.sum == pytest.approx(sum(range(1, 201)) / 1000)
+    assert sum(histogram.counts) == 200
+    # Only the last 100 values count towards the rolling percentiles
+    assert histogram.percentiles() == {
+        "p50_ms": pytest.approx(151),
+        "p95_ms": pytest.approx(196),
+        "p99_ms": pytest.approx(200),
+    }
+
+
+def test_concurrent_recording_loses_nothing():
+    telemetry = Telemetry()
+
+    def run():
+        for _ in range(10_000):
+            trace = telemetry.trace(0.0)
+            trace.mark("detect")
+            telemetry.finish(trace)
+            telemetry.count("hops")
+
+    # Switch threads often enough for unlocked updates to collide
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    try:
+        threads = [threading.Thread(target=run) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    finally:
+        sys.setswitchinterval(interval)
+
+    histogram = telemetry.stages["detect"]
+    assert histogram.count == sum(histogram.counts) == 40_000
+    assert telemetry.counters["hops"] == 40_000
+
+
+def test_trace_durations():
+    trace = StompTrace(start=10.0)
+    trace.marks = [("read", 10.1), ("detect", 10.15), ("features", 10.2)]
+    durations = dict(trace.durations())
+    assert durations == {
+        "read": pytest.approx(0.1),
+        "detect": pytest.approx(0.05),
+        "features": pytest.approx(0.05),
+    }
+
+
+def test_disabled_telemetry_records_nothing():
+    telemetry = Telemetry(enabled=False)
+    trace = telemetry.trace()
+    assert trace is NULL_TRACE
+    trace.mark("read")
+    telemetry.finish(trace)
+    telemetry.record("detect", 0.01)
+    telemetry.count("overflows")
+    assert telemetry.snapshot()["stages"] == {}
+    assert telemetry.snapshot()["counters"] == {}
+
+
+def test_jsonl_and_prometheus_export(tmp_path):
+    telemetry = Telemetry()
+    trace = telemetry.trace()
+    trace.mark("read")
+    trace.mark("detect")
+    telemetry.finish(trace)
+    telemetry.record("detect", 0.002)
+    telemetry.count("overflows", 3)
+    telemetry.add_source(lambda: {"stomps_dropped": 1})
+
+    jsonl = tmp_path / "telemetry.jsonl"
+    telemetry.export(jsonl)
+    telemetry.export(jsonl)
+    lines = jsonl.read_text().splitlines()
+    assert len(lines) == 2
+    snapshot = json.loads(lines[-1])
+    assert snapshot["stages"]["detect"]["count"] == 2
+    assert {"p50_ms", "p95_ms", "p99_ms"} <= set(snapshot["stages"]["detect"])
+    assert snapshot["counters"] == {"overflows": 3, "stomps_dropped": 1}
+
+    prom = tmp_path / "stomps.prom"
+    telemetry.export(prom)
+    text = prom.read_text()
+    assert 'stomp_stage_latency_seconds_bucket{stage="detect",le="+Inf"} 2' in text
+    assert 'stomp_stage_latency_seconds_count{stage="read"} 1' in text
+    assert 'stomp_stage_latency_recent_seconds{stage="detect",quantile="0.99"}' in text
+    assert "stomp_overflows_total 3" in text
+    assert not list(tmp_path.glob("*.tmp"))
+
+
+def test_periodic_export_writes_final_snapshot(tmp_path):
+    telemetry = Telemetry()
+    path = tmp_path / "telemetry.jsonl"
+    telemetry.start_export(path, interval=60.0)
+    telemetry.record("inference", 0.001)
+    telemetry.stop()
+
+    (line,) = path.read_text().splitlines()
+    assert json.loads(line)["stages"]["inference"]["count"] == 1
+
+
+def test_detector_records_resample_stage():
+    sr = 48000
+    telemetry = Telemetry()
+    detector = StompDetector(sr=sr, incremental=True, telemetry=telemetry)
+    audio = np.random.default_rng(0).standard_normal((sr, 2)).astype(np.float32)
+    audio *= 1e-3
+    audio[24000:25000] += 0.5
+
+    hop = sr // 10
+    stomps = [
+        s for i in range(0, sr, hop) for s in detector.process(audio[i : i + hop])
+    ]
+
+    assert len(stomps) == 1
+    assert telemetry.stages["resample"].count == 1